@@ -0,0 +1,167 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """ترقيم بالمؤشر على مفتاح مركب مثل (-created_at, id)
+
+    كل صفحة تُقرأ بشرط على المفتاح بدل OFFSET، فتكلفة الصفحة N مثل الصفحة الأولى،
+    ولا يُنفذ COUNT(*). يمكن للـ view تحديد الترتيب عبر الخاصية cursor_ordering
+    أو الدالة get_cursor_ordering(queryset) عندما يعتمد الترتيب على الطلب، وإلا
+    يُشتق من النموذج (default_ordering).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = 'المؤشر غير صالح'
+
+    def default_ordering(self, model):
+        """ترتيب النموذج عندما لا يحدده الـ view: (-created_at, pk) إن وُجد العمود،
+        وإلا Meta.ordering إذا كانت كل أعمدته محلية وغير فارغة، وإلا المفتاح الأساسي وحده
+        """
+        pk = model._meta.pk.attname
+        fields = []
+        try:
+            model._meta.get_field('created_at')
+            fields = ['-created_at']
+        except FieldDoesNotExist:
+            for item in model._meta.ordering:
+                if not isinstance(item, str):
+                    fields = []
+                    break
+                try:
+                    field = model._meta.get_field(item.lstrip('-'))
+                except FieldDoesNotExist:
+                    fields = []
+                    break
+                if not field.concrete or field.is_relation or field.null:
+                    fields = []
+                    break
+                fields.append(item)
+        if not any(item.lstrip('-') in (pk, 'pk') for item in fields):
+            fields.append(pk)
+        return tuple(fields)
+
+    def get_ordering(self, view, queryset):
+        if hasattr(view, 'get_cursor_ordering'):
+            return tuple(view.get_cursor_ordering(queryset))
+        if hasattr(view, 'cursor_ordering'):
+            return tuple(view.cursor_ordering)
+        return self.default_ordering(queryset.model)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return payload['v'], bool(payload.get('r'))
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _keyset_filter(self, model, ordering, values):
+        """(a, b) بعد (va, vb) حسب اتجاه كل عمود: a<va OR (a=va AND b>vb) ..."""
+        if len(values) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = Q()
+        for field, raw in zip(ordering, values):
+            name = field.lstrip('-')
+            try:
+                value = model._meta.get_field(name).to_python(raw)
+            except FieldDoesNotExist:
+                # عمود محسوب (annotate) مثل درجة البحث
+                value = raw
+            except Exception:
+                raise NotFound(self.invalid_cursor_message)
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _position(self, instance, ordering):
+        values = []
+        for field in ordering:
+            value = getattr(instance, field.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size_value = self.get_page_size(request)
+        ordering = self.get_ordering(view, queryset)
+        cursor = self.decode_cursor(request)
+
+        reverse = bool(cursor and cursor[1])
+        if reverse:
+            # الصفحة السابقة: نقرأ بالاتجاه المعاكس ثم نعكس النتائج
+            query_ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in ordering)
+        else:
+            query_ordering = ordering
+
+        queryset = queryset.order_by(*query_ordering)
+        if cursor:
+            queryset = queryset.filter(self._keyset_filter(queryset.model, query_ordering, cursor[0]))
+
+        rows = list(queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+
+        self.ordering_fields = ordering
+        self.has_next = has_more if not reverse else True
+        self.has_previous = bool(cursor) if not reverse else has_more
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self._position(self.last, self.ordering_fields), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self._position(self.first, self.ordering_fields), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
@@ -83,6 +83,25 @@ else:
         }
     }
 
+# Cache
+# بدون REDIS_URL يستخدم كل عامل ذاكرة محلية مستقلة
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'default',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,8 +139,36 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # ترقيم بالمؤشر (-created_at, id) بدون OFFSET أو COUNT
+    'DEFAULT_PAGINATION_CLASS': 'backend.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Custom forms batch submission
+CUSTOM_FORMS_BATCH_MAX_SIZE = config('CUSTOM_FORMS_BATCH_MAX_SIZE', default=1000, cast=int)
+CUSTOM_FORMS_BATCH_CHUNK_SIZE = config('CUSTOM_FORMS_BATCH_CHUNK_SIZE', default=500, cast=int)
+
+# Custom forms write-behind ingestion (public submit endpoint returns 202)
+# Segments left by a stopped process are flushed when the next process starts,
+# or on demand with `python manage.py flush_ingest_log`.
+CUSTOM_FORMS_WRITE_BEHIND = config('CUSTOM_FORMS_WRITE_BEHIND', default=False, cast=bool)
+CUSTOM_FORMS_WRITE_BEHIND_DIR = config('CUSTOM_FORMS_WRITE_BEHIND_DIR', default=str(BASE_DIR / 'ingest_log'))
+CUSTOM_FORMS_WRITE_BEHIND_INTERVAL = config('CUSTOM_FORMS_WRITE_BEHIND_INTERVAL', default=2.0, cast=float)
+
+# Dashboard stats cache (soft TTL, stale values served while one worker refreshes)
+FORMS_STATS_CACHE_TTL = config('FORMS_STATS_CACHE_TTL', default=30, cast=int)
+FORMS_STATS_CACHE_STALE = config('FORMS_STATS_CACHE_STALE', default=600, cast=int)
+FORMS_STATS_CACHE_BACKGROUND = config('FORMS_STATS_CACHE_BACKGROUND', default=True, cast=bool)
+
+# Submission reference numbers: worker id 0-1023, unique per process; allocated from the database when empty
+FORMS_REFERENCE_WORKER_ID = config('FORMS_REFERENCE_WORKER_ID', default='') or None
+
+# Citizen feedback work queue: claimed items return to the queue after this many minutes
+FORMS_CLAIM_TTL_MINUTES = config('FORMS_CLAIM_TTL_MINUTES', default=30, cast=int)
+
+# Near-duplicate feedback: minimum estimated Jaccard similarity (MinHash) to join a cluster
+FORMS_DUPLICATE_THRESHOLD = config('FORMS_DUPLICATE_THRESHOLD', default=0.7, cast=float)
+
 # JWT configuration
 from datetime import timedelta
 SIMPLE_JWT = {
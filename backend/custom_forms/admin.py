@@ -1,32 +1,66 @@
 # Custom Forms Admin
 
+from django import forms
 from django.contrib import admin
-from .models import CustomForm, FormResponse
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from .models import CustomForm, FormResponse, FormResponseCounterShard, FormSchemaVersion
+
+class CustomFormAdminForm(forms.ModelForm):
+    # الحقول مخزنة في نسخة بنية ثابتة، تُعرض وتُحفظ عبر الخاصية fields
+    fields = forms.JSONField(label='حقول الاستمارة')
+    
+    class Meta:
+        model = CustomForm
+        exclude = ['schema_version']
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial['fields'] = self.instance.fields
+    
+    def save(self, commit=True):
+        self.instance.fields = self.cleaned_data['fields']
+        return super().save(commit)
 
 @admin.register(CustomForm)
 class CustomFormAdmin(admin.ModelAdmin):
-    list_display = ['title', 'category', 'is_public', 'is_active', 'created_by', 'responses_count', 'created_at']
+    form = CustomFormAdminForm
+    list_display = ['title', 'category', 'is_public', 'is_active', 'created_by', 'responses_total', 'created_at']
     list_filter = ['category', 'is_public', 'is_active', 'created_at']
     search_fields = ['title', 'description', 'created_by__first_name', 'created_by__last_name']
-    readonly_fields = ['created_at', 'updated_at', 'responses_count']
+    readonly_fields = ['created_at', 'updated_at', 'responses_total']
     ordering = ['-created_at']
+    list_select_related = ['created_by']
     
     fieldsets = (
         ('معلومات أساسية', {
             'fields': ('title', 'description', 'category')
         }),
         ('الإعدادات', {
-            'fields': ('is_public', 'is_active')
+            'fields': ('is_public', 'is_active', 'counter_shards')
         }),
         ('بنية الاستمارة', {
             'fields': ('fields',),
             'classes': ('wide',)
         }),
         ('معلومات إضافية', {
-            'fields': ('created_by', 'created_at', 'updated_at', 'responses_count'),
+            'fields': ('created_by', 'created_at', 'updated_at', 'responses_total'),
             'classes': ('collapse',)
         })
     )
+    
+    def get_queryset(self, request):
+        # مجموع أجزاء العداد لكل استمارة في نفس استعلام القائمة
+        shards = (
+            FormResponseCounterShard.objects.filter(form=OuterRef('pk'))
+            .order_by().values('form').annotate(total=Sum('count')).values('total')
+        )
+        return super().get_queryset(request).annotate(shard_total=Coalesce(Subquery(shards), 0))
+    
+    @admin.display(description='عدد الردود', ordering='responses_count')
+    def responses_total(self, obj):
+        return obj.responses_count + obj.shard_total
 
 @admin.register(FormResponse)
 class FormResponseAdmin(admin.ModelAdmin):
@@ -52,3 +86,10 @@ class FormResponseAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+@admin.register(FormSchemaVersion)
+class FormSchemaVersionAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'created_at']
+    search_fields = ['content_hash']
+    readonly_fields = ['content_hash', 'fields', 'created_at']
+    ordering = ['-created_at']
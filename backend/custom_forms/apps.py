@@ -7,3 +7,9 @@ class CustomFormsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'custom_forms'
     verbose_name = 'الاستمارات المخصصة'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .writebehind import recover_abandoned_segments
+
+        recover_abandoned_segments()
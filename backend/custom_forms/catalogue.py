@@ -0,0 +1,89 @@
+# Custom Forms Public Catalogue Cache
+
+import hashlib
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from .models import CustomForm
+
+CATALOGUE_BODY_KEY = 'custom_forms:catalogue:{version}:{page_size}:{cursor}'
+
+# مدة الاحتفاظ بالنسخة المجهزة، يحدّث بعدها عدد الردود المعروض
+CATALOGUE_CACHE_TIMEOUT = 300
+
+CATALOGUE_CACHE_CONTROL = 'public, no-cache'
+
+
+def get_catalogue_version():
+    """نسخة القائمة مشتقة من قاعدة البيانات: آخر updated_at وعدد الاستمارات
+
+    مفتاح نسخة في الذاكرة المؤقتة لا يُشارك بين العمليات مع LocMemCache، أما الجدول فتراه
+    كل العمليات. أي إنشاء أو تعديل يغير آخر updated_at، والحذف يغير العدد.
+    """
+    summary = CustomForm.objects.aggregate(updated=Max('updated_at'), total=Count('id'))
+    updated = summary['updated']
+    return f'{int(updated.timestamp() * 1000) if updated else 0}-{summary["total"]}'
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags
+
+
+def _relative(link):
+    # الروابط المخزنة لا تحمل Host أول طالب للقائمة
+    if not link:
+        return link
+    parts = urlsplit(link)
+    return f'{parts.path}?{parts.query}' if parts.query else parts.path
+
+
+def catalogue_key(request, paginator):
+    """مفتاح التخزين من معاملات الترقيم فقط بعد تطبيعها، فلا تنشئ معاملات أخرى نسخاً جديدة"""
+    cursor = request.query_params.get(paginator.cursor_query_param) or ''
+    return CATALOGUE_BODY_KEY.format(
+        version=get_catalogue_version(),
+        page_size=paginator.get_page_size(request),
+        cursor=hashlib.sha256(cursor.encode()).hexdigest()[:32] if cursor else '',
+    )
+
+
+def _finalize(body, etag):
+    response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = CATALOGUE_CACHE_CONTROL
+    return response
+
+
+def cached_catalogue_response(request, paginator, render):
+    """إرجاع القائمة المجهزة مسبقاً أو 304 باستعلام النسخة فقط
+
+    render: دالة تعيد صفحة القائمة ({next, previous, results}) عند عدم وجود نسخة مخزنة.
+    روابط next وprevious تُخزن نسبية.
+    """
+    key = catalogue_key(request, paginator)
+    entry = cache.get(key)
+    if entry is None:
+        data = render()
+        for name in ('next', 'previous'):
+            data[name] = _relative(data.get(name))
+        body = JSONRenderer().render(data)
+        etag = quote_etag(hashlib.sha256(body).hexdigest()[:32])
+        entry = (etag, body)
+        cache.set(key, entry, CATALOGUE_CACHE_TIMEOUT)
+
+    etag, body = entry
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = CATALOGUE_CACHE_CONTROL
+        return response
+    return _finalize(body, etag)
@@ -0,0 +1,56 @@
+# Custom Forms Response Counters
+
+import random
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import CustomForm, FormResponse, FormResponseCounterShard
+
+
+def adjust_responses_count(form_id, delta, counter_shards=None):
+    """زيادة أو إنقاص عداد ردود الاستمارة ذرياً دون قراءة القيمة الحالية"""
+    if not delta:
+        return
+    if counter_shards is None:
+        counter_shards = (
+            CustomForm.objects.filter(pk=form_id).values_list('counter_shards', flat=True).first() or 0
+        )
+
+    if not counter_shards:
+        CustomForm.objects.filter(pk=form_id).update(responses_count=F('responses_count') + delta)
+        return
+
+    # اختيار جزء عشوائي حتى لا تتنافس عمليات الإرسال المتزامنة على نفس الصف
+    shard = random.randrange(counter_shards)
+    updated = FormResponseCounterShard.objects.filter(form_id=form_id, shard=shard).update(
+        count=F('count') + delta
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                FormResponseCounterShard.objects.create(form_id=form_id, shard=shard, count=delta)
+        except IntegrityError:
+            # أنشأه طلب آخر في نفس اللحظة
+            FormResponseCounterShard.objects.filter(form_id=form_id, shard=shard).update(
+                count=F('count') + delta
+            )
+
+
+def forget_responses(responses):
+    """إنقاص العدادات لردود ستُحذف (queryset): استعلام تجميع واحد ثم تحديث لكل استمارة"""
+    counts = responses.order_by().values_list('form_id').annotate(total=Count('id'))
+    for form_id, total in sorted(counts):
+        adjust_responses_count(form_id, -total)
+
+
+def reconcile_responses_count(form_id):
+    """إعادة حساب العداد من جدول الردود وتصفير أجزائه، يعيد (القيمة السابقة, القيمة الفعلية)"""
+    with transaction.atomic():
+        form = CustomForm.objects.select_for_update().only('id', 'responses_count').get(pk=form_id)
+        shards = FormResponseCounterShard.objects.select_for_update().filter(form_id=form_id)
+        previous = form.responses_count + (shards.aggregate(total=Sum('count'))['total'] or 0)
+        actual = FormResponse.objects.filter(form_id=form_id).count()
+        shards.update(count=0)
+        CustomForm.objects.filter(pk=form_id).update(responses_count=actual)
+    return previous, actual
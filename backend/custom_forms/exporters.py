@@ -0,0 +1,287 @@
+# Custom Forms Exporters
+
+import csv
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from .models import FormResponse, FormSchemaVersion
+
+# عدد الصفوف المقروءة من قاعدة البيانات في كل دفعة
+EXPORT_CHUNK_SIZE = 2000
+
+# حجم الكتلة المرسلة إلى العميل (بايت تقريباً)
+STREAM_BUFFER_SIZE = 64 * 1024
+
+RESPONSE_COLUMNS = ('submitter_name', 'submitter_email', 'submitted_at', 'response_data')
+
+# أعمدة ثابتة تسبق أعمدة حقول الاستمارة في التصدير الجدولي
+FIXED_HEADERS = ['اسم المرسل', 'بريد المرسل', 'تاريخ الإرسال']
+
+# بدايات تجعل برامج الجداول تفسر الخلية كمعادلة (حقن CSV)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# ترميز مضغوط بدون مسافات بادئة
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+def iter_responses(form, chunk_size=EXPORT_CHUNK_SIZE):
+    """قراءة ردود الاستمارة على دفعات دون تحميلها كاملة في الذاكرة"""
+    return (
+        FormResponse.objects.filter(form=form)
+        .order_by('-submitted_at', '-id')
+        .values_list(*RESPONSE_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _row_to_dict(row):
+    submitter_name, submitter_email, submitted_at, response_data = row
+    return {
+        'submitter_name': submitter_name,
+        'submitter_email': submitter_email,
+        'submitted_at': submitted_at.isoformat(),
+        'response_data': response_data,
+    }
+
+
+def buffered(parts, size=STREAM_BUFFER_SIZE):
+    """تجميع الأجزاء الصغيرة في كتل أكبر لتقليل عدد عمليات الكتابة"""
+    buffer = []
+    buffered_size = 0
+    for part in parts:
+        buffer.append(part)
+        buffered_size += len(part)
+        if buffered_size >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def export_columns(fields):
+    """أعمدة التصدير من تعريف الحقول: قائمة (معرف الحقل, العنوان)"""
+    columns = []
+    for field in fields or []:
+        if isinstance(field, dict) and field.get('id'):
+            columns.append((field['id'], field.get('label') or field['id']))
+    return columns
+
+
+def form_export_columns(form):
+    """أعمدة البنية الحالية ثم الحقول الإضافية من النسخ السابقة التي لها ردود
+
+    تُقرأ كل نسخة مرة واحدة بدل تخمين الأعمدة من كل رد.
+    """
+    columns = export_columns(form.fields)
+    seen = {field_id for field_id, _ in columns}
+    version_ids = (
+        FormResponse.objects.filter(form=form).exclude(schema_version_id=form.schema_version_id)
+        .order_by().values_list('schema_version_id', flat=True).distinct()
+    )
+    older = FormSchemaVersion.objects.filter(id__in=version_ids).order_by('-created_at')
+    for fields in older.values_list('fields', flat=True):
+        for field_id, label in export_columns(fields):
+            if field_id not in seen:
+                seen.add(field_id)
+                columns.append((field_id, label))
+    return columns
+
+
+def flatten_value(value):
+    """تحويل قيمة الحقل إلى نص خلية واحدة"""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return '، '.join(flatten_value(item) for item in value)
+    if isinstance(value, dict):
+        return _encode(value)
+    if isinstance(value, bool):
+        return 'نعم' if value else 'لا'
+    return str(value)
+
+
+def escape_formula(text):
+    """إضافة ' قبل النص الذي يبدأ كمعادلة حتى يُعرض نصاً ولا يُنفذ عند فتح الملف"""
+    if text.startswith(FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def table_cell(value):
+    """نص خلية التصدير الجدولي، الأرقام تبقى كما هي فلا تتحول -5 إلى نص"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return escape_formula(flatten_value(value))
+
+
+def iter_table_rows(form, chunk_size=EXPORT_CHUNK_SIZE):
+    """صف العناوين ثم صف لكل رد - عمود لكل حقل في الاستمارة"""
+    columns = form_export_columns(form)
+    field_ids = [field_id for field_id, _ in columns]
+    yield FIXED_HEADERS + [escape_formula(label) for _, label in columns]
+
+    for submitter_name, submitter_email, submitted_at, response_data in iter_responses(form, chunk_size):
+        data = response_data if isinstance(response_data, dict) else {}
+        yield [
+            escape_formula(submitter_name),
+            escape_formula(submitter_email or ''),
+            submitted_at.isoformat(),
+        ] + [table_cell(data.get(field_id)) for field_id in field_ids]
+
+
+def stream_json_lines(form, chunk_size=EXPORT_CHUNK_SIZE):
+    """تصدير الردود بصيغة JSON Lines - سطر لكل رد"""
+    return buffered(
+        _encode(_row_to_dict(row)) + '\n'
+        for row in iter_responses(form, chunk_size)
+    )
+
+
+def _json_array_parts(form, chunk_size):
+    yield '{"form_title":' + _encode(form.title) + ',"responses":['
+    separator = ''
+    for row in iter_responses(form, chunk_size):
+        yield separator + _encode(_row_to_dict(row))
+        separator = ','
+    yield ']}'
+
+
+def stream_json_array(form, chunk_size=EXPORT_CHUNK_SIZE):
+    """تصدير الردود كمصفوفة JSON متدفقة بنفس بنية التصدير السابقة"""
+    return buffered(_json_array_parts(form, chunk_size))
+
+
+class _Echo:
+    """ملف وهمي يعيد ما يُكتب فيه بدل تخزينه"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_parts(form, chunk_size):
+    # BOM لكي يتعرف Excel على الترميز العربي
+    yield '﻿'
+    writer = csv.writer(_Echo())
+    for row in iter_table_rows(form, chunk_size):
+        yield writer.writerow(row)
+
+
+def stream_csv(form, chunk_size=EXPORT_CHUNK_SIZE):
+    """تصدير الردود بصيغة CSV صفاً بصف"""
+    return buffered(_csv_parts(form, chunk_size))
+
+
+class _ZipStream:
+    """مخزن مؤقت غير قابل للتنقل يُفرَّغ بعد كل دفعة من الصفوف"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# محارف غير مسموح بها في XML 1.0
+_ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f￾￿]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Responses" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews>'
+    '<sheetData>'
+)
+
+_XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def _xlsx_row(cells):
+    return '<row>' + ''.join(
+        '<c t="inlineStr"><is><t xml:space="preserve">'
+        + escape(_ILLEGAL_XML_CHARS.sub('', str(cell)))
+        + '</t></is></c>'
+        for cell in cells
+    ) + '</row>'
+
+
+def stream_xlsx(form, chunk_size=EXPORT_CHUNK_SIZE):
+    """تصدير الردود بصيغة XLSX بكتابة ورقة العمل صفاً بصف داخل ملف zip متدفق"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _XLSX_WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+        yield stream.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(_XLSX_SHEET_HEAD.encode('utf-8'))
+            for part in buffered(_xlsx_row(row) for row in iter_table_rows(form, chunk_size)):
+                sheet.write(part.encode('utf-8'))
+                data = stream.drain()
+                if data:
+                    yield data
+            sheet.write(_XLSX_SHEET_TAIL.encode('utf-8'))
+    yield stream.drain()
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# format_type -> (المولد, نوع المحتوى, امتداد الملف)
+EXPORT_FORMATS = {
+    'json': (stream_json_array, 'application/json; charset=utf-8', 'json'),
+    'jsonl': (stream_json_lines, 'application/x-ndjson; charset=utf-8', 'jsonl'),
+    'ndjson': (stream_json_lines, 'application/x-ndjson; charset=utf-8', 'jsonl'),
+    'csv': (stream_csv, 'text/csv; charset=utf-8', 'csv'),
+    'xlsx': (stream_xlsx, XLSX_CONTENT_TYPE, 'xlsx'),
+    'excel': (stream_xlsx, XLSX_CONTENT_TYPE, 'xlsx'),
+}
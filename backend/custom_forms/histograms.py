@@ -0,0 +1,118 @@
+# Custom Forms Answer Histograms
+
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import FormFieldAnswerCount, FormResponseValue
+from .projection import CHOICE_TYPES, PROJECTED_TEXT_LENGTH
+from .validation import get_compiled_schema
+
+
+def _choice_answers(response):
+    """أزواج (معرف الحقل, القيمة) لحقول الاختيار في رد واحد"""
+    if response.schema_version_id is None or not isinstance(response.response_data, dict):
+        return
+    field_types = get_compiled_schema(response.schema_version_id).field_types
+    for field_id, value in response.response_data.items():
+        if field_types.get(field_id) not in CHOICE_TYPES:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if item is None or item == '':
+                continue
+            yield field_id[:100], str(item)[:PROJECTED_TEXT_LENGTH]
+
+
+def record_answers(responses, delta=1):
+    """تحديث عدادات الإجابات ذرياً بـ F() لمجموعة ردود محملة"""
+    totals = Counter()
+    for response in responses:
+        for field_id, value in _choice_answers(response):
+            totals[(response.form_id, field_id, value)] += delta
+    _apply_totals(totals)
+
+
+def forget_answers(responses):
+    """إنقاص عدادات الإجابات لردود ستُحذف (queryset) من جدول الإسقاط
+
+    استعلام تجميع واحد بدل تحميل الردود، وكل قيمة تُقارن ببنية نسخة ردها.
+    """
+    rows = (
+        FormResponseValue.objects.filter(response__in=responses.values('pk'), value_text__isnull=False)
+        .order_by().values_list('form_id', 'response__schema_version_id', 'field_id', 'value_text')
+        .annotate(total=Count('id'))
+    )
+    totals = Counter()
+    for form_id, version_id, field_id, value, total in rows:
+        if version_id is None or get_compiled_schema(version_id).field_types.get(field_id) not in CHOICE_TYPES:
+            continue
+        totals[(form_id, field_id, value)] -= total
+    _apply_totals(totals)
+
+
+def _apply_totals(totals):
+    # ترتيب ثابت للمفاتيح لتجنب الاقفال المتبادلة بين الطلبات المتزامنة
+    for (form_id, field_id, value), amount in sorted(totals.items()):
+        rows = FormFieldAnswerCount.objects.filter(form_id=form_id, field_id=field_id, value=value)
+        if rows.update(count=F('count') + amount) or amount < 0:
+            continue
+        try:
+            with transaction.atomic():
+                FormFieldAnswerCount.objects.create(form_id=form_id, field_id=field_id, value=value, count=amount)
+        except IntegrityError:
+            # أنشأه طلب آخر في نفس اللحظة
+            rows.update(count=F('count') + amount)
+
+
+def rebuild_answer_counts(form):
+    """إعادة بناء عدادات استمارة من جدول إسقاط القيم
+
+    كل رد يُقارن ببنية نسخته: تجميع واحد على (النسخة، الحقل، القيمة) ثم تُجمع حقول الاختيار
+    في كل نسخة، فلا تضيع إجابات حقل تغير نوعه أو حُذف من البنية الحالية.
+    """
+    rows = (
+        FormResponseValue.objects.filter(form=form, value_text__isnull=False)
+        .order_by().values_list('response__schema_version_id', 'field_id', 'value_text')
+        .annotate(total=Count('id'))
+    )
+    totals = Counter()
+    for version_id, field_id, value, total in rows:
+        if version_id is None or get_compiled_schema(version_id).field_types.get(field_id) not in CHOICE_TYPES:
+            continue
+        totals[(field_id, value)] += total
+    with transaction.atomic():
+        FormFieldAnswerCount.objects.filter(form=form).delete()
+        FormFieldAnswerCount.objects.bulk_create([
+            FormFieldAnswerCount(form=form, field_id=field_id, value=value, count=total)
+            for (field_id, value), total in totals.items()
+        ], batch_size=1000)
+
+
+def form_summary(form):
+    """توزيع الإجابات لكل حقل اختيار - يقرأ صفوف العدادات فقط"""
+    counts = {}
+    for field_id, value, count in FormFieldAnswerCount.objects.filter(form=form).values_list(
+        'field_id', 'value', 'count'
+    ):
+        counts.setdefault(field_id, {})[value] = count
+
+    summary = []
+    for field in form.fields or []:
+        if not isinstance(field, dict) or field.get('type') not in CHOICE_TYPES:
+            continue
+        field_counts = counts.get(field['id'], {})
+        options = []
+        for option in field.get('options') or []:
+            value = option.get('value', option.get('label')) if isinstance(option, dict) else option
+            options.append({'value': value, 'count': field_counts.pop(str(value), 0)})
+        # قيم من نسخ سابقة للبنية لم تعد ضمن الخيارات
+        other = [{'value': value, 'count': count} for value, count in field_counts.items() if count]
+        summary.append({
+            'field_id': field['id'],
+            'label': field.get('label'),
+            'type': field['type'],
+            'options': options,
+            'other': other,
+        })
+    return summary
@@ -0,0 +1,30 @@
+# Custom Forms Bulk Ingestion
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from .counters import adjust_responses_count
+from .histograms import record_answers
+from .models import FormResponse
+from .projection import project_responses
+
+BATCH_MAX_SIZE = getattr(settings, 'CUSTOM_FORMS_BATCH_MAX_SIZE', 1000)
+BATCH_CHUNK_SIZE = getattr(settings, 'CUSTOM_FORMS_BATCH_CHUNK_SIZE', 500)
+
+
+def bulk_insert_responses(responses, batch_size=BATCH_CHUNK_SIZE):
+    """إدراج ردود جاهزة (FormResponse غير محفوظة) على دفعات داخل معاملة واحدة
+
+    bulk_create لا يرسل إشارات post_save، لذلك تُحدَّث العدادات وجدول الإسقاط وعدادات الإجابات هنا.
+    """
+    if not responses:
+        return []
+    with transaction.atomic():
+        created = FormResponse.objects.bulk_create(responses, batch_size=batch_size)
+        for form_id, total in Counter(response.form_id for response in responses).items():
+            adjust_responses_count(form_id, total)
+        project_responses(created, batch_size=batch_size)
+        record_answers(created)
+    return created
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from custom_forms.models import FormResponse
+from custom_forms.projection import iter_response_chunks, reproject_chunk
+
+
+class Command(BaseCommand):
+    help = 'بناء جدول إسقاط قيم الردود للردود الموجودة على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, action='append', dest='form_ids',
+                            help='معرف استمارة محددة (يمكن تكراره)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        responses = FormResponse.objects.all()
+        if options['form_ids']:
+            responses = responses.filter(form_id__in=options['form_ids'])
+
+        processed = 0
+        projected = 0
+        for chunk in iter_response_chunks(responses, options['batch_size']):
+            projected += reproject_chunk(chunk)
+            processed += len(chunk)
+            self.stdout.write(f'{processed} رد...')
+
+        self.stdout.write(self.style.SUCCESS(f'تمت معالجة {processed} رد وإنشاء {projected} قيمة'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from custom_forms.writebehind import get_write_behind_log
+
+
+class Command(BaseCommand):
+    help = 'تفريغ سجل الإدراج المؤجل إلى جدول الردود (يستعيد المقاطع المتروكة بعد توقف مفاجئ)'
+
+    def handle(self, *args, **options):
+        log = get_write_behind_log()
+        flushed = log.flush_once()
+        status = log.status()
+        self.stdout.write(self.style.SUCCESS(
+            f'تم إدراج {flushed} رد، المقاطع المتبقية: {status["pending_segments"]}'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from custom_forms.histograms import rebuild_answer_counts
+from custom_forms.models import CustomForm
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء عدادات إجابات حقول الاختيار من جدول إسقاط القيم (شغّل backfill_response_values أولاً للبيانات القديمة)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, action='append', dest='form_ids',
+                            help='معرف استمارة محددة (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        forms = CustomForm.objects.select_related('schema_version').order_by('id')
+        if options['form_ids']:
+            forms = forms.filter(id__in=options['form_ids'])
+
+        rebuilt = 0
+        for form in forms.iterator():
+            rebuild_answer_counts(form)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'تمت إعادة بناء عدادات {rebuilt} استمارة'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from custom_forms.counters import reconcile_responses_count
+from custom_forms.models import CustomForm
+
+
+class Command(BaseCommand):
+    help = 'إعادة مطابقة عدادات ردود الاستمارات المخصصة مع جدول الردود'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', type=int, action='append', dest='form_ids',
+                            help='معرف استمارة محددة (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        forms = CustomForm.objects.order_by('id').values_list('id', flat=True)
+        if options['form_ids']:
+            forms = forms.filter(id__in=options['form_ids'])
+
+        fixed = 0
+        for form_id in forms.iterator():
+            previous, actual = reconcile_responses_count(form_id)
+            if previous != actual:
+                fixed += 1
+                self.stdout.write(f'form {form_id}: {previous} -> {actual}')
+
+        self.stdout.write(self.style.SUCCESS(f'تمت المطابقة، تم تصحيح {fixed} عداد'))
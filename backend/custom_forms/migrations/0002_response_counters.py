@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_responses_count(apps, schema_editor):
+    CustomForm = apps.get_model('custom_forms', 'CustomForm')
+    FormResponse = apps.get_model('custom_forms', 'FormResponse')
+    counts = (
+        FormResponse.objects.order_by().values('form_id')
+        .annotate(total=models.Count('id')).values_list('form_id', 'total')
+    )
+    for form_id, total in counts.iterator():
+        CustomForm.objects.filter(pk=form_id).update(responses_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customform',
+            name='counter_shards',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='عدد أجزاء العداد'),
+        ),
+        migrations.AddField(
+            model_name='customform',
+            name='responses_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الردود'),
+        ),
+        migrations.CreateModel(
+            name='FormResponseCounterShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='رقم الجزء')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counter_shard_rows', to='custom_forms.customform', verbose_name='الاستمارة')),
+            ],
+            options={
+                'verbose_name': 'جزء عداد الردود',
+                'verbose_name_plural': 'أجزاء عدادات الردود',
+                'unique_together': {('form', 'shard')},
+            },
+        ),
+        migrations.RunPython(populate_responses_count, migrations.RunPython.noop),
+    ]
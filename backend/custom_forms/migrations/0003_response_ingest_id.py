@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0002_response_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formresponse',
+            name='ingest_id',
+            field=models.UUIDField(blank=True, db_index=True, editable=False, null=True, verbose_name='معرف الإدراج'),
+        ),
+        migrations.AlterField(
+            model_name='formresponse',
+            name='submitted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='تاريخ الإرسال'),
+        ),
+    ]
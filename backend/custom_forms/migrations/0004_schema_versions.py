@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import hashlib
+import json
+
+
+def _schema_hash(fields):
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def move_fields_to_schema_versions(apps, schema_editor):
+    CustomForm = apps.get_model('custom_forms', 'CustomForm')
+    FormResponse = apps.get_model('custom_forms', 'FormResponse')
+    FormSchemaVersion = apps.get_model('custom_forms', 'FormSchemaVersion')
+    for form in CustomForm.objects.all().iterator():
+        fields = form.fields if form.fields is not None else []
+        version, _ = FormSchemaVersion.objects.get_or_create(
+            content_hash=_schema_hash(fields), defaults={'fields': fields}
+        )
+        CustomForm.objects.filter(pk=form.pk).update(schema_version=version)
+        FormResponse.objects.filter(form_id=form.pk).update(schema_version=version)
+
+
+def restore_form_fields(apps, schema_editor):
+    CustomForm = apps.get_model('custom_forms', 'CustomForm')
+    for form in CustomForm.objects.select_related('schema_version').iterator():
+        form.fields = form.schema_version.fields
+        form.save(update_fields=['fields'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0003_response_ingest_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormSchemaVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(editable=False, max_length=64, unique=True, verbose_name='بصمة المحتوى')),
+                ('fields', models.JSONField(editable=False, verbose_name='حقول الاستمارة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'نسخة بنية استمارة',
+                'verbose_name_plural': 'نسخ بنى الاستمارات',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='customform',
+            name='schema_version',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='forms', to='custom_forms.formschemaversion', verbose_name='نسخة البنية'),
+        ),
+        migrations.AddField(
+            model_name='formresponse',
+            name='schema_version',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='responses', to='custom_forms.formschemaversion', verbose_name='نسخة البنية'),
+        ),
+        # الحقل fields يصبح قابلاً للفراغ مؤقتاً حتى تعمل عملية التراجع
+        migrations.AlterField(
+            model_name='customform',
+            name='fields',
+            field=models.JSONField(null=True, verbose_name='حقول الاستمارة'),
+        ),
+        migrations.RunPython(move_fields_to_schema_versions, restore_form_fields),
+        migrations.RemoveField(
+            model_name='customform',
+            name='fields',
+        ),
+        migrations.AlterField(
+            model_name='customform',
+            name='schema_version',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='forms', to='custom_forms.formschemaversion', verbose_name='نسخة البنية'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0004_schema_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormResponseValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_id', models.CharField(max_length=100, verbose_name='معرف الحقل')),
+                ('value_text', models.CharField(blank=True, max_length=255, null=True, verbose_name='القيمة النصية')),
+                ('value_number', models.FloatField(blank=True, null=True, verbose_name='القيمة الرقمية')),
+                ('value_date', models.DateField(blank=True, null=True, verbose_name='قيمة التاريخ')),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='response_values', to='custom_forms.customform', verbose_name='الاستمارة')),
+                ('response', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='custom_forms.formresponse', verbose_name='الرد')),
+            ],
+            options={
+                'verbose_name': 'قيمة رد',
+                'verbose_name_plural': 'قيم الردود',
+                'indexes': [models.Index(fields=['form', 'field_id', 'value_text'], name='cf_value_text_idx'), models.Index(fields=['form', 'field_id', 'value_number'], name='cf_value_number_idx'), models.Index(fields=['form', 'field_id', 'value_date'], name='cf_value_date_idx')],
+            },
+        ),
+    ]
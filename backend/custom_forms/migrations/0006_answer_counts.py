@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0005_response_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormFieldAnswerCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_id', models.CharField(max_length=100, verbose_name='معرف الحقل')),
+                ('value', models.CharField(max_length=255, verbose_name='القيمة')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+                ('form', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_counts', to='custom_forms.customform', verbose_name='الاستمارة')),
+            ],
+            options={
+                'verbose_name': 'عداد إجابة',
+                'verbose_name_plural': 'عدادات الإجابات',
+                'unique_together': {('form', 'field_id', 'value')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0006_answer_counts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customform',
+            index=models.Index(fields=['-created_at', 'id'], name='cf_form_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['form', '-submitted_at', 'id'], name='cf_response_cursor_idx'),
+        ),
+    ]
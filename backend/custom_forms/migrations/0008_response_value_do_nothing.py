@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0007_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='formresponsevalue',
+            name='response',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='values', to='custom_forms.formresponse', verbose_name='الرد'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:20
+
+from django.db import migrations
+
+from custom_forms.projection import coerce_value, value_column
+from custom_forms.validation import normalize_field_type
+
+BATCH_SIZE = 1000
+
+
+def backfill_response_values(apps, schema_editor):
+    FormResponse = apps.get_model('custom_forms', 'FormResponse')
+    FormResponseValue = apps.get_model('custom_forms', 'FormResponseValue')
+    FormSchemaVersion = apps.get_model('custom_forms', 'FormSchemaVersion')
+    field_types = {}
+    responses = (
+        FormResponse.objects.exclude(schema_version=None).order_by('id')
+        .only('id', 'form_id', 'schema_version_id', 'response_data')
+    )
+    last_id = 0
+    while True:
+        chunk = list(responses.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not chunk:
+            return
+        last_id = chunk[-1].pk
+        rows = []
+        for response in chunk:
+            if response.schema_version_id not in field_types:
+                fields = FormSchemaVersion.objects.get(pk=response.schema_version_id).fields or []
+                field_types[response.schema_version_id] = {
+                    field['id']: normalize_field_type(field)
+                    for field in fields
+                    if isinstance(field, dict) and field.get('id')
+                }
+            types = field_types[response.schema_version_id]
+            data = response.response_data if isinstance(response.response_data, dict) else {}
+            for field_id, value in data.items():
+                field_type = types.get(field_id)
+                column = value_column(field_type)
+                for item in value if isinstance(value, list) else [value]:
+                    typed = coerce_value(field_type, item)
+                    if typed is not None:
+                        rows.append(FormResponseValue(
+                            response_id=response.pk, form_id=response.form_id,
+                            field_id=field_id[:100], **{column: typed}
+                        ))
+        # الردود المحفوظة بعد 0005 لها صفوف من الإشارة، فتُعاد كتابة صفوف الدفعة كلها
+        FormResponseValue.objects.filter(response_id__in=[response.pk for response in chunk]).delete()
+        FormResponseValue.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0008_response_value_do_nothing'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_response_values, migrations.RunPython.noop),
+    ]
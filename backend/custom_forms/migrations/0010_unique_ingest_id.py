@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:23
+
+from django.db import migrations, models
+
+
+def clear_duplicate_ingest_ids(apps, schema_editor):
+    # ردود أدرجتها عمليتان من نفس المقطع قبل القيد: يبقى المعرف على أقدمها فقط
+    FormResponse = apps.get_model('custom_forms', 'FormResponse')
+    duplicates = (
+        FormResponse.objects.exclude(ingest_id=None).order_by().values('ingest_id')
+        .annotate(first_id=models.Min('id'), total=models.Count('id')).filter(total__gt=1)
+    )
+    for row in duplicates.iterator():
+        FormResponse.objects.filter(ingest_id=row['ingest_id']).exclude(pk=row['first_id']).update(ingest_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_forms', '0009_backfill_response_values'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_duplicate_ingest_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='formresponse',
+            name='ingest_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='معرف الإدراج'),
+        ),
+    ]
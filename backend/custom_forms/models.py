@@ -1,12 +1,47 @@
 # Custom Forms Django App
 
 # models.py
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+import hashlib
 import json
 
 User = get_user_model()
 
+def schema_hash(fields):
+    """بصمة ثابتة لمحتوى الحقول بغض النظر عن ترتيب المفاتيح"""
+    canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class FormSchemaVersion(models.Model):
+    """نسخة ثابتة من بنية الاستمارة، تخزن مرة واحدة لكل محتوى متطابق"""
+    content_hash = models.CharField(max_length=64, unique=True, editable=False, verbose_name='بصمة المحتوى')
+    fields = models.JSONField(editable=False, verbose_name='حقول الاستمارة')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    
+    class Meta:
+        verbose_name = 'نسخة بنية استمارة'
+        verbose_name_plural = 'نسخ بنى الاستمارات'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return self.content_hash[:12]
+    
+    @classmethod
+    def intern(cls, fields):
+        """إرجاع النسخة المطابقة للحقول أو إنشاؤها"""
+        content_hash = schema_hash(fields)
+        version = cls.objects.filter(content_hash=content_hash).first()
+        if version is not None:
+            return version
+        try:
+            with transaction.atomic():
+                return cls.objects.create(content_hash=content_hash, fields=fields)
+        except IntegrityError:
+            # أنشأها طلب آخر في نفس اللحظة
+            return cls.objects.get(content_hash=content_hash)
+
 class CustomForm(models.Model):
     CATEGORY_CHOICES = [
         ('general', 'عام'),
@@ -20,37 +55,169 @@ class CustomForm(models.Model):
     title = models.CharField(max_length=255, verbose_name='عنوان الاستمارة')
     description = models.TextField(blank=True, verbose_name='وصف الاستمارة')
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='general', verbose_name='فئة الاستمارة')
-    fields = models.JSONField(verbose_name='حقول الاستمارة')  # Store form structure as JSON
+    # بنية الاستمارة الحالية، تعديل الحقول ينشئ نسخة جديدة بدل تغيير القديمة
+    schema_version = models.ForeignKey(FormSchemaVersion, on_delete=models.PROTECT, related_name='forms', verbose_name='نسخة البنية')
     is_public = models.BooleanField(default=True, verbose_name='استمارة عامة')
     is_active = models.BooleanField(default=True, verbose_name='نشطة')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='منشئ الاستمارة')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')
     
+    # عداد مخزن للردود يُحدَّث ذرياً بـ F() بدل COUNT لكل استمارة
+    responses_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='عدد الردود')
+    # 0 = العداد على صف الاستمارة نفسه، أكبر من 0 = عدد صفوف العداد الموزعة للاستمارات كثيفة الإرسال
+    counter_shards = models.PositiveSmallIntegerField(default=0, verbose_name='عدد أجزاء العداد')
+    
     class Meta:
         verbose_name = 'استمارة مخصصة'
         verbose_name_plural = 'استمارات مخصصة'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='cf_form_created_idx'),
+        ]
+    
+    _pending_fields = None
     
     def __str__(self):
         return self.title
     
     @property
-    def responses_count(self):
-        return self.responses.count()
+    def fields(self):
+        if self._pending_fields is not None:
+            return self._pending_fields
+        return self.schema_version.fields
+    
+    @fields.setter
+    def fields(self, value):
+        self._pending_fields = value
+    
+    def save(self, *args, **kwargs):
+        if self._pending_fields is not None:
+            self.schema_version = FormSchemaVersion.intern(self._pending_fields)
+            self._pending_fields = None
+        super().save(*args, **kwargs)
+    
+    @property
+    def total_responses_count(self):
+        if not self.counter_shards:
+            return self.responses_count
+        pending = self.counter_shard_rows.aggregate(total=models.Sum('count'))['total'] or 0
+        return self.responses_count + pending
+    
+    def delete(self, *args, **kwargs):
+        # صفوف الإسقاط تُحذف أولاً بمفتاح الاستمارة، ثم تُحذف الردود دفعة واحدة دون تحميل معرفاتها
+        with transaction.atomic():
+            FormResponseValue.objects.filter(form_id=self.pk).delete()
+            return super().delete(*args, **kwargs)
+
+class FormResponseQuerySet(models.QuerySet):
+    def forget(self):
+        """إنقاص عدادات الردود والإجابات لهذه الردود قبل حذفها"""
+        from .counters import forget_responses
+        from .histograms import forget_answers
+        forget_responses(self)
+        forget_answers(self)
+    
+    def drop_values(self):
+        """حذف صفوف إسقاط هذه الردود، فمفتاحها DO_NOTHING لا يحذفها مع الرد"""
+        FormResponseValue.objects.filter(response__in=self.values('pk')).delete()
+    
+    def delete(self):
+        # لا إشارات حذف على FormResponse حتى يبقى حذف الاستمارة بردودها متتالياً سريعاً،
+        # فتُنقص العدادات هنا مرة للمجموعة كلها
+        with transaction.atomic():
+            self.forget()
+            self.drop_values()
+            return super().delete()
 
 class FormResponse(models.Model):
     form = models.ForeignKey(CustomForm, on_delete=models.CASCADE, related_name='responses', verbose_name='الاستمارة')
     response_data = models.JSONField(verbose_name='بيانات الرد')  # Store form responses as JSON
     submitter_name = models.CharField(max_length=255, verbose_name='اسم المرسل')
     submitter_email = models.EmailField(blank=True, null=True, verbose_name='بريد المرسل')
-    submitted_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإرسال')
+    submitted_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name='تاريخ الإرسال')
     ip_address = models.GenericIPAddressField(blank=True, null=True, verbose_name='عنوان IP')
+    # نسخة البنية التي أُرسل الرد وفقها
+    schema_version = models.ForeignKey(FormSchemaVersion, on_delete=models.PROTECT, null=True, blank=True, related_name='responses', verbose_name='نسخة البنية')
+    # معرف الإدراج المؤجل، فريد حتى لا يتكرر الرد عند إعادة تفريغ السجل من عمليتين
+    ingest_id = models.UUIDField(null=True, blank=True, editable=False, unique=True, verbose_name='معرف الإدراج')
     
     class Meta:
         verbose_name = 'رد استمارة'
         verbose_name_plural = 'ردود الاستمارات'
         ordering = ['-submitted_at']
+        indexes = [
+            # ترقيم ردود الاستمارة بالمؤشر (-submitted_at, id)
+            models.Index(fields=['form', '-submitted_at', 'id'], name='cf_response_cursor_idx'),
+        ]
+    
+    objects = FormResponseQuerySet.as_manager()
     
     def __str__(self):
         return f'{self.form.title} - {self.submitter_name}'
+    
+    def save(self, *args, **kwargs):
+        if self.schema_version_id is None and self.form_id:
+            self.schema_version_id = self.form.schema_version_id
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            responses = FormResponse.objects.filter(pk=self.pk)
+            responses.forget()
+            responses.drop_values()
+            return super().delete(*args, **kwargs)
+
+class FormResponseCounterShard(models.Model):
+    """جزء من عداد الردود للاستمارات كثيفة الإرسال لتوزيع الأقفال على عدة صفوف"""
+    form = models.ForeignKey(CustomForm, on_delete=models.CASCADE, related_name='counter_shard_rows', verbose_name='الاستمارة')
+    shard = models.PositiveSmallIntegerField(verbose_name='رقم الجزء')
+    count = models.IntegerField(default=0, verbose_name='العدد')
+    
+    class Meta:
+        verbose_name = 'جزء عداد الردود'
+        verbose_name_plural = 'أجزاء عدادات الردود'
+        unique_together = ['form', 'shard']
+    
+    def __str__(self):
+        return f'{self.form_id}#{self.shard}: {self.count}'
+
+class FormResponseValue(models.Model):
+    """إسقاط قيم الردود: صف لكل (رد، حقل، قيمة) للتصفية والتجميع في قاعدة البيانات
+
+    حقول الاختيار المتعدد تنتج صفاً لكل خيار محدد.
+    """
+    # DO_NOTHING حتى لا يمنع الحذف المتتالي السريع للردود، الصفوف تُحذف صراحة قبل الرد أو الاستمارة
+    response = models.ForeignKey(FormResponse, on_delete=models.DO_NOTHING, related_name='values', verbose_name='الرد')
+    form = models.ForeignKey(CustomForm, on_delete=models.CASCADE, related_name='response_values', verbose_name='الاستمارة')
+    field_id = models.CharField(max_length=100, verbose_name='معرف الحقل')
+    value_text = models.CharField(max_length=255, null=True, blank=True, verbose_name='القيمة النصية')
+    value_number = models.FloatField(null=True, blank=True, verbose_name='القيمة الرقمية')
+    value_date = models.DateField(null=True, blank=True, verbose_name='قيمة التاريخ')
+    
+    class Meta:
+        verbose_name = 'قيمة رد'
+        verbose_name_plural = 'قيم الردود'
+        indexes = [
+            models.Index(fields=['form', 'field_id', 'value_text'], name='cf_value_text_idx'),
+            models.Index(fields=['form', 'field_id', 'value_number'], name='cf_value_number_idx'),
+            models.Index(fields=['form', 'field_id', 'value_date'], name='cf_value_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.response_id}.{self.field_id}'
+
+class FormFieldAnswerCount(models.Model):
+    """عداد الإجابات لكل خيار في حقول الاختيار، يُحدَّث مع كل رد"""
+    form = models.ForeignKey(CustomForm, on_delete=models.CASCADE, related_name='answer_counts', verbose_name='الاستمارة')
+    field_id = models.CharField(max_length=100, verbose_name='معرف الحقل')
+    value = models.CharField(max_length=255, verbose_name='القيمة')
+    count = models.IntegerField(default=0, verbose_name='العدد')
+    
+    class Meta:
+        verbose_name = 'عداد إجابة'
+        verbose_name_plural = 'عدادات الإجابات'
+        unique_together = ['form', 'field_id', 'value']
+    
+    def __str__(self):
+        return f'{self.form_id}.{self.field_id}={self.value}: {self.count}'
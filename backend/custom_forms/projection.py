@@ -0,0 +1,156 @@
+# Custom Forms Response Projection
+
+import math
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Avg, Count, Exists, Max, Min, OuterRef
+
+from .models import FormResponseValue
+from .validation import get_compiled_schema
+
+PROJECTED_TEXT_LENGTH = 255
+
+NUMBER_TYPES = ('number',)
+DATE_TYPES = ('date',)
+# حقول الاختيار تُعاد كل قيمها، الحقول النصية تقتصر على الأكثر تكراراً
+CHOICE_TYPES = ('select', 'radio', 'checkbox')
+MAX_TEXT_BUCKETS = 100
+
+# عوامل المقارنة المسموحة في معاملات التصفية ?f.<field_id>__<op>=
+FILTER_OPERATORS = ('gte', 'lte', 'gt', 'lt')
+
+
+def _to_number(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _to_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_text(value):
+    if value is None or value == '':
+        return None
+    return str(value)[:PROJECTED_TEXT_LENGTH]
+
+
+def value_column(field_type):
+    if field_type in NUMBER_TYPES:
+        return 'value_number'
+    if field_type in DATE_TYPES:
+        return 'value_date'
+    return 'value_text'
+
+
+def coerce_value(field_type, value):
+    """تحويل القيمة إلى نوع عمود الإسقاط المناسب، None إذا تعذر"""
+    if field_type in NUMBER_TYPES:
+        return _to_number(value)
+    if field_type in DATE_TYPES:
+        return _to_date(value)
+    return _to_text(value)
+
+
+def project_response(response, field_types):
+    """صفوف الإسقاط (غير محفوظة) لرد واحد"""
+    data = response.response_data if isinstance(response.response_data, dict) else {}
+    rows = []
+    for field_id, value in data.items():
+        field_type = field_types.get(field_id)
+        values = value if isinstance(value, list) else [value]
+        column = value_column(field_type)
+        for item in values:
+            typed = coerce_value(field_type, item)
+            if typed is None:
+                continue
+            rows.append(FormResponseValue(
+                response_id=response.pk, form_id=response.form_id, field_id=field_id[:100], **{column: typed}
+            ))
+    return rows
+
+
+def project_responses(responses, batch_size=1000):
+    """إنشاء صفوف الإسقاط لمجموعة ردود محفوظة"""
+    rows = []
+    for response in responses:
+        # bulk_create لا يعيد المفتاح على كل قواعد البيانات
+        if response.pk is None or response.schema_version_id is None:
+            continue
+        field_types = get_compiled_schema(response.schema_version_id).field_types
+        rows.extend(project_response(response, field_types))
+    FormResponseValue.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def reproject_chunk(responses):
+    """إعادة بناء الإسقاط لدفعة ردود بشكل قابل للتكرار"""
+    with transaction.atomic():
+        FormResponseValue.objects.filter(response_id__in=[response.pk for response in responses]).delete()
+        return project_responses(responses)
+
+
+def filter_responses(queryset, form, params, field_types):
+    """تطبيق معاملات ?f.<field_id>=<value> و ?f.<field_id>__gte=... عبر جدول الإسقاط"""
+    for key, raw in params.items():
+        if not key.startswith('f.'):
+            continue
+        field_id, _, operator = key[2:].partition('__')
+        if operator and operator not in FILTER_OPERATORS:
+            continue
+        field_type = field_types.get(field_id)
+        column = value_column(field_type)
+        typed = coerce_value(field_type, raw)
+        if typed is None:
+            return queryset.none()
+        lookup = f'{column}__{operator}' if operator else column
+        matches = FormResponseValue.objects.filter(
+            response_id=OuterRef('pk'), form=form, field_id=field_id, **{lookup: typed}
+        )
+        queryset = queryset.filter(Exists(matches))
+    return queryset
+
+
+def aggregate_field(form, field_id, field_type, responses=None):
+    """توزيع قيم حقل واحد محسوب بالكامل في قاعدة البيانات"""
+    values = FormResponseValue.objects.filter(form=form, field_id=field_id)
+    if responses is not None:
+        values = values.filter(response__in=responses.values('pk'))
+
+    column = value_column(field_type)
+    if field_type in NUMBER_TYPES:
+        summary = values.aggregate(
+            count=Count('id'), min=Min(column), max=Max(column), avg=Avg(column)
+        )
+        return {'field_id': field_id, 'type': field_type, **summary}
+
+    buckets = values.order_by().values(column).annotate(count=Count('id')).order_by('-count', column)
+    if field_type not in CHOICE_TYPES:
+        buckets = buckets[:MAX_TEXT_BUCKETS]
+    return {
+        'field_id': field_id,
+        'type': field_type,
+        'counts': [{'value': row[column], 'count': row['count']} for row in buckets],
+    }
+
+
+def iter_response_chunks(queryset, chunk_size):
+    """تقسيم الردود إلى دفعات بالمفتاح (id) بدل OFFSET"""
+    last_id = 0
+    queryset = queryset.order_by('id').only('id', 'form_id', 'schema_version_id', 'response_data')
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].pk
+
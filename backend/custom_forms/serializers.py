@@ -2,6 +2,7 @@
 
 from rest_framework import serializers
 from .models import CustomForm, FormResponse
+from .validation import get_form_validator
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -13,18 +14,21 @@ class UserSerializer(serializers.ModelSerializer):
 
 class CustomFormSerializer(serializers.ModelSerializer):
     created_by = UserSerializer(read_only=True)
-    responses_count = serializers.ReadOnlyField()
+    fields = serializers.JSONField()
+    responses_count = serializers.IntegerField(source='total_responses_count', read_only=True)
     
     class Meta:
         model = CustomForm
         fields = [
             'id', 'title', 'description', 'category', 'fields', 
             'is_public', 'is_active', 'created_by', 'created_at', 
-            'updated_at', 'responses_count'
+            'updated_at', 'responses_count', 'schema_version'
         ]
-        read_only_fields = ['created_by', 'created_at', 'updated_at']
+        read_only_fields = ['created_by', 'created_at', 'updated_at', 'schema_version']
 
 class CustomFormCreateSerializer(serializers.ModelSerializer):
+    fields = serializers.JSONField()
+    
     class Meta:
         model = CustomForm
         fields = [
@@ -37,9 +41,9 @@ class FormResponseSerializer(serializers.ModelSerializer):
         model = FormResponse
         fields = [
             'id', 'form', 'response_data', 'submitter_name', 
-            'submitter_email', 'submitted_at', 'ip_address'
+            'submitter_email', 'submitted_at', 'ip_address', 'schema_version'
         ]
-        read_only_fields = ['submitted_at', 'ip_address']
+        read_only_fields = ['submitted_at', 'ip_address', 'schema_version']
 
 class FormResponseCreateSerializer(serializers.ModelSerializer):
     form_id = serializers.IntegerField(write_only=True)
@@ -50,21 +54,36 @@ class FormResponseCreateSerializer(serializers.ModelSerializer):
             'form_id', 'response_data', 'submitter_name', 'submitter_email'
         ]
     
-    def create(self, validated_data):
-        form_id = validated_data.pop('form_id')
-        try:
-            form = CustomForm.objects.get(id=form_id)
-            validated_data['form'] = form
-        except CustomForm.DoesNotExist:
-            raise serializers.ValidationError('الاستمارة غير موجودة')
+    def validate(self, attrs):
+        form_id = attrs.pop('form_id')
+        # الإرسال المجمع يمرر الاستمارات محملة مسبقاً لتجنب استعلام لكل رد
+        forms = self.context.get('forms')
+        if forms is not None:
+            form = forms.get(form_id)
+        else:
+            form = CustomForm.objects.filter(id=form_id).first()
+        if form is None:
+            raise serializers.ValidationError({'form_id': 'الاستمارة غير موجودة'})
         
+        errors = get_form_validator(form).validate(attrs.get('response_data'))
+        if errors:
+            raise serializers.ValidationError({'response_data': errors})
+        
+        attrs['form'] = form
+        attrs['schema_version_id'] = form.schema_version_id
+        return attrs
+    
+    def create(self, validated_data):
         # Get IP address from request
         request = self.context.get('request')
         if request:
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                validated_data['ip_address'] = x_forwarded_for.split(',')[0]
-            else:
-                validated_data['ip_address'] = request.META.get('REMOTE_ADDR')
+            validated_data['ip_address'] = get_client_ip(request)
         
         return super().create(validated_data)
+
+
+def get_client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
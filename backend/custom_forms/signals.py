@@ -0,0 +1,21 @@
+# Custom Forms Signals
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .counters import adjust_responses_count
+from .histograms import record_answers
+from .models import FormResponse
+from .projection import project_responses
+
+
+@receiver(post_save, sender=FormResponse)
+def record_new_response(sender, instance, created, **kwargs):
+    if created:
+        adjust_responses_count(instance.form_id, 1)
+        project_responses([instance])
+        record_answers([instance])
+
+
+# لا post_delete على FormResponse: أي مستقبل حذف يعطل الحذف المتتالي السريع للردود عند حذف
+# الاستمارة. حذف الردود يُنقص العدادات في FormResponseQuerySet.delete
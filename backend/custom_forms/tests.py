@@ -0,0 +1,634 @@
+# custom_forms/tests.py
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+import uuid
+import zipfile
+from unittest import mock
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .models import (
+    CustomForm, FormFieldAnswerCount, FormResponse, FormResponseCounterShard, FormResponseValue,
+    FormSchemaVersion,
+)
+
+FIELDS = [
+    {'id': 'name', 'type': 'text', 'label': 'الاسم', 'required': True},
+    {'id': 'age', 'type': 'number', 'label': 'العمر'},
+    {'id': 'city', 'type': 'select', 'label': 'المدينة', 'options': ['بغداد', 'البصرة']},
+]
+
+
+def make_user(username='admin', **extra):
+    return User.objects.create_user(
+        email=f'{username}@example.com', username=username, password='password', **extra
+    )
+
+
+def make_form(user, fields=FIELDS, **changes):
+    form = CustomForm(title='استمارة', created_by=user, **changes)
+    form.fields = fields
+    form.save()
+    return form
+
+
+def make_response(form, index=0, **data):
+    return FormResponse.objects.create(
+        form=form, submitter_name=f'مرسل {index}', submitter_email=f'user{index}@example.com',
+        response_data=data or {'name': f'اسم {index}'},
+    )
+
+
+def answer_counts(form):
+    return dict(
+        ((field_id, value), count)
+        for field_id, value, count in FormFieldAnswerCount.objects.filter(form=form).values_list(
+            'field_id', 'value', 'count'
+        )
+    )
+
+
+class ExportTests(TestCase):
+    """التصدير المتدفق: الملف الناتج يُقرأ كاملاً وقيمه صحيحة"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.form = make_form(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for index in range(3):
+            make_response(self.form, index, name=f'اسم {index}', age=index, city=['بغداد', 'البصرة'][index % 2])
+
+    def export(self, format_type):
+        response = self.client.get(f'/api/custom-forms/export/{self.form.pk}/{format_type}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_json_exports(self):
+        response, body = self.export('json')
+        data = json.loads(body)
+        self.assertEqual(data['form_title'], self.form.title)
+        self.assertEqual([row['submitter_name'] for row in data['responses']], ['مرسل 2', 'مرسل 1', 'مرسل 0'])
+        self.assertEqual(data['responses'][0]['response_data'], {'name': 'اسم 2', 'age': 2, 'city': 'بغداد'})
+
+        response, body = self.export('jsonl')
+        self.assertIn('form_responses_', response['Content-Disposition'])
+        lines = [json.loads(line) for line in body.decode('utf-8').splitlines()]
+        self.assertEqual(lines, data['responses'])
+
+    def test_csv_export(self):
+        _, body = self.export('csv')
+        text = body.decode('utf-8')
+        self.assertTrue(text.startswith('\ufeff'))
+        rows = list(csv.reader(io.StringIO(text[1:])))
+        self.assertEqual(rows[0], ['اسم المرسل', 'بريد المرسل', 'تاريخ الإرسال', 'الاسم', 'العمر', 'المدينة'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][:2] + rows[1][3:], ['مرسل 2', 'user2@example.com', 'اسم 2', '2', 'بغداد'])
+
+    def test_xlsx_export(self):
+        FormResponse.objects.create(
+            form=self.form, submitter_name='<مرسل & "خاص">\x01',
+            response_data={'name': 'اسم', 'city': ['بغداد', 'البصرة']},
+        )
+        _, body = self.export('xlsx')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertIn('xl/workbook.xml', archive.namelist())
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        rows = [
+            [cell.findtext(f'{namespace}is/{namespace}t') for cell in row]
+            for row in sheet.iter(f'{namespace}row')
+        ]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0][3:], ['الاسم', 'العمر', 'المدينة'])
+        self.assertEqual(rows[1][0], '<مرسل & "خاص">')
+        self.assertEqual(rows[1][3:], ['اسم', '', 'بغداد، البصرة'])
+
+    def test_formula_cells_escaped(self):
+        FormResponse.objects.create(
+            form=self.form, submitter_name='=HYPERLINK("http://example.com")', submitter_email='@evil@example.com',
+            response_data={'name': '+1+1', 'age': -5, 'city': ['-بغداد', 'البصرة']},
+        )
+        FormResponse.objects.create(form=self.form, submitter_name='\tمرسل', response_data={'name': '\r=1'})
+        self.form.fields = FIELDS[:1] + [{'id': 'age', 'type': 'number', 'label': '=العمر'}] + FIELDS[2:]
+        self.form.save()
+        _, body = self.export('csv')
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8')[1:])))
+        self.assertEqual(rows[0][4], "'=العمر")
+        escaped = {row[0]: row for row in rows[1:]}
+        row = escaped["'=HYPERLINK(\"http://example.com\")"]
+        self.assertEqual(row[1], "'@evil@example.com")
+        # الأرقام الفعلية لا تُغير
+        self.assertEqual(row[3:], ["'+1+1", '-5', "'-بغداد، البصرة"])
+        self.assertEqual(escaped["'\tمرسل"][3], "'\r=1")
+
+        _, body = self.export('xlsx')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn("'=HYPERLINK", sheet)
+        self.assertNotIn('>=HYPERLINK', sheet)
+
+    def test_unknown_format(self):
+        response = self.client.get(f'/api/custom-forms/export/{self.form.pk}/pdf/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.streaming)
+        self.assertIn('csv', response.json()['error'])
+
+    def test_other_users_form(self):
+        self.client.force_authenticate(make_user('other'))
+        response = self.client.get(f'/api/custom-forms/export/{self.form.pk}/json/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCounterTests(TestCase):
+    """عداد الردود المخزن يتبع الإنشاء والحذف، والمطابقة تطوي الأجزاء في صف الاستمارة"""
+
+    def setUp(self):
+        self.form = make_form(make_user())
+
+    def test_counts_follow_creates_and_deletes(self):
+        responses = [make_response(self.form, index) for index in range(3)]
+        responses[0].delete()
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.responses_count, 2)
+        self.assertEqual(self.form.total_responses_count, 2)
+
+    def test_sharded_counts_and_reconcile(self):
+        CustomForm.objects.filter(pk=self.form.pk).update(counter_shards=4)
+        for index in range(5):
+            make_response(self.form, index)
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.responses_count, 0)
+        self.assertEqual(self.form.total_responses_count, 5)
+
+        # انحراف متعمد يصححه أمر المطابقة
+        FormResponseCounterShard.objects.filter(form=self.form).update(count=7)
+        call_command('reconcile_response_counts', stdout=io.StringIO())
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.responses_count, 5)
+        self.assertEqual(self.form.total_responses_count, 5)
+
+
+class ValidationTests(TestCase):
+    """المدقق المترجم: قبول ورفض القيم حسب نوع كل حقل"""
+
+    FIELDS = [
+        {'id': 'name', 'type': 'text', 'required': True},
+        {'id': 'email', 'type': 'email'},
+        {'id': 'phone', 'type': 'tel'},
+        {'id': 'age', 'type': 'number'},
+        {'id': 'born', 'type': 'date'},
+        {'id': 'city', 'type': 'select', 'options': [{'value': 'baghdad', 'label': 'بغداد'}, 'basra']},
+        {'id': 'topics', 'type': 'checkbox', 'options': ['a', 'b']},
+        {'id': 'agree', 'type': 'checkbox'},
+    ]
+
+    def setUp(self):
+        from .validation import CompiledFormSchema
+
+        self.schema = CompiledFormSchema(self.FIELDS)
+
+    def test_accepts_valid_data(self):
+        for data in (
+            {'name': 'علي'},
+            {'name': 'علي', 'email': 'ali@example.com', 'phone': '+964 770 000 0000', 'age': '42',
+             'born': '1990-05-01', 'city': 'baghdad', 'topics': ['a', 'b'], 'agree': True},
+            {'name': 'علي', 'age': 3.5, 'city': 'basra', 'topics': [], 'email': ''},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.schema.validate(data), {})
+
+    def test_rejects_invalid_data(self):
+        cases = [
+            ({}, 'name'),
+            ({'name': ''}, 'name'),
+            ({'name': 5}, 'name'),
+            ({'name': 'x' * 1001}, 'name'),
+            ({'name': 'علي', 'email': 'not-an-email'}, 'email'),
+            ({'name': 'علي', 'phone': 'abc'}, 'phone'),
+            ({'name': 'علي', 'age': True}, 'age'),
+            ({'name': 'علي', 'age': 'عشرة'}, 'age'),
+            ({'name': 'علي', 'born': '01/05/1990'}, 'born'),
+            ({'name': 'علي', 'city': 'mosul'}, 'city'),
+            ({'name': 'علي', 'topics': 'a'}, 'topics'),
+            ({'name': 'علي', 'topics': ['a', 'c']}, 'topics'),
+            ({'name': 'علي', 'topics': ['a', 'a', 'b']}, 'topics'),
+            ({'name': 'علي', 'unknown': 1}, 'unknown'),
+            ([], 'non_field_errors'),
+        ]
+        for data, field_id in cases:
+            with self.subTest(data=data):
+                self.assertIn(field_id, self.schema.validate(data))
+
+    def test_submit_endpoint(self):
+        form = make_form(make_user())
+        client = APIClient()
+        response = client.post('/api/custom-forms/submit/', {
+            'form_id': form.pk, 'submitter_name': 'مرسل', 'response_data': {'name': 'علي', 'city': 'الموصل'},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('city', response.json()['response_data'])
+        response = client.post('/api/custom-forms/submit/', {
+            'form_id': form.pk, 'submitter_name': 'مرسل', 'response_data': {'name': 'علي', 'city': 'بغداد'},
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content[:500])
+
+    def test_compiled_cache_evicts_least_recently_used(self):
+        from . import validation
+
+        self.addCleanup(validation._compiled_cache.clear)
+        validation._compiled_cache.clear()
+        with mock.patch.object(validation, 'COMPILED_CACHE_SIZE', 2):
+            first = validation.get_compiled_schema(-1, self.FIELDS)
+            validation.get_compiled_schema(-2, self.FIELDS)
+            # استخدام الأولى يجعل الثانية الأقدم استخداماً
+            self.assertIs(validation.get_compiled_schema(-1), first)
+            validation.get_compiled_schema(-3, self.FIELDS)
+        self.assertEqual(list(validation._compiled_cache), [-1, -3])
+
+
+class BatchSubmitTests(TestCase):
+    """الإرسال المجمع: نتيجة لكل رد، والردود الصحيحة تُحفظ رغم فشل غيرها"""
+
+    URL = '/api/custom-forms/submit/batch/'
+
+    def setUp(self):
+        self.form = make_form(make_user())
+        self.client = APIClient()
+
+    def item(self, **data):
+        return {'form_id': self.form.pk, 'submitter_name': 'مرسل', 'response_data': data}
+
+    def test_partial_failures(self):
+        items = [
+            self.item(name='علي', city='بغداد'),
+            self.item(city='بغداد'),
+            {'form_id': 999999, 'submitter_name': 'مرسل', 'response_data': {'name': 'علي'}},
+            'ليس كائناً',
+            self.item(name='سارة', city='البصرة', age=30),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.URL, {'responses': items}, format='json')
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (2, 3))
+        self.assertEqual([row['status'] for row in data['results']], ['created', 'error', 'error', 'error', 'created'])
+        self.assertIn('name', data['results'][1]['errors']['response_data'])
+        self.assertIn('form_id', data['results'][2]['errors'])
+        self.assertLess(len(queries), 20)
+
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.total_responses_count, 2)
+        self.assertEqual(answer_counts(self.form), {('city', 'بغداد'): 1, ('city', 'البصرة'): 1})
+        self.assertEqual(
+            sorted(FormResponse.objects.values_list('response_data__name', flat=True)), ['سارة', 'علي']
+        )
+
+    def test_all_invalid_and_limits(self):
+        response = self.client.post(self.URL, {'responses': [self.item(city='بغداد')]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['created'], 0)
+        self.assertEqual(self.client.post(self.URL, {'responses': []}, format='json').status_code, 400)
+        self.assertFalse(FormResponse.objects.exists())
+
+
+class WriteBehindRecoveryTests(TestCase):
+    """مقاطع السجل المتروكة من عملية توقفت تُفرغ مرة واحدة دون تكرار"""
+
+    def setUp(self):
+        from .writebehind import WriteBehindLog
+
+        self.form = make_form(make_user())
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.log = WriteBehindLog(self.directory.name, batch_size=2, fsync=False)
+
+    def record(self, name):
+        return {
+            'ingest_id': str(uuid.uuid4()), 'form_id': self.form.pk,
+            'schema_version_id': self.form.schema_version_id,
+            'response_data': {'name': name, 'city': 'بغداد'}, 'submitter_name': name, 'submitter_email': None,
+            'ip_address': None, 'submitted_at': '2024-01-01T10:00:00+00:00',
+        }
+
+    def segment(self, name, records, tail=b''):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'wb') as segment:
+            for record in records:
+                segment.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            segment.write(tail)
+        # أقدم من STALE_AFTER، كأن العملية التي كتبته توقفت
+        old = time.time() - 3600
+        os.utime(path, (old, old))
+        return path
+
+    def test_recovers_abandoned_segments(self):
+        from .writebehind import _record_to_response
+
+        opened = [self.record(f'مفتوح {index}') for index in range(3)]
+        flushing = [self.record(f'قيد التفريغ {index}') for index in range(3)]
+        # توقفت العملية بعد إدراج أول رد من المقطع الذي كانت تفرغه
+        _record_to_response(flushing[0]).save()
+        self.segment('1000-111.open', opened, tail='{"ingest_id": "مبتور'.encode('utf-8'))
+        self.segment('1001-111.sealed.111.flush', flushing)
+        # مقطع نشط حديث لعملية أخرى لا يُمس
+        fresh = os.path.join(self.directory.name, f'{int(time.time() * 1000)}-222.open')
+        with open(fresh, 'wb') as segment:
+            segment.write((json.dumps(self.record('حديث')) + '\n').encode('utf-8'))
+
+        with self.assertLogs('custom_forms.writebehind', 'WARNING') as logs:
+            self.assertEqual(self.log.flush_once(), 5)
+        self.assertIn('corrupt', logs.output[0])
+        self.assertEqual(self.log.flush_once(), 0)
+        self.assertEqual(FormResponse.objects.filter(form=self.form).count(), 6)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted([os.path.basename(fresh), 'state.json']))
+
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.total_responses_count, 6)
+        self.assertEqual(answer_counts(self.form), {('city', 'بغداد'): 6})
+        self.assertEqual(self.log.status()['last_flush_count'], 5)
+
+    def test_concurrent_insert_of_same_record(self):
+        from . import writebehind
+
+        records = [self.record(f'مكرر {index}') for index in range(2)]
+        self.segment('1000-111.sealed', records)
+        insert = writebehind.bulk_insert_responses
+
+        def racing_insert(responses, **kwargs):
+            # عملية أخرى تدرج الرد الأول بعد فحص المعرفات الموجودة
+            if not FormResponse.objects.filter(ingest_id=records[0]['ingest_id']).exists():
+                writebehind._record_to_response(records[0]).save()
+            return insert(responses, **kwargs)
+
+        with mock.patch.object(writebehind, 'bulk_insert_responses', side_effect=racing_insert):
+            self.assertEqual(self.log.flush_once(), 1)
+        self.assertEqual(FormResponse.objects.filter(form=self.form).count(), 2)
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.total_responses_count, 2)
+
+    def test_startup_recovery(self):
+        from . import writebehind
+
+        with mock.patch.object(writebehind, 'get_write_behind_log', return_value=self.log), \
+                mock.patch.object(self.log, 'start') as start:
+            with mock.patch.object(writebehind, 'WRITE_BEHIND_ENABLED', True):
+                writebehind.recover_abandoned_segments()
+                start.assert_not_called()
+                self.segment('1000-111.open', [self.record('متروك')])
+                writebehind.recover_abandoned_segments()
+            start.assert_called_once()
+            writebehind.recover_abandoned_segments()
+            start.assert_called_once()
+
+
+class SchemaVersionTests(TestCase):
+    """نسخ البنية: المحتوى المتطابق يعيد نفس النسخة، والتعديل ينشئ نسخة لا تمس الردود السابقة"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.form = make_form(self.user)
+
+    def test_identical_schema_reuses_version(self):
+        version = self.form.schema_version_id
+        # نفس المحتوى بترتيب مفاتيح مختلف
+        self.form.fields = [dict(reversed(list(field.items()))) for field in FIELDS]
+        self.form.save()
+        self.assertEqual(self.form.schema_version_id, version)
+        self.assertEqual(make_form(self.user).schema_version_id, version)
+        self.assertEqual(FormSchemaVersion.objects.count(), 1)
+
+    def test_edit_creates_version_and_keeps_old_responses(self):
+        old_version = self.form.schema_version_id
+        old_response = make_response(self.form)
+        self.form.fields = FIELDS + [{'id': 'notes', 'type': 'textarea', 'label': 'ملاحظات'}]
+        self.form.save()
+        self.assertNotEqual(self.form.schema_version_id, old_version)
+        new_response = make_response(self.form, 1)
+
+        old_response.refresh_from_db()
+        self.assertEqual(old_response.schema_version_id, old_version)
+        self.assertEqual(new_response.schema_version_id, self.form.schema_version_id)
+        self.assertEqual(FormSchemaVersion.objects.get(pk=old_version).fields, FIELDS)
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.fields[-1]['id'], 'notes')
+
+
+class ProjectionTests(TestCase):
+    """جدول الإسقاط يطابق response_data في التصفية، وصفوفه تُحذف مع الرد"""
+
+    DATA = [
+        {'name': 'علي', 'age': 30, 'city': 'بغداد'},
+        {'name': 'سارة', 'age': '25', 'city': 'البصرة'},
+        {'name': 'زيد', 'age': 41, 'city': 'بغداد'},
+        {'name': 'ليلى', 'city': 'بغداد'},
+        {'name': 'علي'},
+    ]
+
+    def setUp(self):
+        from .validation import get_form_validator
+
+        self.form = make_form(make_user())
+        self.responses = [make_response(self.form, index, **data) for index, data in enumerate(self.DATA)]
+        self.field_types = get_form_validator(self.form).field_types
+
+    def matching(self, params):
+        from .projection import filter_responses
+
+        queryset = filter_responses(FormResponse.objects.filter(form=self.form), self.form, params, self.field_types)
+        return sorted(queryset.values_list('pk', flat=True))
+
+    def expected(self, predicate):
+        return sorted(response.pk for response in self.responses if predicate(response.response_data))
+
+    def test_filters_match_response_data(self):
+        age = lambda data: float(data['age']) if 'age' in data else None
+        cases = [
+            ({'f.city': 'بغداد'}, lambda data: data.get('city') == 'بغداد'),
+            ({'f.name': 'علي'}, lambda data: data.get('name') == 'علي'),
+            ({'f.age__gte': '30'}, lambda data: age(data) is not None and age(data) >= 30),
+            ({'f.age__lt': '30'}, lambda data: age(data) is not None and age(data) < 30),
+            ({'f.city': 'بغداد', 'f.age__lte': '30'},
+             lambda data: data.get('city') == 'بغداد' and age(data) is not None and age(data) <= 30),
+            ({'f.city': 'الموصل'}, lambda data: False),
+            ({'f.age': 'ثلاثون'}, lambda data: False),
+        ]
+        for params, predicate in cases:
+            with self.subTest(params=params):
+                self.assertEqual(self.matching(params), self.expected(predicate))
+
+    def test_rows_removed_with_response(self):
+        self.assertEqual(FormResponseValue.objects.filter(response=self.responses[0]).count(), 3)
+        self.responses[0].delete()
+        FormResponse.objects.filter(pk=self.responses[1].pk).delete()
+        self.assertFalse(FormResponseValue.objects.filter(response_id__in=[
+            self.responses[0].pk, self.responses[1].pk
+        ]).exists())
+        self.assertEqual(FormResponseValue.objects.filter(form=self.form).count(), 6)
+
+    def test_migration_backfills_existing_responses(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        migration = import_module('custom_forms.migrations.0009_backfill_response_values')
+        projected = sorted(FormResponseValue.objects.values_list('response_id', 'field_id', 'value_text', 'value_number'))
+        FormResponseValue.objects.filter(response=self.responses[0]).delete()
+        migration.backfill_response_values(apps, None)
+        # تكرار التعبئة لا يضاعف الصفوف
+        migration.backfill_response_values(apps, None)
+        self.assertEqual(
+            sorted(FormResponseValue.objects.values_list('response_id', 'field_id', 'value_text', 'value_number')),
+            projected,
+        )
+        self.assertEqual(self.matching({'f.city': 'بغداد'}), self.expected(lambda data: data.get('city') == 'بغداد'))
+
+
+class ResponseDeleteTests(TestCase):
+    """حذف الردود ينقص العدادات مرة للمجموعة، وحذف الاستمارة يبقى حذفاً متتالياً سريعاً"""
+
+    def setUp(self):
+        self.form = make_form(make_user())
+        for index in range(20):
+            make_response(self.form, index, name=f'مرسل {index}', age=index, city='بغداد' if index % 2 else 'البصرة')
+
+    def test_queryset_delete_updates_counters(self):
+        FormResponse.objects.filter(form=self.form, response_data__city='بغداد').delete()
+        FormResponse.objects.filter(form=self.form).first().delete()
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.total_responses_count, 9)
+        self.assertEqual(answer_counts(self.form), {('city', 'البصرة'): 9, ('city', 'بغداد'): 0})
+
+    def test_sharded_counter_delete(self):
+        CustomForm.objects.filter(pk=self.form.pk).update(counter_shards=4)
+        first = FormResponse.objects.filter(form=self.form).order_by('id').values('pk')[:5]
+        FormResponse.objects.filter(pk__in=[row['pk'] for row in first]).delete()
+        self.form.refresh_from_db()
+        self.assertEqual(self.form.total_responses_count, 15)
+
+    def test_form_delete_query_count(self):
+        CustomForm.objects.filter(pk=self.form.pk).update(counter_shards=4)
+        for index in range(180):
+            make_response(self.form, index)
+        with CaptureQueriesContext(connection) as queries:
+            self.form.delete()
+        # لا SELECT لمعرفات الردود: الردود وصفوف إسقاطها تُحذف بمفتاح الاستمارة
+        table = connection.ops.quote_name(FormResponse._meta.db_table)
+        selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and f'FROM {table}' in query['sql']
+        ]
+        self.assertEqual(selects, [])
+        self.assertLess(len(queries), 20, '\n'.join(query['sql'] for query in queries.captured_queries))
+        self.assertFalse(FormResponseValue.objects.exists())
+        self.assertFalse(FormResponse.objects.exists())
+        self.assertFalse(FormResponseCounterShard.objects.exists())
+        self.assertFalse(FormFieldAnswerCount.objects.exists())
+
+    def test_admin_shows_sharded_total(self):
+        CustomForm.objects.filter(pk=self.form.pk).update(counter_shards=4)
+        make_response(self.form)
+        self.client.force_login(User.objects.create_superuser(
+            email='root@example.com', username='root', password='password'
+        ))
+        response = self.client.get('/admin/custom_forms/customform/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_list[0].shard_total, 1)
+
+
+class AnswerCountTests(TestCase):
+    """عدادات الإجابات تُبنى من بنية نسخة كل رد"""
+
+    def test_rebuild_uses_each_response_version(self):
+        from .histograms import rebuild_answer_counts
+
+        form = make_form(make_user())
+        make_response(form, name='أ', city='بغداد')
+        form.refresh_from_db()
+        # النسخة الجديدة تحول city إلى نص حر وتضيف حقل اختيار
+        form.fields = [
+            {'id': 'name', 'type': 'text', 'label': 'الاسم'},
+            {'id': 'city', 'type': 'text', 'label': 'المدينة'},
+            {'id': 'kind', 'type': 'radio', 'label': 'النوع', 'options': ['شكوى', 'اقتراح']},
+        ]
+        form.save()
+        make_response(form, 1, name='ب', city='الموصل', kind='شكوى')
+        expected = {('city', 'بغداد'): 1, ('kind', 'شكوى'): 1}
+        self.assertEqual(answer_counts(form), expected)
+
+        FormFieldAnswerCount.objects.filter(form=form).update(count=99)
+        rebuild_answer_counts(form)
+        self.assertEqual(answer_counts(form), expected)
+
+        FormResponse.objects.filter(form=form).delete()
+        self.assertEqual(answer_counts(form), {('city', 'بغداد'): 0, ('kind', 'شكوى'): 0})
+
+
+class CatalogueCacheTests(TestCase):
+    """قائمة الاستمارات العامة: ETag و304، والإبطال عند تعديل استمارة"""
+
+    URL = '/api/custom-forms/public/'
+
+    def setUp(self):
+        cache.clear()
+        user = make_user()
+        self.forms = [make_form(user) for _ in range(3)]
+        self.client = APIClient()
+
+    def test_etag_and_invalidation(self):
+        first = self.client.get(self.URL)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # استعلام النسخة فقط
+        self.assertEqual(len(queries), 1)
+
+        self.forms[0].title = 'عنوان جديد'
+        self.forms[0].save()
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('عنوان جديد', response.content.decode())
+
+    def test_key_ignores_unrelated_params_and_host(self):
+        first = self.client.get(f'{self.URL}?page_size=2', HTTP_HOST='first.example.com')
+        next_link = first.json()['next']
+        self.assertTrue(next_link.startswith(self.URL), next_link)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'{self.URL}?page_size=2&utm=1&x=2', HTTP_HOST='second.example.com')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.json(), first.json())
+
+        rest = self.client.get(next_link).json()
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next'])
+
+    def test_version_follows_database(self):
+        # التعديل والحذف عبر queryset لا يرسلان إشارات، وعملية أخرى لا ترى ذاكرة هذه العملية
+        first = self.client.get(self.URL)
+        CustomForm.objects.filter(pk=self.forms[0].pk).update(title='من عملية أخرى', updated_at=timezone.now())
+        response = self.client.get(self.URL)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertIn('من عملية أخرى', response.content.decode())
+
+        CustomForm.objects.filter(pk=self.forms[1].pk).delete()
+        self.assertEqual(len(self.client.get(self.URL).json()['results']), 2)
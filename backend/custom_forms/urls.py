@@ -15,7 +15,11 @@ urlpatterns = [
     
     # ردود الاستمارات
     path('submit/', views.FormResponseCreateView.as_view(), name='form_response_create'),
+    path('submit/batch/', views.submit_responses_batch, name='form_response_batch_create'),
+    path('submit/status/', views.write_behind_status, name='form_response_write_behind_status'),
     path('responses/<int:form_id>/', views.FormResponseListView.as_view(), name='form_responses'),
+    path('responses/<int:form_id>/aggregate/', views.aggregate_responses, name='form_responses_aggregate'),
+    path('summary/<int:form_id>/', views.form_answers_summary, name='form_answers_summary'),
     
     # عمليات إضافية
     path('duplicate/<int:form_id>/', views.duplicate_form, name='duplicate_form'),
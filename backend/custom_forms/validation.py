@@ -0,0 +1,216 @@
+# Custom Forms Response Validation
+
+import re
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import validate_email
+
+# الحد الأقصى لطول النص لكل نوع حقل
+MAX_TEXT_LENGTH = {
+    'text': 1000,
+    'email': 254,
+    'phone': 20,
+    'textarea': 10000,
+}
+DEFAULT_MAX_TEXT_LENGTH = 1000
+
+# عدد الاستمارات المترجمة المحتفظ بها في الذاكرة لكل عملية
+COMPILED_CACHE_SIZE = 1024
+
+PHONE_RE = re.compile(r'^\+?[0-9][0-9\s\-()]{5,19}$')
+
+# أنواع مرادفة مستخدمة في الاستمارات القديمة
+TYPE_ALIASES = {'tel': 'phone'}
+
+
+def _option_values(options):
+    """قيم الخيارات سواء كانت نصوصاً أو كائنات {value, label}"""
+    values = set()
+    for option in options or []:
+        if isinstance(option, dict):
+            option = option.get('value', option.get('label'))
+        if option is not None:
+            values.add(str(option))
+    return values
+
+
+def _is_empty(value):
+    return value is None or value == '' or value == []
+
+
+def _text_checker(max_length):
+    def check(value):
+        if not isinstance(value, str):
+            return 'يجب أن تكون القيمة نصاً'
+        if len(value) > max_length:
+            return f'يجب ألا يتجاوز النص {max_length} حرفاً'
+    return check
+
+
+def _email_checker(max_length):
+    check_text = _text_checker(max_length)
+
+    def check(value):
+        error = check_text(value)
+        if error:
+            return error
+        try:
+            validate_email(value)
+        except DjangoValidationError:
+            return 'البريد الإلكتروني غير صحيح'
+    return check
+
+
+def _phone_checker(value):
+    if not isinstance(value, str) or not PHONE_RE.match(value.strip()):
+        return 'رقم الهاتف غير صحيح'
+
+
+def _number_checker(value):
+    if isinstance(value, bool):
+        return 'يجب أن تكون القيمة رقماً'
+    if isinstance(value, (int, float)):
+        return None
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return 'يجب أن تكون القيمة رقماً'
+
+
+def _date_checker(value):
+    try:
+        date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return 'يجب أن يكون التاريخ بصيغة YYYY-MM-DD'
+
+
+def _choice_checker(allowed):
+    def check(value):
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            return 'قيمة الاختيار غير صحيحة'
+        if allowed and str(value) not in allowed:
+            return 'الخيار المحدد غير موجود في الاستمارة'
+    return check
+
+
+def _multi_choice_checker(allowed):
+    check_one = _choice_checker(allowed)
+
+    def check(value):
+        # خانة اختيار منفردة بدون خيارات
+        if not allowed and isinstance(value, bool):
+            return None
+        if not isinstance(value, list):
+            return 'يجب أن تكون القيمة قائمة من الخيارات'
+        if allowed and len(value) > len(allowed):
+            return 'عدد الخيارات المحددة أكبر من المتاح'
+        for item in value:
+            error = check_one(item)
+            if error:
+                return error
+    return check
+
+
+def normalize_field_type(field):
+    return TYPE_ALIASES.get(field.get('type'), field.get('type'))
+
+
+def _compile_field(field):
+    field_type = normalize_field_type(field)
+    max_length = MAX_TEXT_LENGTH.get(field_type, DEFAULT_MAX_TEXT_LENGTH)
+
+    if field_type == 'email':
+        return _email_checker(max_length)
+    if field_type == 'phone':
+        return _phone_checker
+    if field_type == 'number':
+        return _number_checker
+    if field_type == 'date':
+        return _date_checker
+    if field_type in ('select', 'radio'):
+        return _choice_checker(frozenset(_option_values(field.get('options'))))
+    if field_type == 'checkbox':
+        return _multi_choice_checker(frozenset(_option_values(field.get('options'))))
+    return _text_checker(max_length)
+
+
+class CompiledFormSchema:
+    """مدقق مترجم مسبقاً لحقول استمارة واحدة"""
+
+    def __init__(self, fields):
+        self.checkers = tuple(
+            (field['id'], bool(field.get('required')), _compile_field(field))
+            for field in fields or []
+            if isinstance(field, dict) and field.get('id')
+        )
+        self.field_ids = frozenset(field_id for field_id, _, _ in self.checkers)
+        self.field_types = {
+            field['id']: normalize_field_type(field)
+            for field in fields or []
+            if isinstance(field, dict) and field.get('id')
+        }
+
+    def validate(self, response_data):
+        """يعيد قاموس الأخطاء لكل حقل، فارغ إذا كانت البيانات صحيحة"""
+        if not isinstance(response_data, dict):
+            return {'non_field_errors': ['يجب أن تكون بيانات الرد كائناً']}
+
+        errors = {}
+        for key in response_data:
+            if key not in self.field_ids:
+                errors[key] = ['الحقل غير موجود في الاستمارة']
+
+        for field_id, required, check in self.checkers:
+            value = response_data.get(field_id)
+            if _is_empty(value):
+                if required:
+                    errors[field_id] = ['هذا الحقل مطلوب']
+                continue
+            error = check(value)
+            if error:
+                errors[field_id] = [error]
+        return errors
+
+
+# LRU: كل استخدام ينقل النسخة إلى النهاية، ويُحذف الأقدم استخداماً عند امتلاء الذاكرة
+_compiled_cache = OrderedDict()
+_compiled_cache_lock = threading.Lock()
+
+
+def _cached_schema(schema_version_id):
+    with _compiled_cache_lock:
+        compiled = _compiled_cache.get(schema_version_id)
+        if compiled is not None:
+            _compiled_cache.move_to_end(schema_version_id)
+        return compiled
+
+
+def get_compiled_schema(schema_version_id, fields=None):
+    """البنية المترجمة لنسخة معينة، تُقرأ الحقول من قاعدة البيانات عند عدم تمريرها"""
+    compiled = _cached_schema(schema_version_id)
+    if compiled is not None:
+        return compiled
+
+    if fields is None:
+        from .models import FormSchemaVersion
+        fields = FormSchemaVersion.objects.values_list('fields', flat=True).get(pk=schema_version_id)
+    compiled = CompiledFormSchema(fields)
+    with _compiled_cache_lock:
+        _compiled_cache[schema_version_id] = compiled
+        if len(_compiled_cache) > COMPILED_CACHE_SIZE:
+            _compiled_cache.popitem(last=False)
+    return compiled
+
+
+def get_form_validator(form):
+    """المدقق المترجم لنسخة بنية الاستمارة - النسخ ثابتة فلا حاجة لإبطال الذاكرة
+
+    الاستمارات التي تشترك في نفس البنية تشترك في نفس المدقق.
+    """
+    compiled = _cached_schema(form.schema_version_id)
+    if compiled is not None:
+        return compiled
+    return get_compiled_schema(form.schema_version_id, form.fields)
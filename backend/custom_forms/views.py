@@ -3,16 +3,22 @@
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
-import json
+from django.http import StreamingHttpResponse
 
 from .models import CustomForm, FormResponse
 from .serializers import (
     CustomFormSerializer, CustomFormCreateSerializer,
-    FormResponseSerializer, FormResponseCreateSerializer
+    FormResponseSerializer, FormResponseCreateSerializer, get_client_ip
 )
+from .catalogue import cached_catalogue_response
+from .exporters import EXPORT_FORMATS
+from .histograms import form_summary
+from .ingest import BATCH_MAX_SIZE, bulk_insert_responses
+from .projection import aggregate_field, filter_responses
+from .validation import get_form_validator
+from .writebehind import WRITE_BEHIND_ENABLED, enqueue_response, get_write_behind_log
 
 class CustomFormCreateView(generics.CreateAPIView):
     """إنشاء استمارة مخصصة جديدة"""
@@ -28,15 +34,22 @@ class CustomFormListAllView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return CustomForm.objects.all()
+        return CustomForm.objects.select_related('created_by', 'schema_version')
 
 class CustomFormListView(generics.ListAPIView):
-    """قائمة الاستمارات العامة"""
+    """قائمة الاستمارات العامة - مخزنة مؤقتاً حسب رقم نسخة القائمة"""
     serializer_class = CustomFormSerializer
     permission_classes = [AllowAny]
+    # القائمة لا تعتمد على المستخدم، فلا حاجة لاستعلام المصادقة
+    authentication_classes = []
     
     def get_queryset(self):
-        return CustomForm.objects.filter(is_public=True, is_active=True)
+        return CustomForm.objects.filter(is_public=True, is_active=True).select_related('created_by', 'schema_version')
+    
+    def list(self, request, *args, **kwargs):
+        return cached_catalogue_response(
+            request, self.paginator, lambda: super(CustomFormListView, self).list(request, *args, **kwargs).data
+        )
 
 class CustomFormManageView(generics.ListAPIView):
     """إدارة الاستمارات للمستخدم الحالي"""
@@ -44,7 +57,7 @@ class CustomFormManageView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return CustomForm.objects.filter(created_by=self.request.user)
+        return CustomForm.objects.filter(created_by=self.request.user).select_related('created_by', 'schema_version')
 
 class CustomFormUpdateView(generics.RetrieveUpdateDestroyAPIView):
     """تحديث أو حذف استمارة مخصصة"""
@@ -52,22 +65,126 @@ class CustomFormUpdateView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        return CustomForm.objects.filter(created_by=self.request.user)
+        return CustomForm.objects.filter(created_by=self.request.user).select_related('created_by', 'schema_version')
 
 class FormResponseCreateView(generics.CreateAPIView):
     """إرسال رد على استمارة"""
     serializer_class = FormResponseCreateSerializer
     permission_classes = [AllowAny]
+    
+    def create(self, request, *args, **kwargs):
+        if not WRITE_BEHIND_ENABLED:
+            return super().create(request, *args, **kwargs)
+        
+        # وضع الإدراج المؤجل: التأكيد بعد الكتابة في السجل المحلي
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ingest_id = enqueue_response(serializer.validated_data, get_client_ip(request))
+        return Response({'status': 'queued', 'ingest_id': ingest_id}, status=status.HTTP_202_ACCEPTED)
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def write_behind_status(request):
+    """حالة سجل الإدراج المؤجل وتأخر التفريغ"""
+    log = get_write_behind_log()
+    if WRITE_BEHIND_ENABLED:
+        log.start()
+    return Response(log.status())
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def submit_responses_batch(request):
+    """إرسال مجموعة ردود دفعة واحدة مع نتيجة لكل رد"""
+    items = request.data.get('responses') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'يجب إرسال قائمة ردود'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > BATCH_MAX_SIZE:
+        return Response(
+            {'error': f'الحد الأقصى للدفعة {BATCH_MAX_SIZE} رد'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    # استعلام واحد لجميع الاستمارات المذكورة في الدفعة
+    form_ids = set()
+    for item in items:
+        try:
+            form_ids.add(int(item.get('form_id')))
+        except (AttributeError, TypeError, ValueError):
+            pass
+    forms = CustomForm.objects.in_bulk(form_ids)
+    
+    ip_address = get_client_ip(request)
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        serializer = FormResponseCreateSerializer(data=item, context={'request': request, 'forms': forms})
+        if serializer.is_valid():
+            pending.append((index, FormResponse(ip_address=ip_address, **serializer.validated_data)))
+        else:
+            results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+    
+    created = bulk_insert_responses([response for _, response in pending])
+    for (index, _), response in zip(pending, created):
+        results[index] = {'index': index, 'status': 'created', 'id': response.pk}
+    
+    return Response(
+        {'created': len(created), 'failed': len(items) - len(created), 'results': results},
+        status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST
+    )
 
 class FormResponseListView(generics.ListAPIView):
     """عرض ردود استمارة معينة"""
     serializer_class = FormResponseSerializer
     permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-submitted_at', 'id')
     
     def get_queryset(self):
         form_id = self.kwargs['form_id']
         form = get_object_or_404(CustomForm, id=form_id, created_by=self.request.user)
-        return FormResponse.objects.filter(form=form)
+        queryset = FormResponse.objects.filter(form=form)
+        # تصفية حسب قيم الحقول: ?f.<field_id>=<value> أو ?f.<field_id>__gte=<value>
+        field_types = get_form_validator(form).field_types
+        return filter_responses(queryset, form, self.request.query_params, field_types)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def aggregate_responses(request, form_id):
+    """توزيع إجابات حقول الاستمارة محسوباً في قاعدة البيانات"""
+    form = get_object_or_404(CustomForm, id=form_id, created_by=request.user)
+    field_types = get_form_validator(form).field_types
+    
+    requested = request.query_params.getlist('field') or list(field_types)
+    unknown = [field_id for field_id in requested if field_id not in field_types]
+    if unknown:
+        return Response({'error': 'حقول غير موجودة في الاستمارة', 'fields': unknown},
+                        status=status.HTTP_400_BAD_REQUEST)
+    
+    responses = None
+    if any(key.startswith('f.') for key in request.query_params):
+        responses = filter_responses(
+            FormResponse.objects.filter(form=form), form, request.query_params, field_types
+        )
+    
+    return Response({
+        'form_id': form.id,
+        'fields': [
+            aggregate_field(form, field_id, field_types[field_id], responses)
+            for field_id in requested
+        ],
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def form_answers_summary(request, form_id):
+    """توزيع الإجابات لحقول الاختيار من العدادات المحدثة تدريجياً"""
+    form = get_object_or_404(
+        CustomForm.objects.select_related('schema_version'), id=form_id, created_by=request.user
+    )
+    return Response({
+        'form_id': form.id,
+        'responses_count': form.total_responses_count,
+        'fields': form_summary(form),
+    })
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -79,7 +196,7 @@ def duplicate_form(request, form_id):
             title=f"{original_form.title} (نسخة)",
             description=original_form.description,
             category=original_form.category,
-            fields=original_form.fields,
+            schema_version_id=original_form.schema_version_id,
             is_public=original_form.is_public,
             is_active=False,
             created_by=request.user
@@ -92,26 +209,19 @@ def duplicate_form(request, form_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def export_responses(request, form_id, format_type):
-    """تصدير ردود الاستمارة - JSON فقط"""
+    """تصدير ردود الاستمارة كتدفق دون تحميلها كاملة في الذاكرة"""
     try:
         form = CustomForm.objects.get(id=form_id, created_by=request.user)
-        responses = FormResponse.objects.filter(form=form).order_by('-submitted_at')
-        
-        data = {
-            'form_title': form.title,
-            'responses': [{
-                'submitter_name': r.submitter_name,
-                'submitter_email': r.submitter_email,
-                'submitted_at': r.submitted_at.isoformat(),
-                'response_data': r.response_data
-            } for r in responses]
-        }
-        
-        response_obj = HttpResponse(
-            json.dumps(data, ensure_ascii=False, indent=2),
-            content_type='application/json'
-        )
-        response_obj['Content-Disposition'] = f'attachment; filename="form_responses_{form.id}.json"'
-        return response_obj
     except CustomForm.DoesNotExist:
         return Response({'error': 'الاستمارة غير موجودة'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if format_type not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'صيغة التصدير غير مدعومة، الصيغ المتاحة: {", ".join(EXPORT_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    generator, content_type, extension = EXPORT_FORMATS[format_type]
+    
+    response_obj = StreamingHttpResponse(generator(form), content_type=content_type)
+    response_obj['Content-Disposition'] = f'attachment; filename="form_responses_{form.id}.{extension}"'
+    return response_obj
@@ -0,0 +1,315 @@
+# Custom Forms Write-Behind Ingestion
+#
+# وضع اختياري لنقطة الإرسال العامة: يُكتب الرد في سجل محلي للإلحاق فقط
+# (مع fsync) ويُعاد 202 فوراً، ثم يفرغ خيط خلفي السجل إلى FormResponse
+# على دفعات. كل عملية تكتب مقاطعها الخاصة:
+#
+#   <ms>-<pid>.open                المقطع النشط الذي يُلحق به
+#   <ms>-<pid>.sealed              مقطع مغلق جاهز للتفريغ
+#   <ms>-<pid>.sealed.<pid>.flush  مقطع تفرغه عملية معينة
+#
+# المقاطع .open أو .flush التي لم تتغير منذ مدة طويلة تعود لعملية توقفت
+# فتُستعاد عند تشغيل العملية التالية (AppConfig.ready) أو بالأمر flush_ingest_log.
+# ingest_id فريد فلا يتكرر الرد عند إعادة التفريغ.
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections
+from django.utils import timezone
+
+from .ingest import BATCH_CHUNK_SIZE, bulk_insert_responses
+from .models import CustomForm, FormResponse
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = getattr(settings, 'CUSTOM_FORMS_WRITE_BEHIND', False)
+WRITE_BEHIND_DIR = Path(getattr(
+    settings, 'CUSTOM_FORMS_WRITE_BEHIND_DIR', Path(settings.BASE_DIR) / 'ingest_log'
+))
+FLUSH_INTERVAL = getattr(settings, 'CUSTOM_FORMS_WRITE_BEHIND_INTERVAL', 2.0)
+FSYNC = getattr(settings, 'CUSTOM_FORMS_WRITE_BEHIND_FSYNC', True)
+
+# مقطع لم يتغير منذ هذه المدة يعتبر متروكاً من عملية متوقفة
+STALE_AFTER = max(60.0, FLUSH_INTERVAL * 10)
+
+STATE_FILE = 'state.json'
+
+
+def _segment_created_at(path):
+    try:
+        return int(path.name.split('-', 1)[0]) / 1000
+    except ValueError:
+        return path.stat().st_mtime
+
+
+def _record_to_response(record):
+    return FormResponse(
+        form_id=record['form_id'],
+        schema_version_id=record.get('schema_version_id'),
+        response_data=record['response_data'],
+        submitter_name=record['submitter_name'],
+        submitter_email=record.get('submitter_email'),
+        ip_address=record.get('ip_address'),
+        submitted_at=datetime.fromisoformat(record['submitted_at']),
+        ingest_id=uuid.UUID(record['ingest_id']),
+    )
+
+
+class WriteBehindLog:
+    """سجل إلحاق محلي يفرغ إلى FormResponse في الخلفية"""
+
+    def __init__(self, directory, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_CHUNK_SIZE, fsync=FSYNC):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._active = None
+        self._active_path = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # --- الكتابة ---
+
+    def append(self, record):
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            if self._active is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._active_path = self.directory / f'{int(time.time() * 1000)}-{os.getpid()}.open'
+                self._active = open(self._active_path, 'ab')
+            self._active.write(line)
+            self._active.flush()
+            if self.fsync:
+                os.fsync(self._active.fileno())
+        self.start()
+
+    def seal(self):
+        """إغلاق المقطع النشط ليصبح جاهزاً للتفريغ"""
+        with self._lock:
+            if self._active is None:
+                return
+            self._active.close()
+            os.replace(self._active_path, self._active_path.with_suffix('.sealed'))
+            self._active = None
+            self._active_path = None
+
+    # --- التفريغ ---
+
+    def _claim_segments(self):
+        if not self.directory.exists():
+            return []
+        now = time.time()
+        pid = os.getpid()
+        own_open = self._active_path
+        claimed = []
+        for path in sorted(self.directory.iterdir()):
+            name = path.name
+            try:
+                stale = now - path.stat().st_mtime > STALE_AFTER
+            except FileNotFoundError:
+                continue
+            if name.endswith('.open') and path != own_open and stale:
+                # مقطع نشط لعملية توقفت قبل إغلاقه
+                source = path
+            elif name.endswith('.sealed'):
+                source = path
+            elif name.endswith('.flush') and (stale or name.endswith(f'.{pid}.flush')):
+                source = path
+            else:
+                continue
+            target = self.directory / f'{name.split(".", 1)[0]}.sealed.{pid}.flush'
+            try:
+                os.replace(source, target)
+            except FileNotFoundError:
+                # استولت عليه عملية أخرى
+                continue
+            claimed.append(target)
+        return claimed
+
+    def _iter_batches(self, path):
+        batch = []
+        with open(path, 'rb') as segment:
+            for line_number, line in enumerate(segment, 1):
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    # سطر مبتور بسبب توقف أثناء الكتابة
+                    logger.warning('Skipping corrupt write-behind record %s:%d', path.name, line_number)
+                    continue
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _flush_batch(self, records):
+        try:
+            return self._insert_new(records)
+        except IntegrityError:
+            # أدرجت عملية أخرى بعض هذه الردود بعد الفحص (مقطع ظنته متروكاً)، فيُعاد الفحص مرة
+            return self._insert_new(records)
+
+    def _insert_new(self, records):
+        ingest_ids = [record['ingest_id'] for record in records]
+        existing = {
+            str(value) for value in
+            FormResponse.objects.filter(ingest_id__in=ingest_ids).values_list('ingest_id', flat=True)
+        }
+        form_ids = set(
+            CustomForm.objects.filter(id__in={record['form_id'] for record in records}).values_list('id', flat=True)
+        )
+        responses = []
+        for record in records:
+            if record['ingest_id'] in existing:
+                continue
+            if record['form_id'] not in form_ids:
+                logger.warning('Dropping write-behind record %s: form %s no longer exists',
+                               record['ingest_id'], record['form_id'])
+                continue
+            responses.append(_record_to_response(record))
+        bulk_insert_responses(responses, batch_size=self.batch_size)
+        return len(responses)
+
+    def flush_once(self):
+        """تفريغ كل المقاطع الجاهزة، يعيد عدد الردود المدرجة"""
+        self.seal()
+        flushed = 0
+        error = None
+        try:
+            for path in self._claim_segments():
+                for records in self._iter_batches(path):
+                    flushed += self._flush_batch(records)
+                    # تحديث وقت التعديل حتى لا تعتبره عملية أخرى متروكاً
+                    os.utime(path)
+                path.unlink()
+        except Exception as exc:
+            # يبقى المقطع .flush ويعاد تفريغه في الدورة التالية
+            logger.exception('Write-behind flush failed')
+            error = str(exc)
+        finally:
+            close_old_connections()
+        if flushed or error:
+            self._write_state(flushed, error)
+        return flushed
+
+    def _write_state(self, flushed, error):
+        state = {
+            'last_flush_at': timezone.now().isoformat(),
+            'last_flush_count': flushed,
+            'last_error': error,
+            'pid': os.getpid(),
+        }
+        tmp = self.directory / f'{STATE_FILE}.{os.getpid()}.tmp'
+        tmp.write_text(json.dumps(state), encoding='utf-8')
+        os.replace(tmp, self.directory / STATE_FILE)
+
+    # --- الخيط الخلفي ---
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush_once()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='custom-forms-write-behind', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        self.flush_once()
+
+    def has_pending(self):
+        """هل توجد مقاطع لم تُفرغ، من هذه العملية أو من عملية سابقة"""
+        if not self.directory.exists():
+            return False
+        return any(
+            path.name.endswith(('.open', '.sealed', '.flush')) for path in self.directory.iterdir()
+        )
+
+    # --- الحالة ---
+
+    def status(self):
+        pending_segments = 0
+        pending_bytes = 0
+        oldest = None
+        if self.directory.exists():
+            for path in self.directory.iterdir():
+                if path.name == STATE_FILE or path.name.endswith('.tmp'):
+                    continue
+                try:
+                    size = path.stat().st_size
+                except FileNotFoundError:
+                    continue
+                pending_segments += 1
+                pending_bytes += size
+                created_at = _segment_created_at(path)
+                oldest = created_at if oldest is None else min(oldest, created_at)
+
+        state = {}
+        try:
+            state = json.loads((self.directory / STATE_FILE).read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            pass
+
+        return {
+            'enabled': WRITE_BEHIND_ENABLED,
+            'pending_segments': pending_segments,
+            'pending_bytes': pending_bytes,
+            'flush_lag_seconds': round(time.time() - oldest, 3) if oldest is not None else 0,
+            'last_flush_at': state.get('last_flush_at'),
+            'last_flush_count': state.get('last_flush_count'),
+            'last_error': state.get('last_error'),
+        }
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_write_behind_log():
+    global _log
+    if _log is None:
+        with _log_lock:
+            if _log is None:
+                _log = WriteBehindLog(WRITE_BEHIND_DIR)
+    return _log
+
+
+def enqueue_response(validated_data, ip_address):
+    """إلحاق رد تم التحقق منه بالسجل، يعيد ingest_id"""
+    ingest_id = str(uuid.uuid4())
+    get_write_behind_log().append({
+        'ingest_id': ingest_id,
+        'form_id': validated_data['form'].pk,
+        'schema_version_id': validated_data['schema_version_id'],
+        'response_data': validated_data['response_data'],
+        'submitter_name': validated_data['submitter_name'],
+        'submitter_email': validated_data.get('submitter_email'),
+        'ip_address': ip_address,
+        'submitted_at': timezone.now().isoformat(),
+    })
+    return ingest_id
+
+
+def recover_abandoned_segments():
+    """بدء التفريغ الخلفي عند التشغيل إذا بقيت مقاطع من عملية توقفت قبل تفريغها"""
+    if not WRITE_BEHIND_ENABLED:
+        return
+    log = get_write_behind_log()
+    if log.has_pending():
+        log.start()
@@ -97,7 +97,7 @@ class CitizenFeedbackAdmin(admin.ModelAdmin):
     )
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('related_entity', 'assigned_to')
+        return super().get_queryset(request).select_related('assigned_to')
 
 @admin.register(FormSubmission)
 class FormSubmissionAdmin(admin.ModelAdmin):
@@ -0,0 +1,22 @@
+# forms/bulk.py
+# إدراج صفوف الفهارس المساعدة بعبارة INSERT واحدة مكررة (executemany) دون إنشاء كائنات النماذج
+
+from django.db import connection
+
+
+def insert_rows(model, fields, rows):
+    """إدراج rows (قيم بترتيب fields) في جدول model
+
+    للجداول المشتقة ذات الأعمدة البسيطة فقط: لا تُطبَّق القيم الافتراضية ولا pre_save ولا الإشارات.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(model._meta.get_field(name).column) for name in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote(model._meta.db_table)} ({columns}) VALUES ({placeholders})', rows
+        )
+    return len(rows)
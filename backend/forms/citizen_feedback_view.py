@@ -1,8 +1,9 @@
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from .models import CitizenFeedback
-from .serializers import CitizenFeedbackCreateSerializer
+from django.db import transaction
+from .models import CitizenFeedback, FormSubmission
+from .serializers import CitizenFeedbackCreateSerializer, is_anonymous_submission
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,7 +17,7 @@ def create_citizen_feedback(request):
         data = request.data.copy()
         
         # التحقق من الإرسال المجهول
-        is_anonymous = data.get('is_anonymous', False)
+        is_anonymous = is_anonymous_submission(data)
         
         if is_anonymous:
             # في الإرسال المجهول، نضع قيم افتراضية للحقول المطلوبة
@@ -30,15 +31,17 @@ def create_citizen_feedback(request):
         serializer = CitizenFeedbackCreateSerializer(data=data)
         
         if serializer.is_valid():
-            # حفظ البيانات
-            feedback = serializer.save()
+            # حفظ البيانات وتسجيل التقديم معاً
+            with transaction.atomic():
+                feedback = serializer.save()
+                submission = FormSubmission.record_feedback(feedback, request.user, is_anonymous)
             
             # إرسال الاستجابة
             response_data = {
                 'id': feedback.id,
                 'message': 'تم إرسال الملاحظة بنجاح',
                 'is_anonymous': is_anonymous,
-                'reference_number': f'CF-{feedback.id:06d}'
+                'reference_number': submission.reference_number
             }
             
             return Response(response_data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,223 @@
+# forms/duplicates.py
+# كشف الملاحظات شبه المتطابقة بتواقيع MinHash وفهرس LSH محفوظ في قاعدة البيانات
+
+import hashlib
+import struct
+import zlib
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+
+from .models import CitizenFeedback, FeedbackLSHBand, FeedbackSignature
+from .search import stem, tokenize
+
+# 64 دالة hash في 16 حزمة من 4 قيم: احتمال أن تصبح ملاحظتان مرشحتين 1 - (1 - J^4)^16،
+# أي 0.9998 تقريباً عند تشابه 0.8 و0.12 عند 0.3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# أدنى تشابه Jaccard مقدّر لاعتبار الملاحظتين تكراراً
+DUPLICATE_THRESHOLD = getattr(settings, 'FORMS_DUPLICATE_THRESHOLD', 0.7)
+# عدد المرشحين المقارنين لكل ملاحظة (الأحدث أولاً) حتى لا تتضخم كلفة الحزم الشائعة
+MAX_CANDIDATES = 200
+# حد المعاملات في عبارة واحدة (SQL Server يقبل 2100 معامل على الأكثر)
+IDS_CHUNK_SIZE = 1000
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_SIGNATURE_FORMAT = f'<{NUM_PERM}I'
+
+
+def _coefficient(name, index):
+    digest = hashlib.blake2b(f'{name}:{index}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % _PRIME
+
+
+# معاملات ثابتة حتى تبقى التواقيع المحفوظة قابلة للمقارنة بين العمليات والإصدارات
+_PERMUTATIONS = [(_coefficient('a', index) or 1, _coefficient('b', index)) for index in range(NUM_PERM)]
+
+
+def shingles(instance):
+    """وحدات المقارنة: أزواج الكلمات المتتالية من العنوان والوصف، وكلمات اسم الجهة المعنية
+
+    الكلمات بعد التطبيع وحذف أداة التعريف حتى لا يفرق اختلاف الكتابة بين شكويين متطابقتين.
+    """
+    words = [stem(token) for token in tokenize(f'{instance.title} {instance.description}')]
+    units = {' '.join(pair) for pair in zip(words, words[1:])} if len(words) > 1 else set(words)
+    units.update(f'@{stem(token)}' for token in tokenize(instance.related_entity))
+    return {zlib.crc32(unit.encode()) for unit in units}
+
+
+def minhash(hashes):
+    return [min(((a * value + b) % _PRIME) & _MASK for value in hashes) for a, b in _PERMUTATIONS]
+
+
+def pack(signature):
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack(data):
+    return struct.unpack(_SIGNATURE_FORMAT, bytes(data))
+
+
+def band_buckets(signature):
+    """(رقم الحزمة, hash قيمها) - تشترك الملاحظتان في الحزمة إذا تطابقت قيمها الأربع"""
+    for band in range(BANDS):
+        values = struct.pack(f'<{ROWS}I', *signature[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(values, digest_size=8).digest()
+        yield band, int.from_bytes(digest, 'big', signed=True)
+
+
+def similarity(first, second):
+    """تقدير تشابه Jaccard من نسبة القيم المتطابقة في التوقيعين"""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _stored_candidates(keys):
+    """{(الحزمة, القيمة): معرفات الملاحظات} من فهرس LSH - كل شرط يُقرأ بفهرس feedback_lsh_idx"""
+    candidates = {}
+    for chunk in _chunks(keys, IDS_CHUNK_SIZE // 2):
+        condition = reduce(or_, (Q(band=band, bucket=bucket) for band, bucket in chunk))
+        rows = FeedbackLSHBand.objects.filter(condition).values_list('band', 'bucket', 'feedback_id')
+        for band, bucket, feedback_id in rows:
+            candidates.setdefault((band, bucket), set()).add(feedback_id)
+    return candidates
+
+
+def _stored_signatures(ids):
+    """{المعرف: التوقيع} و{المعرف: المجموعة} للمرشحين"""
+    signatures = {}
+    roots = {}
+    for chunk in _chunks(ids, IDS_CHUNK_SIZE):
+        rows = FeedbackSignature.objects.filter(feedback_id__in=chunk).values_list(
+            'feedback_id', 'signature', 'feedback__cluster_root_id'
+        )
+        for feedback_id, signature, root in rows:
+            signatures[feedback_id] = unpack(signature)
+            roots[feedback_id] = root
+    return signatures, roots
+
+
+def link_duplicates(instances):
+    """فهرسة الملاحظات في LSH وربط كل منها بمجموعة أشبه ملاحظة لها
+
+    المرشحون هم الملاحظات التي تشترك معها في حزمة واحدة على الأقل، فتبقى الكلفة مرتبطة
+    بعدد الملاحظات المتشابهة لا بحجم الجدول. المجموعة تُعرَّف بأقدم ملاحظة فيها (cluster_root).
+    يعيد {معرف الملاحظة: معرف المجموعة} للملاحظات التي تغيرت مجموعتها.
+    """
+    entries = []
+    for instance in sorted(instances, key=lambda item: item.pk):
+        hashes = shingles(instance)
+        if hashes:
+            signature = minhash(hashes)
+            entries.append((instance.pk, signature, list(band_buckets(signature))))
+    if not entries:
+        return {}
+
+    own_ids = [pk for pk, _, _ in entries]
+    links = {}
+    with transaction.atomic():
+        # إعادة الفهرسة قابلة للتكرار: تُستبدل صفوف الملاحظات نفسها
+        for chunk in _chunks(own_ids, IDS_CHUNK_SIZE):
+            FeedbackLSHBand.objects.filter(feedback_id__in=chunk).delete()
+            FeedbackSignature.objects.filter(feedback_id__in=chunk).delete()
+
+        stored = _stored_candidates({key for _, _, buckets in entries for key in buckets})
+        signatures, roots = _stored_signatures(set().union(*stored.values()) if stored else ())
+
+        # الملاحظات السابقة في نفس الدفعة مرشحة أيضاً
+        batch = {}
+        for pk, signature, buckets in entries:
+            candidates = set()
+            for key in buckets:
+                candidates.update(stored.get(key, ()))
+                candidates.update(batch.get(key, ()))
+            best, best_score = None, 0
+            for candidate in sorted(candidates, reverse=True)[:MAX_CANDIDATES]:
+                score = similarity(signature, signatures[candidate])
+                if score >= DUPLICATE_THRESHOLD and score > best_score:
+                    best, best_score = candidate, score
+
+            if best is not None:
+                root = roots.get(best) or min(best, pk)
+                if roots.get(best) != root:
+                    roots[best] = links[best] = root
+                roots[pk] = links[pk] = root
+            signatures[pk] = signature
+            for key in buckets:
+                batch.setdefault(key, []).append(pk)
+
+        FeedbackSignature.objects.bulk_create(
+            [FeedbackSignature(feedback_id=pk, signature=pack(signature)) for pk, signature, _ in entries],
+            batch_size=IDS_CHUNK_SIZE,
+        )
+        FeedbackLSHBand.objects.bulk_create(
+            [
+                FeedbackLSHBand(feedback_id=pk, band=band, bucket=bucket)
+                for pk, _, buckets in entries for band, bucket in buckets
+            ],
+            batch_size=IDS_CHUNK_SIZE,
+        )
+
+        by_root = {}
+        for pk, root in links.items():
+            by_root.setdefault(root, []).append(pk)
+        for root, ids in by_root.items():
+            for chunk in _chunks(ids, IDS_CHUNK_SIZE):
+                CitizenFeedback.objects.filter(id__in=chunk).update(cluster_root_id=root)
+
+    for instance in instances:
+        if instance.pk in links:
+            instance.cluster_root_id = links[instance.pk]
+    return links
+
+
+def cluster_members(feedback):
+    """كل ملاحظات مجموعة التكرار التي تنتمي لها feedback (أو feedback وحدها)"""
+    if feedback.cluster_root_id is None:
+        return CitizenFeedback.objects.filter(pk=feedback.pk)
+    return CitizenFeedback.objects.filter(cluster_root_id=feedback.cluster_root_id)
+
+
+def cluster_summaries(members, min_size=2, limit=50):
+    """أكبر مجموعات التكرار التي تضم ملاحظة واحدة على الأقل من members
+
+    الحجم وعدد الملاحظات قيد المراجعة محسوبان على المجموعة كاملة باستعلام تجميع واحد،
+    ثم يُقرأ عنوان الملاحظة الأولى لكل مجموعة باستعلام ثانٍ.
+    """
+    roots = members.filter(cluster_root__isnull=False).order_by().values('cluster_root')
+    clusters = list(
+        CitizenFeedback.objects.filter(cluster_root__in=roots)
+        .order_by().values('cluster_root')
+        .annotate(
+            size=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            latest_at=Max('created_at'),
+        )
+        .filter(size__gte=min_size)
+        .order_by('-size', '-latest_at')[:limit]
+    )
+    titles = dict(
+        CitizenFeedback.objects.filter(id__in=[row['cluster_root'] for row in clusters])
+        .values_list('id', 'title')
+    )
+    return [
+        {
+            'cluster': row['cluster_root'],
+            'title': titles.get(row['cluster_root'], ''),
+            'size': row['size'],
+            'pending': row['pending'],
+            'latest_at': row['latest_at'],
+        }
+        for row in clusters
+    ]
@@ -0,0 +1,133 @@
+# forms/filters.py
+# مرشحات تصريحية لمعاملات الاستعلام - كل مرشح يطابق عموداً مفهرساً
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import CitizenFeedback
+from .search import query_tokens, search
+
+
+class ChoiceFilter:
+    """مساواة على عمود، مع قبول عدة قيم مفصولة بفاصلة (IN)"""
+
+    def __init__(self, field, choices=None):
+        self.field = field
+        self.allowed = {value for value, _ in choices} if choices else None
+
+    def values(self, raw):
+        return [value.strip() for value in raw.split(',') if value.strip()]
+
+    def is_effective(self, raw):
+        return bool(self.values(raw))
+
+    def apply(self, queryset, raw):
+        values = self.values(raw)
+        if not values:
+            return queryset
+        if self.allowed is not None:
+            invalid = [value for value in values if value not in self.allowed]
+            if invalid:
+                raise ValidationError(f'قيمة غير صحيحة: {", ".join(invalid)}')
+        if len(values) == 1:
+            return queryset.filter(**{self.field: values[0]})
+        return queryset.filter(**{f'{self.field}__in': values})
+
+
+class IdFilter(ChoiceFilter):
+    """معرف أو عدة معرفات مفصولة بفاصلة"""
+
+    def apply(self, queryset, raw):
+        invalid = [value for value in raw.split(',') if value.strip() and not value.strip().isdigit()]
+        if invalid:
+            raise ValidationError(f'معرف غير صحيح: {", ".join(invalid)}')
+        return super().apply(queryset, raw)
+
+
+class DateTimeRangeFilter:
+    """حد أدنى أو أعلى لعمود تاريخ
+
+    التاريخ بدون وقت يُحوَّل إلى حدود يوم كامل بدل lookup __date حتى يبقى الفهرس مستخدماً.
+    """
+
+    def __init__(self, field, bound):
+        self.field = field
+        self.bound = bound
+
+    def parse(self, raw):
+        day = parse_date(raw)
+        if day is not None:
+            if self.bound == 'lt':
+                # الحد الأعلى شامل لليوم كله
+                day += timedelta(days=1)
+            return timezone.make_aware(datetime.combine(day, time.min))
+        value = parse_datetime(raw)
+        if value is None:
+            raise ValueError(raw)
+        return value if timezone.is_aware(value) else timezone.make_aware(value)
+
+    def is_effective(self, raw):
+        return bool(raw.strip())
+
+    def apply(self, queryset, raw):
+        try:
+            value = self.parse(raw.strip())
+        except ValueError:
+            raise ValidationError(f'صيغة التاريخ غير صحيحة: {raw}')
+        return queryset.filter(**{f'{self.field}__{self.bound}': value})
+
+
+class SearchFilter:
+    """بحث نصي عبر فهرس البحث"""
+
+    def is_effective(self, raw):
+        # نص لا يبقى منه مصطلح قابل للبحث لا يصفي شيئاً
+        return bool(query_tokens(raw))
+
+    def apply(self, queryset, raw):
+        return search(queryset, raw)
+
+
+class FilterSet:
+    """تطبيق المرشحات المعرّفة في filters على معاملات الطلب المطابقة لأسمائها"""
+    filters = {}
+
+    @classmethod
+    def filter_queryset(cls, queryset, params):
+        for name, query_filter in cls.filters.items():
+            raw = params.get(name)
+            if raw:
+                queryset = query_filter.apply(queryset, raw)
+        return queryset
+
+    @classmethod
+    def validate_conditions(cls, params):
+        """للعمليات الجماعية: رفض المفاتيح غير المعروفة والمرشحات التي لا تضيف شرطاً
+
+        المرشح الذي لا يضيف شرطاً يطابق الجدول كله، فالتعديل الجماعي يجب ألا يقبله.
+        """
+        unknown = sorted(set(params) - set(cls.filters))
+        if unknown:
+            raise ValidationError({
+                'filter': f'مرشحات غير معروفة: {", ".join(unknown)}. المسموحة: {", ".join(cls.filters)}'
+            })
+        if not any(raw and cls.filters[name].is_effective(raw) for name, raw in params.items()):
+            raise ValidationError({'filter': 'المرشح لا يحدد أي شرط'})
+
+
+class CitizenFeedbackFilterSet(FilterSet):
+    # لكل مرشح مساواة فهرس مركب (العمود, -created_at, id) في CitizenFeedback.Meta
+    filters = {
+        'status': ChoiceFilter('status', CitizenFeedback.STATUS_CHOICES),
+        'feedback_type': ChoiceFilter('feedback_type', CitizenFeedback.FEEDBACK_TYPES),
+        'priority': ChoiceFilter('priority', CitizenFeedback.PRIORITY_LEVELS),
+        'governorate': ChoiceFilter('governorate'),
+        'created_after': DateTimeRangeFilter('created_at', 'gte'),
+        'created_before': DateTimeRangeFilter('created_at', 'lt'),
+        'search': SearchFilter(),
+        # مجموعات التكرار صغيرة، يكفيها فهرس المفتاح الأجنبي cluster_root
+        'cluster': IdFilter('cluster_root'),
+    }
@@ -0,0 +1,352 @@
+# forms/importer.py
+# استيراد الجهات الحكومية من ملفات CSV وXLSX كتدفق صفوف على دفعات
+
+import csv
+import io
+import os
+import re
+import zipfile
+from collections import Counter
+from datetime import date, timedelta
+from xml.etree.ElementTree import ParseError, fromstring, iterparse
+
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+
+from .models import EntityAlias, GovernmentEntity
+from .resolver import entity_key, index_entities
+from .rollups import adjust, rollup_key
+from .search import index_documents, normalize_arabic
+from .serializers import GovernmentEntityCreateSerializer
+
+IMPORT_FORMATS = ('csv', 'xlsx')
+# عدد الصفوف المتحقق منها والمدرجة في كل دفعة (ومعاملة)
+IMPORT_BATCH_SIZE = 1000
+# حد أخطاء الصفوف في التقرير، وتبقى الأعداد الكلية صحيحة بعده
+MAX_REPORTED_ERRORS = 1000
+# حد المعاملات في عبارة واحدة (SQL Server يقبل 2100 معامل على الأكثر)
+IDS_CHUNK_SIZE = 1000
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+# التواريخ في XLSX أرقام أيام منذ هذا التاريخ
+_EXCEL_EPOCH = date(1899, 12, 30)
+_NUMBER = re.compile(r'\d+(\.\d+)?')
+_WHOLE_FLOAT = re.compile(r'\+?\d+\.0')
+
+BOOLEAN_ALIASES = {'نعم': 'true', 'لا': 'false'}
+
+
+def detect_format(filename, requested=None):
+    """الصيغة المطلوبة صراحة أو امتداد اسم الملف"""
+    extension = (requested or os.path.splitext(filename or '')[1].lstrip('.')).lower()
+    if extension not in IMPORT_FORMATS:
+        raise ValidationError({'format': f'الصيغ المدعومة: {", ".join(IMPORT_FORMATS)}'})
+    return extension
+
+
+def iter_csv(fileobj):
+    """(رقم الصف, الخلايا) من ملف CSV بترميز UTF-8 مع BOM أو بدونه"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        for number, cells in enumerate(csv.reader(text), start=1):
+            yield number, cells
+    finally:
+        # الملف الأصلي يغلقه صاحبه
+        text.detach()
+
+
+def _first_sheet(archive):
+    """مسار ورقة العمل الأولى كما في workbook.xml"""
+    try:
+        workbook = fromstring(archive.read('xl/workbook.xml'))
+        rel_id = workbook.find(f'{_NS}sheets/{_NS}sheet').get(_REL_ID)
+        for rel in fromstring(archive.read('xl/_rels/workbook.xml.rels')):
+            if rel.get('Id') == rel_id:
+                target = rel.get('Target')
+                return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+    except (KeyError, AttributeError):
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _shared_strings(archive):
+    try:
+        source = archive.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with source:
+        for _, element in iterparse(source):
+            if element.tag == f'{_NS}si':
+                strings.append(''.join(node.text or '' for node in element.iter(f'{_NS}t')))
+                element.clear()
+    return strings
+
+
+def _column_index(reference):
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def _cell_value(cell, strings):
+    kind = cell.get('t')
+    if kind == 'inlineStr':
+        return ''.join(node.text or '' for node in cell.iter(f'{_NS}t'))
+    value = cell.findtext(f'{_NS}v') or ''
+    if kind == 's' and value:
+        return strings[int(value)]
+    return value
+
+
+def iter_xlsx(fileobj):
+    """(رقم الصف, الخلايا) من ورقة العمل الأولى بقراءة XML متدفقة
+
+    كل صف يُحذف من الشجرة بعد قراءته، فتبقى الذاكرة ثابتة مهما كبرت الورقة
+    (عدا جدول النصوص المشتركة sharedStrings).
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        strings = _shared_strings(archive)
+        with archive.open(_first_sheet(archive)) as sheet:
+            number = 0
+            for _, element in iterparse(sheet):
+                if element.tag != f'{_NS}row':
+                    continue
+                number = int(element.get('r') or number + 1)
+                cells = []
+                for cell in element.iter(f'{_NS}c'):
+                    reference = cell.get('r')
+                    position = _column_index(reference) if reference else len(cells)
+                    cells.extend([''] * (position - len(cells)))
+                    cells.append(_cell_value(cell, strings))
+                element.clear()
+                yield number, cells
+
+
+READERS = {'csv': iter_csv, 'xlsx': iter_xlsx}
+
+
+def read_rows(fileobj, file_format):
+    """صفوف الملف مع تحويل أخطاء القراءة إلى ValidationError"""
+    try:
+        yield from READERS[file_format](fileobj)
+    except UnicodeDecodeError:
+        raise ValidationError({'file': 'يجب أن يكون ملف CSV بترميز UTF-8'})
+    except (zipfile.BadZipFile, ParseError, KeyError):
+        raise ValidationError({'file': 'ملف XLSX غير صالح'})
+    except csv.Error as error:
+        raise ValidationError({'file': f'ملف CSV غير صالح: {error}'})
+
+
+class RowValidator:
+    """قواعد GovernmentEntityCreateSerializer مطبّقة عموداً عموداً على دفعة صفوف
+
+    حقول المسلسل تُبنى مرة واحدة بدل مسلسل لكل صف، وكل قيمة مميزة في العمود تُتحقق
+    مرة واحدة في الدفعة (الاختيارات والتواريخ والمناصب تتكرر كثيراً في ملفات الوزارات).
+    """
+
+    def __init__(self):
+        self.serializer = GovernmentEntityCreateSerializer()
+        self.fields = {name: field for name, field in self.serializer.fields.items() if not field.read_only}
+        # قبول التسمية العربية للاختيار (بغداد) إضافة إلى قيمته (baghdad)
+        self.choices = {
+            name: {normalize_arabic(label): value for value, label in field.choices.items()}
+            for name, field in self.fields.items() if isinstance(field, serializers.ChoiceField)
+        }
+        self._memo = {}
+
+    def headers(self, cells):
+        """اسم الحقل لكل عمود من اسمه أو تسميته العربية (None للأعمدة غير المعروفة)"""
+        names = {}
+        for name, field in self.fields.items():
+            names[normalize_arabic(name)] = name
+            if field.label:
+                names[normalize_arabic(field.label)] = name
+        return [names.get(normalize_arabic(cell).strip()) for cell in cells]
+
+    def prepare(self, name, field, raw):
+        if raw is empty:
+            return raw
+        raw = str(raw).strip()
+        if isinstance(field, serializers.ChoiceField):
+            return self.choices[name].get(normalize_arabic(raw), raw) if raw else empty
+        if isinstance(field, serializers.CharField):
+            # الأرقام الطويلة (الهواتف) تُحفظ في Excel كأعداد عشرية
+            return raw[:-2] if _WHOLE_FLOAT.fullmatch(raw) else raw
+        if not raw:
+            return empty
+        if isinstance(field, serializers.BooleanField):
+            return BOOLEAN_ALIASES.get(raw, raw)
+        raw = normalize_arabic(raw).replace(',', '').replace('٬', '')
+        if isinstance(field, serializers.DateField) and _NUMBER.fullmatch(raw):
+            return (_EXCEL_EPOCH + timedelta(days=int(float(raw)))).isoformat()
+        return raw
+
+    def run(self, name, field, raw):
+        key = (name, raw)
+        if key not in self._memo:
+            try:
+                self._memo[key] = (field.run_validation(raw), None)
+            except (SkipField, serializers.ValidationError) as error:
+                self._memo[key] = (None, error)
+        value, error = self._memo[key]
+        if error is not None:
+            raise error
+        return value
+
+    def validate(self, rows):
+        """rows: [(رقم الصف, البيانات)] -> ([(رقم الصف, القيم)], [(رقم الصف, الأخطاء)])"""
+        self._memo = {}
+        values = [{} for _ in rows]
+        errors = [{} for _ in rows]
+        for name, field in self.fields.items():
+            for index, (_, data) in enumerate(rows):
+                try:
+                    values[index][name] = self.run(name, field, self.prepare(name, field, data.get(name, empty)))
+                except SkipField:
+                    pass
+                except serializers.ValidationError as error:
+                    errors[index][name] = error.detail
+
+        valid = []
+        invalid = []
+        for (number, _), attrs, row_errors in zip(rows, values, errors):
+            if not row_errors:
+                try:
+                    valid.append((number, self.serializer.validate(attrs)))
+                    continue
+                except serializers.ValidationError as error:
+                    row_errors = serializers.as_serializer_error(error)
+            invalid.append((number, row_errors))
+        return valid, invalid
+
+
+def _messages(detail):
+    if isinstance(detail, dict):
+        return {name: _messages(value) for name, value in detail.items()}
+    if isinstance(detail, list):
+        return [str(message) for message in detail]
+    return [str(detail)]
+
+
+def existing_keys(keys):
+    """{(الاسم المطبّع, المحافظة): معرف الجهة} للمفاتيح الموجودة - من فهرس entity_alias_idx"""
+    found = {}
+    names = sorted({name for name, _ in keys})
+    for start in range(0, len(names), IDS_CHUNK_SIZE):
+        aliases = EntityAlias.objects.filter(name__in=names[start:start + IDS_CHUNK_SIZE])
+        for name, governorate, entity_id in aliases.values_list('name', 'governorate', 'entity_id'):
+            if (name, governorate) in keys:
+                found.setdefault((name, governorate), entity_id)
+    return found
+
+
+def bulk_insert_entities(entities, batch_size=IMPORT_BATCH_SIZE):
+    """إدراج جهات جاهزة على دفعات داخل معاملة واحدة
+
+    bulk_create لا يرسل إشارات post_save، لذلك يُحدَّث هنا فهرس البحث وأسماء الجهات
+    والإحصائيات اليومية.
+    """
+    if not entities:
+        return []
+    with transaction.atomic():
+        created = GovernmentEntity.objects.bulk_create(entities, batch_size=batch_size)
+        index_documents('entity', created)
+        index_entities(created)
+        for key, count in Counter(rollup_key(entity) for entity in created).items():
+            adjust(GovernmentEntity, key, count)
+    return created
+
+
+class EntityImport:
+    """استيراد صفوف (رقم الصف, الخلايا) أولها عناوين الأعمدة، مع تقرير بنتيجة كل صف غير مُدرج"""
+
+    def __init__(self, user=None, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+        self.user = user
+        self.dry_run = dry_run
+        self.batch_size = batch_size
+        self.validator = RowValidator()
+        # المفاتيح المستوردة من هذا الملف -> رقم الصف، لكشف التكرار داخل الملف
+        self.seen = {}
+        self.report = {
+            'rows': 0, 'created': 0, 'duplicates': 0, 'failed': 0,
+            'dry_run': dry_run, 'ignored_columns': [], 'errors': [],
+        }
+
+    def add_error(self, number, status, errors, entity=None):
+        self.report['duplicates' if status == 'duplicate' else 'failed'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ERRORS:
+            entry = {'row': number, 'status': status, 'errors': _messages(errors)}
+            if entity is not None:
+                entry['entity'] = entity
+            self.report['errors'].append(entry)
+
+    def run(self, rows):
+        try:
+            rows = iter(rows)
+            header = next(rows, None)
+            if header is None:
+                raise ValidationError({'file': 'الملف فارغ'})
+            columns = self.validator.headers(header[1])
+            missing = [
+                name for name, field in self.validator.fields.items()
+                if field.required and name not in columns
+            ]
+            if missing:
+                raise ValidationError({'file': f'أعمدة مطلوبة غير موجودة: {", ".join(missing)}'})
+            self.report['ignored_columns'] = [
+                cell for cell, name in zip(header[1], columns) if name is None and cell.strip()
+            ]
+
+            batch = []
+            for number, cells in rows:
+                if not any(str(cell).strip() for cell in cells):
+                    continue
+                batch.append((number, {name: cell for name, cell in zip(columns, cells) if name is not None}))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+            self.import_batch(batch)
+        except ValidationError as error:
+            # الدفعات السابقة للخطأ أُدرجت، والتقرير يوضح عددها
+            self.report['error'] = _messages(error.detail)
+        self.report['errors'].sort(key=lambda entry: entry['row'])
+        self.report['errors_truncated'] = self.report['duplicates'] + self.report['failed'] > MAX_REPORTED_ERRORS
+        return self.report
+
+    def import_batch(self, batch):
+        if not batch:
+            return
+        self.report['rows'] += len(batch)
+        valid, invalid = self.validator.validate(batch)
+        for number, errors in invalid:
+            self.add_error(number, 'invalid', errors)
+
+        keys = {number: (entity_key(attrs['entity_name']), attrs['governorate']) for number, attrs in valid}
+        existing = existing_keys({key for key in keys.values() if key[0]})
+        entities = []
+        for number, attrs in valid:
+            key = keys[number]
+            if key in existing:
+                self.add_error(number, 'duplicate', {'entity_name': 'الجهة موجودة مسبقاً'}, existing[key])
+                continue
+            if key[0] and key in self.seen:
+                self.add_error(number, 'duplicate', {'entity_name': f'مكررة في الملف (الصف {self.seen[key]})'})
+                continue
+            if key[0]:
+                self.seen[key] = number
+            entities.append(GovernmentEntity(submitted_by=self.user, **attrs))
+
+        if not self.dry_run:
+            bulk_insert_entities(entities, self.batch_size)
+        self.report['created'] += len(entities)
+
+
+def import_file(fileobj, file_format, user=None, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    return EntityImport(user, dry_run, batch_size).run(read_rows(fileobj, file_format))
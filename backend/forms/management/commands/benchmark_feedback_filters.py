@@ -0,0 +1,132 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from forms.filters import CitizenFeedbackFilterSet
+from forms.models import CitizenFeedback
+
+# تركيبات المرشحات التي تُفحص خطة تنفيذها
+# بدون مرشحات لا يوجد شرط يُبحث به في فهرس، فترتيب القائمة يغطيه ترقيم المؤشر
+FILTER_COMBINATIONS = [
+    {'status': 'pending'},
+    {'feedback_type': 'complaint'},
+    {'priority': 'urgent'},
+    {'governorate': 'baghdad'},
+    {'status': 'pending,in_progress'},
+    {'status': 'pending', 'priority': 'urgent'},
+    {'status': 'in_progress', 'feedback_type': 'complaint'},
+    {'feedback_type': 'report', 'governorate': 'basra'},
+    {'created_after': '2024-01-01', 'created_before': '2024-01-31'},
+    {'status': 'pending', 'created_after': '2024-06-01'},
+    {'priority': 'high', 'governorate': 'najaf', 'created_before': '2024-12-31'},
+]
+
+# خطوات تبحث في فهرس بشرط: SEARCH في SQLite و Index Cond في PostgreSQL
+SEEK_MARKERS = ('SEARCH ', 'Index Cond:')
+# خطوات تقرأ الجدول أو فهرساً كاملاً ثم تصفي الصفوف، مثل SCAN ... USING INDEX في SQLite
+SCAN_MARKERS = ('SCAN ', 'Seq Scan')
+
+# عدد الصفوف التي تشترك في تاريخ إنشاء واحد - تحديث لكل مجموعة بدل كل صف
+TIMESTAMP_GROUP_SIZE = 100
+
+GOVERNORATES = ['baghdad', 'basra', 'nineveh', 'erbil', 'najaf', 'karbala', 'babylon', 'anbar']
+
+
+def plan_uses_index(plan):
+    """الخطة تبحث في فهرس بشرط المرشح ولا تمسح الجدول أو فهرساً كاملاً في أي خطوة"""
+    lines = plan.splitlines()
+    if any(marker in line for line in lines for marker in SCAN_MARKERS):
+        return False
+    return any(marker in line for line in lines for marker in SEEK_MARKERS)
+
+
+class Command(BaseCommand):
+    help = 'فحص خطط تنفيذ مرشحات ملاحظات المواطنين على بيانات تجريبية (تُلغى في النهاية)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help='عدد الصفوف التجريبية')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--verbose-plans', action='store_true', help='طباعة خطة التنفيذ كاملة')
+        parser.add_argument(
+            '--i-know', action='store_true',
+            help='التشغيل على قاعدة بيانات غير تجريبية رغم إدراج الصفوف فيها داخل معاملة طويلة',
+        )
+
+    def handle(self, *args, **options):
+        if not connection.features.supports_explaining_query_execution:
+            raise CommandError(f'قاعدة البيانات {connection.vendor} لا تدعم EXPLAIN عبر Django')
+        name = str(connection.settings_dict['NAME'])
+        is_scratch = connection.vendor == 'sqlite' or name.startswith('test_')
+        if not is_scratch and not options['i_know']:
+            raise CommandError(
+                f'سيُدرج {options["rows"]} صف في قاعدة البيانات {name} ويقفل الجدول حتى النهاية. '
+                'استخدم قاعدة sqlite أو test_* أو أضف --i-know'
+            )
+
+        failures = []
+        with transaction.atomic():
+            self.seed(options['rows'], options['batch_size'])
+            self.analyze()
+            for params in FILTER_COMBINATIONS:
+                if not self.check_plan(params, options['page_size'], options['verbose_plans']):
+                    failures.append(params)
+            # البيانات التجريبية لا تُحفظ
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'{len(failures)} تركيبة لا تستخدم فهرساً: {failures}')
+        self.stdout.write(self.style.SUCCESS('كل التركيبات تستخدم فهرساً'))
+
+    def seed(self, rows, batch_size):
+        rng = random.Random(42)
+        now = timezone.now()
+        for start in range(0, rows, batch_size):
+            created = CitizenFeedback.objects.bulk_create([
+                CitizenFeedback(
+                    citizen_name='مواطن',
+                    feedback_type=rng.choice(CitizenFeedback.FEEDBACK_TYPES)[0],
+                    title='ملاحظة تجريبية',
+                    description='',
+                    related_entity='',
+                    priority=rng.choice(CitizenFeedback.PRIORITY_LEVELS)[0],
+                    status=rng.choice(CitizenFeedback.STATUS_CHOICES)[0],
+                    governorate=rng.choice(GOVERNORATES),
+                )
+                for _ in range(min(batch_size, rows - start))
+            ])
+            # auto_now_add يضع وقت الإدراج، فتُوزع التواريخ على سنتين بتحديث لاحق
+            ids = [feedback.pk for feedback in created]
+            for offset in range(0, len(ids), TIMESTAMP_GROUP_SIZE):
+                CitizenFeedback.objects.filter(id__in=ids[offset:offset + TIMESTAMP_GROUP_SIZE]).update(
+                    created_at=now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+                )
+            self.stdout.write(f'{min(start + batch_size, rows)} صف...')
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(f'ANALYZE {CitizenFeedback._meta.db_table}')
+            elif connection.vendor == 'sqlite':
+                cursor.execute('ANALYZE')
+
+    def check_plan(self, params, page_size, verbose):
+        queryset = CitizenFeedbackFilterSet.filter_queryset(CitizenFeedback.objects.all(), params)
+        queryset = queryset.order_by('-created_at', 'id')[:page_size + 1]
+        plan = queryset.explain()
+
+        started = time.perf_counter()
+        list(queryset.values_list('id', flat=True))
+        elapsed = (time.perf_counter() - started) * 1000
+
+        uses_index = plan_uses_index(plan)
+        label = ' & '.join(f'{key}={value}' for key, value in params.items()) or '(بدون مرشحات)'
+        style = self.style.SUCCESS if uses_index else self.style.ERROR
+        self.stdout.write(style(f'{"INDEX" if uses_index else "SCAN "} {elapsed:8.1f}ms  {label}'))
+        if verbose or not uses_index:
+            self.stdout.write(plan)
+        return uses_index
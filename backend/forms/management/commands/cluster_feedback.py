@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from forms.duplicates import link_duplicates
+from forms.models import CitizenFeedback, FeedbackLSHBand, FeedbackSignature
+from forms.search import iter_chunks
+
+
+class Command(BaseCommand):
+    help = 'حساب تواقيع MinHash للملاحظات السابقة وتجميع الملاحظات شبه المتطابقة على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='حذف الفهرس والمجموعات الحالية وإعادة التجميع من البداية')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            FeedbackLSHBand.objects.all().delete()
+            FeedbackSignature.objects.all().delete()
+            CitizenFeedback.objects.filter(cluster_root__isnull=False).update(cluster_root=None)
+
+        # الملاحظات بترتيب المعرف، فترتبط كل ملاحظة بمجموعة أقدم ملاحظة مشابهة لها
+        documents = CitizenFeedback.objects.filter(signature__isnull=True).only(
+            'id', 'title', 'description', 'related_entity', 'cluster_root'
+        )
+        processed = 0
+        linked = 0
+        for chunk in iter_chunks(documents, options['batch_size']):
+            linked += len(link_duplicates(chunk))
+            processed += len(chunk)
+            self.stdout.write(f'{processed} ملاحظة...')
+
+        clusters = CitizenFeedback.objects.filter(cluster_root__isnull=False).values('cluster_root').distinct().count()
+        self.stdout.write(self.style.SUCCESS(
+            f'تمت معالجة {processed} ملاحظة: {linked} ربط في {clusters} مجموعة تكرار'
+        ))
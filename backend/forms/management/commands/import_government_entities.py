@@ -0,0 +1,54 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from accounts.models import User
+from forms.importer import IMPORT_BATCH_SIZE, IMPORT_FORMATS, EntityImport, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'استيراد الجهات الحكومية من ملف CSV أو XLSX على دفعات مع تقرير بأخطاء الصفوف'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسار ملف CSV أو XLSX')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='صيغة الملف (افتراضياً من الامتداد)')
+        parser.add_argument('--user', help='البريد الإلكتروني لمستخدم يُسجَّل كمقدم للجهات')
+        parser.add_argument('--dry-run', action='store_true', help='التحقق فقط دون إدراج')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--report', help='كتابة تقرير الصفوف غير المدرجة في ملف CSV')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f'المستخدم غير موجود: {options["user"]}')
+
+        try:
+            file_format = detect_format(options['path'], options['format'])
+        except ValidationError as error:
+            raise CommandError(error.detail['format'])
+        importer = EntityImport(user=user, dry_run=options['dry_run'], batch_size=options['batch_size'])
+        with open(options['path'], 'rb') as source:
+            report = importer.run(read_rows(source, file_format))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8-sig', newline='') as output:
+                writer = csv.writer(output)
+                writer.writerow(['row', 'status', 'entity', 'errors'])
+                for entry in report['errors']:
+                    messages = '; '.join(
+                        f'{field}: {" ".join(errors)}' for field, errors in entry['errors'].items()
+                    )
+                    writer.writerow([entry['row'], entry['status'], entry.get('entity', ''), messages])
+
+        if report['ignored_columns']:
+            self.stdout.write(f'أعمدة غير معروفة تم تجاهلها: {", ".join(report["ignored_columns"])}')
+        summary = (
+            f'{report["rows"]} صف: أُدرج {report["created"]}، مكرر {report["duplicates"]}، '
+            f'غير صالح {report["failed"]}' + (' (تجربة دون إدراج)' if report['dry_run'] else '')
+        )
+        if 'error' in report:
+            raise CommandError(f'{summary}\n{report["error"]}')
+        self.stdout.write(self.style.SUCCESS(summary))
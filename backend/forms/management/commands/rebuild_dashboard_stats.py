@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from forms.rollups import ROLLUPS, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'إعادة بناء جداول الإحصائيات اليومية للوحة التحكم من الجداول الأصلية'
+
+    def handle(self, *args, **options):
+        for model in ROLLUPS:
+            rows = rebuild_rollups(model)
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.verbose_name_plural}: {rows} صف إحصائي'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from forms.models import SearchTerm
+from forms.search import SEARCH_INDEXES, index_documents, iter_chunks
+
+
+class Command(BaseCommand):
+    help = 'بناء فهرس البحث للجهات الحكومية وملاحظات المواطنين على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', dest='kinds', choices=sorted(SEARCH_INDEXES),
+                            help='نوع المستندات المراد فهرستها (يمكن تكراره)')
+        parser.add_argument('--since', help='فهرسة المستندات المعدلة بعد هذا الوقت فقط (ISO 8601)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('صيغة --since غير صحيحة')
+
+        for kind in options['kinds'] or sorted(SEARCH_INDEXES):
+            model, fields = SEARCH_INDEXES[kind]
+            documents = model.objects.only('id', *fields)
+            if since is not None:
+                documents = documents.filter(updated_at__gte=since)
+            else:
+                # الفهرسة الكاملة تحذف أيضاً مصطلحات المستندات المحذوفة
+                SearchTerm.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('pk')).delete()
+
+            processed = 0
+            terms = 0
+            for chunk in iter_chunks(documents, options['batch_size']):
+                terms += index_documents(kind, chunk)
+                processed += len(chunk)
+                self.stdout.write(f'{kind}: {processed} مستند...')
+
+            self.stdout.write(self.style.SUCCESS(f'{kind}: تمت فهرسة {processed} مستند ({terms} مصطلح)'))
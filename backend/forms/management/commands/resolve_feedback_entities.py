@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from forms.models import CitizenFeedback, GovernmentEntity
+from forms.resolver import index_entities, resolve_feedback
+from forms.search import iter_chunks
+
+
+class Command(BaseCommand):
+    help = 'بناء فهرس أسماء الجهات وربط ملاحظات المواطنين بالجهة الحكومية المطابقة على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-index', action='store_true',
+                            help='استخدام فهرس أسماء الجهات الحالي دون إعادة بنائه')
+        parser.add_argument('--unresolved', action='store_true',
+                            help='معالجة الملاحظات غير المرتبطة بجهة فقط')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if not options['skip_index']:
+            # كل دفعة تستبدل صفوف جهاتها في معاملة واحدة، فيبقى الفهرس كاملاً للمطابقة أثناء
+            # إعادة البناء. الجهات المحذوفة تُحذف أسماؤها تلقائياً (CASCADE)
+            indexed = 0
+            for chunk in iter_chunks(GovernmentEntity.objects.only('id', 'entity_name', 'governorate'), batch_size):
+                indexed += index_entities(chunk)
+            self.stdout.write(f'تمت فهرسة {indexed} اسم جهة')
+
+        feedback = CitizenFeedback.objects.only('id', 'related_entity', 'governorate', 'resolved_entity')
+        if options['unresolved']:
+            feedback = feedback.filter(resolved_entity__isnull=True)
+
+        # نتائج المطابقة تُحفظ بين الدفعات لأن أسماء الجهات تتكرر كثيراً
+        cache = {}
+        processed = 0
+        changed = 0
+        for chunk in iter_chunks(feedback, batch_size):
+            changed += resolve_feedback(chunk, cache)
+            processed += len(chunk)
+            self.stdout.write(f'{processed} ملاحظة...')
+
+        unresolved = CitizenFeedback.objects.filter(resolved_entity__isnull=True).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'تمت معالجة {processed} ملاحظة: تغيّرت جهة {changed}، وبقيت {unresolved} دون جهة مطابقة'
+        ))
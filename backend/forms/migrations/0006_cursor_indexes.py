@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0005_alter_citizenfeedback_admin_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['-created_at', 'id'], name='feedback_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formsubmission',
+            index=models.Index(fields=['-created_at', 'id'], name='submission_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='governmententity',
+            index=models.Index(fields=['-created_at', 'id'], name='gov_entity_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0006_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('entity', 'جهة حكومية'), ('feedback', 'ملاحظة مواطن')], max_length=20, verbose_name='نوع المستند')),
+                ('object_id', models.BigIntegerField(verbose_name='معرف المستند')),
+                ('term', models.CharField(max_length=64, verbose_name='المصطلح')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='الوزن')),
+            ],
+            options={
+                'verbose_name': 'مصطلح بحث',
+                'verbose_name_plural': 'فهرس البحث',
+                'indexes': [models.Index(fields=['kind', 'term', 'object_id'], name='search_term_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops', 'int8_ops']), models.Index(fields=['kind', 'object_id'], name='search_document_idx')],
+            },
+        ),
+    ]
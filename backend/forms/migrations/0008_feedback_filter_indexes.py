@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0007_search_terms'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['status', '-created_at', 'id'], name='feedback_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['feedback_type', '-created_at', 'id'], name='feedback_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['priority', '-created_at', 'id'], name='feedback_priority_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['governorate', '-created_at', 'id'], name='feedback_governorate_idx'),
+        ),
+    ]
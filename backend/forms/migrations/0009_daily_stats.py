@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:05
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def populate_daily_stats(apps, schema_editor):
+    rollups = [
+        ('GovernmentEntity', 'EntityDailyStat', ('governorate', 'entity_type', 'is_approved')),
+        ('CitizenFeedback', 'FeedbackDailyStat', ('feedback_type', 'priority', 'status')),
+    ]
+    for source_name, stat_name, dimensions in rollups:
+        source = apps.get_model('forms', source_name)
+        stat_model = apps.get_model('forms', stat_name)
+        counts = (
+            source.objects.order_by().annotate(day=TruncDate('created_at'))
+            .values_list('day', *dimensions).annotate(total=models.Count('id'))
+        )
+        fields = ('day',) + dimensions
+        stat_model.objects.bulk_create([
+            stat_model(count=row[-1], **dict(zip(fields, row[:-1])))
+            for row in counts
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0008_feedback_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('feedback_type', models.CharField(max_length=50, verbose_name='نوع الملاحظة')),
+                ('priority', models.CharField(max_length=20, verbose_name='الأولوية')),
+                ('status', models.CharField(max_length=20, verbose_name='الحالة')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'إحصائية يومية للملاحظات',
+                'verbose_name_plural': 'الإحصائيات اليومية للملاحظات',
+                'unique_together': {('day', 'feedback_type', 'priority', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EntityDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('governorate', models.CharField(max_length=50, verbose_name='المحافظة')),
+                ('entity_type', models.CharField(max_length=50, verbose_name='نوع الجهة')),
+                ('is_approved', models.BooleanField(verbose_name='تم الموافقة')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'إحصائية يومية للجهات',
+                'verbose_name_plural': 'الإحصائيات اليومية للجهات',
+                'unique_together': {('day', 'governorate', 'entity_type', 'is_approved')},
+            },
+        ),
+        migrations.RunPython(populate_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:07
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def repopulate_feedback_stats(apps, schema_editor):
+    # الصفوف الحالية مجمعة بدون المحافظة، يعاد بناؤها بالمفتاح الجديد
+    CitizenFeedback = apps.get_model('forms', 'CitizenFeedback')
+    FeedbackDailyStat = apps.get_model('forms', 'FeedbackDailyStat')
+    FeedbackDailyStat.objects.all().delete()
+    counts = (
+        CitizenFeedback.objects.order_by().annotate(day=TruncDate('created_at'))
+        .values_list('day', 'feedback_type', 'priority', 'status', 'governorate')
+        .annotate(total=models.Count('id'))
+    )
+    FeedbackDailyStat.objects.bulk_create([
+        FeedbackDailyStat(
+            day=day, feedback_type=feedback_type, priority=priority,
+            status=status, governorate=governorate, count=total,
+        )
+        for day, feedback_type, priority, status, governorate, total in counts
+    ], batch_size=1000)
+
+
+def clear_feedback_stats(apps, schema_editor):
+    # عند التراجع تتكرر المفاتيح بدون المحافظة، تُعاد بـ rebuild_dashboard_stats
+    apps.get_model('forms', 'FeedbackDailyStat').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0009_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='feedbackdailystat',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='feedbackdailystat',
+            name='governorate',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='المحافظة'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feedbackdailystat',
+            unique_together={('day', 'feedback_type', 'priority', 'status', 'governorate')},
+        ),
+        migrations.RunPython(repopulate_feedback_stats, clear_feedback_stats),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0010_feedback_stats_governorate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='citizenfeedback',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الحجز'),
+        ),
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['status', 'priority', 'created_at', 'id'], name='feedback_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0011_feedback_claims'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackSignature',
+            fields=[
+                ('feedback', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='forms.citizenfeedback', verbose_name='الملاحظة')),
+                ('signature', models.BinaryField(verbose_name='التوقيع')),
+            ],
+            options={
+                'verbose_name': 'توقيع ملاحظة',
+                'verbose_name_plural': 'تواقيع الملاحظات',
+            },
+        ),
+        migrations.AddField(
+            model_name='citizenfeedback',
+            name='cluster_root',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cluster_members', to='forms.citizenfeedback', verbose_name='مجموعة التكرار'),
+        ),
+        migrations.CreateModel(
+            name='FeedbackLSHBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField(verbose_name='رقم الحزمة')),
+                ('bucket', models.BigIntegerField(verbose_name='القيمة المجزأة')),
+                ('feedback', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_bands', to='forms.citizenfeedback', verbose_name='الملاحظة')),
+            ],
+            options={
+                'verbose_name': 'حزمة LSH',
+                'verbose_name_plural': 'فهرس LSH للملاحظات',
+                'indexes': [models.Index(fields=['band', 'bucket'], name='feedback_lsh_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0012_feedback_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='الاسم المطبّع')),
+                ('governorate', models.CharField(max_length=50, verbose_name='المحافظة')),
+            ],
+            options={
+                'verbose_name': 'اسم جهة',
+                'verbose_name_plural': 'أسماء الجهات المطبّعة',
+            },
+        ),
+        migrations.CreateModel(
+            name='EntityTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3, verbose_name='المقطع')),
+            ],
+            options={
+                'verbose_name': 'مقطع ثلاثي',
+                'verbose_name_plural': 'فهرس المقاطع الثلاثية للجهات',
+            },
+        ),
+        migrations.AddField(
+            model_name='citizenfeedback',
+            name='resolved_entity',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='feedback', to='forms.governmententity', verbose_name='الجهة المطابقة'),
+        ),
+        migrations.AddIndex(
+            model_name='citizenfeedback',
+            index=models.Index(fields=['resolved_entity', 'status'], name='feedback_entity_idx'),
+        ),
+        migrations.AddField(
+            model_name='entitytrigram',
+            name='entity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trigrams', to='forms.governmententity', verbose_name='الجهة'),
+        ),
+        migrations.AddField(
+            model_name='entityalias',
+            name='entity',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='forms.governmententity', verbose_name='الجهة'),
+        ),
+        migrations.AddIndex(
+            model_name='entitytrigram',
+            index=models.Index(fields=['trigram', 'entity'], name='entity_trigram_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entityalias',
+            index=models.Index(fields=['name', 'governorate'], name='entity_alias_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0013_entity_resolution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferenceWorker',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('host', models.CharField(max_length=255, verbose_name='الخادم')),
+                ('pid', models.PositiveIntegerField(verbose_name='رقم العملية')),
+                ('started_at', models.DateTimeField(auto_now_add=True, verbose_name='وقت البدء')),
+            ],
+            options={
+                'verbose_name': 'عامل أرقام مرجعية',
+                'verbose_name_plural': 'عمال الأرقام المرجعية',
+            },
+        ),
+    ]
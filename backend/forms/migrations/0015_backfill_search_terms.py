@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:30
+
+from django.db import migrations
+
+from forms.search import SEARCH_INDEXES, index_documents, iter_chunks
+
+BATCH_SIZE = 500
+
+
+def backfill_search_terms(apps, schema_editor):
+    # index_documents يقرأ الحقول المفهرسة والمفتاح فقط، فتكفي النماذج التاريخية
+    for kind, (model, fields) in SEARCH_INDEXES.items():
+        historical = apps.get_model('forms', model.__name__)
+        documents = historical.objects.only('id', *fields)
+        for chunk in iter_chunks(documents, BATCH_SIZE):
+            index_documents(kind, chunk)
+
+
+def clear_search_terms(apps, schema_editor):
+    apps.get_model('forms', 'SearchTerm').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0014_reference_workers'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_terms, clear_search_terms),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:40
+
+from django.db import migrations
+
+from forms.resolver import index_entities
+from forms.search import iter_chunks
+
+BATCH_SIZE = 1000
+
+
+def backfill_entity_aliases(apps, schema_editor):
+    # الاستيراد وربط الملاحظات يعتمدان على EntityAlias، فيُبنى للجهات الموجودة قبل 0013
+    GovernmentEntity = apps.get_model('forms', 'GovernmentEntity')
+    entities = GovernmentEntity.objects.only('id', 'entity_name', 'governorate')
+    for chunk in iter_chunks(entities, BATCH_SIZE):
+        index_entities(chunk)
+
+
+def clear_entity_aliases(apps, schema_editor):
+    apps.get_model('forms', 'EntityAlias').objects.all().delete()
+    apps.get_model('forms', 'EntityTrigram').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('forms', '0015_backfill_search_terms'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_entity_aliases, clear_entity_aliases),
+    ]
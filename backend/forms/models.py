@@ -1,5 +1,5 @@
 # forms/models.py
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.validators import RegexValidator
 from accounts.models import User
 
@@ -105,10 +105,18 @@ class GovernmentEntity(models.Model):
         verbose_name = 'الجهة الحكومية'
         verbose_name_plural = 'الجهات الحكومية'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='gov_entity_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.entity_name} - {self.get_entity_type_display()}"
 
+    def save(self, *args, **kwargs):
+        # الإشارات تحدّث فهرس البحث والإحصائيات اليومية داخل نفس المعاملة
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 class CitizenFeedback(models.Model):
     """نموذج ملاحظات المواطنين"""
     FEEDBACK_TYPES = [
@@ -177,6 +185,9 @@ class CitizenFeedback(models.Model):
     title = models.CharField(max_length=200, verbose_name='عنوان الملاحظة')
     description = models.TextField(verbose_name='وصف تفصيلي')
     related_entity = models.CharField(max_length=200, verbose_name='الجهة المعنية')
+    # الجهة الحكومية المطابقة لنص related_entity (فارغ إذا لم يُعثر على تطابق)
+    resolved_entity = models.ForeignKey(GovernmentEntity, on_delete=models.SET_NULL, null=True, blank=True,
+                                        related_name='feedback', verbose_name='الجهة المطابقة')
     
     # معلومات الأولوية والحالة
     priority = models.CharField(max_length=20, choices=PRIORITY_LEVELS, default='medium', verbose_name='الأولوية')
@@ -185,6 +196,11 @@ class CitizenFeedback(models.Model):
     # معلومات المتابعة
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, 
                                    verbose_name='مسند إلى')
+    # أول ملاحظة في مجموعة الملاحظات شبه المتطابقة (فارغ إذا لم يوجد تكرار)
+    cluster_root = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='cluster_members', verbose_name='مجموعة التكرار')
+    # وقت حجز الملاحظة من طابور المعالجة، تعود للطابور بعد انتهاء مدة الحجز
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='تاريخ الحجز')
     admin_notes = models.TextField(blank=True, verbose_name='ملاحظات الإدارة')
     resolution = models.TextField(blank=True, verbose_name='الحل المتخذ')
     
@@ -197,10 +213,30 @@ class CitizenFeedback(models.Model):
         verbose_name = 'ملاحظة المواطن'
         verbose_name_plural = 'ملاحظات المواطنين'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='feedback_created_idx'),
+            # مرشحات CitizenFeedbackFilterSet: مساواة على العمود ثم ترتيب المؤشر
+            models.Index(fields=['status', '-created_at', 'id'], name='feedback_status_idx'),
+            models.Index(fields=['feedback_type', '-created_at', 'id'], name='feedback_type_idx'),
+            models.Index(fields=['priority', '-created_at', 'id'], name='feedback_priority_idx'),
+            models.Index(fields=['governorate', '-created_at', 'id'], name='feedback_governorate_idx'),
+            # طابور المعالجة: الأعلى أولوية ثم الأقدم بين الملاحظات قيد المراجعة
+            models.Index(fields=['status', 'priority', 'created_at', 'id'], name='feedback_queue_idx'),
+            # عدد الملاحظات لكل جهة وحالة من الفهرس وحده
+            models.Index(fields=['resolved_entity', 'status'], name='feedback_entity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.citizen_name} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        # الإشارات تحدّث فهرس البحث والإحصائيات اليومية داخل نفس المعاملة
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+# محاولات توليد الرقم المرجعي عند التصادم
+REFERENCE_ATTEMPTS = 3
+
 class FormSubmission(models.Model):
     """نموذج لتتبع تقديم الاستمارات"""
     SUBMISSION_TYPES = [
@@ -209,6 +245,7 @@ class FormSubmission(models.Model):
     ]
     
     submission_type = models.CharField(max_length=50, choices=SUBMISSION_TYPES, verbose_name='نوع التقديم')
+    # فريد، فالبحث برقم المرجع يستخدم فهرس القيد مباشرة
     reference_number = models.CharField(max_length=20, unique=True, verbose_name='الرقم المرجعي')
     submitter_name = models.CharField(max_length=100, verbose_name='اسم المقدم')
     submitter_email = models.EmailField(verbose_name='بريد المقدم')
@@ -229,14 +266,186 @@ class FormSubmission(models.Model):
         verbose_name = 'تقديم استمارة'
         verbose_name_plural = 'تقديمات الاستمارات'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='submission_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.reference_number} - {self.submitter_name}"
     
+    @classmethod
+    def record(cls, instance, submitter_name, submitter_email):
+        """تسجيل تقديم جديد لجهة أو ملاحظة برقم مرجعي تلقائي"""
+        if isinstance(instance, CitizenFeedback):
+            links = {'submission_type': 'citizen_feedback', 'citizen_feedback': instance}
+        else:
+            links = {'submission_type': 'government_entity', 'government_entity': instance}
+        return cls.objects.create(
+            submitter_name=(submitter_name or '')[:100], submitter_email=submitter_email or '', **links
+        )
+
+    @classmethod
+    def record_feedback(cls, feedback, user, is_anonymous=False):
+        """تسجيل ملاحظة مواطن - الإرسال المجهول لا يُربط ببريد المستخدم المرسل"""
+        email = '' if is_anonymous else feedback.citizen_email or user.email
+        return cls.record(feedback, feedback.citizen_name, email)
+    
     def save(self, *args, **kwargs):
-        if not self.reference_number:
-            # إنشاء رقم مرجعي تلقائي
-            import random
-            import string
-            self.reference_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
-        super().save(*args, **kwargs)
+        if self.reference_number:
+            return super().save(*args, **kwargs)
+
+        # رقم مرجعي مرتب زمنياً، يُعاد توليده إذا تصادم مع رقم من عامل بنفس المعرف
+        from .references import new_reference
+        for attempt in range(REFERENCE_ATTEMPTS):
+            self.reference_number = new_reference(self.submission_type)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                collided = FormSubmission.objects.filter(reference_number=self.reference_number).exists()
+                if not collided or attempt == REFERENCE_ATTEMPTS - 1:
+                    raise
+
+class ReferenceWorker(models.Model):
+    """عملية تولد أرقاماً مرجعية: معرف العامل هو id بترقيم دائري على 1024 قيمة
+
+    كل عملية تحجز صفاً جديداً عند أول رقم مرجعي، فلا يتكرر معرف العامل بين أي 1024 عملية متتالية.
+    """
+    host = models.CharField(max_length=255, verbose_name='الخادم')
+    pid = models.PositiveIntegerField(verbose_name='رقم العملية')
+    started_at = models.DateTimeField(auto_now_add=True, verbose_name='وقت البدء')
+
+    class Meta:
+        verbose_name = 'عامل أرقام مرجعية'
+        verbose_name_plural = 'عمال الأرقام المرجعية'
+
+    def __str__(self):
+        return f"{self.id}: {self.host}:{self.pid}"
+
+class EntityDailyStat(models.Model):
+    """عدد الجهات الحكومية لكل يوم وتركيبة (المحافظة، النوع، الموافقة) - يُحدَّث عبر الإشارات"""
+    day = models.DateField(verbose_name='اليوم')
+    governorate = models.CharField(max_length=50, verbose_name='المحافظة')
+    entity_type = models.CharField(max_length=50, verbose_name='نوع الجهة')
+    is_approved = models.BooleanField(verbose_name='تم الموافقة')
+    count = models.IntegerField(default=0, verbose_name='العدد')
+
+    class Meta:
+        verbose_name = 'إحصائية يومية للجهات'
+        verbose_name_plural = 'الإحصائيات اليومية للجهات'
+        unique_together = ('day', 'governorate', 'entity_type', 'is_approved')
+
+    def __str__(self):
+        return f"{self.day} - {self.governorate} - {self.entity_type}: {self.count}"
+
+
+class FeedbackDailyStat(models.Model):
+    """عدد ملاحظات المواطنين لكل يوم وتركيبة (النوع، الأولوية، الحالة، المحافظة) - يُحدَّث عبر الإشارات"""
+    day = models.DateField(verbose_name='اليوم')
+    governorate = models.CharField(max_length=50, blank=True, default='', verbose_name='المحافظة')
+    feedback_type = models.CharField(max_length=50, verbose_name='نوع الملاحظة')
+    priority = models.CharField(max_length=20, verbose_name='الأولوية')
+    status = models.CharField(max_length=20, verbose_name='الحالة')
+    count = models.IntegerField(default=0, verbose_name='العدد')
+
+    class Meta:
+        verbose_name = 'إحصائية يومية للملاحظات'
+        verbose_name_plural = 'الإحصائيات اليومية للملاحظات'
+        unique_together = ('day', 'feedback_type', 'priority', 'status', 'governorate')
+
+    def __str__(self):
+        return f"{self.day} - {self.feedback_type} - {self.status}: {self.count}"
+
+
+class EntityAlias(models.Model):
+    """اسم مطبّع يشير إلى جهة حكومية - جدول البحث المباشر عن الجهة من النص الحر"""
+    name = models.CharField(max_length=200, verbose_name='الاسم المطبّع')
+    entity = models.ForeignKey(GovernmentEntity, on_delete=models.CASCADE, related_name='aliases',
+                               verbose_name='الجهة')
+    # نسخة من محافظة الجهة للتمييز بين الجهات المتشابهة الاسم في محافظات مختلفة
+    governorate = models.CharField(max_length=50, verbose_name='المحافظة')
+
+    class Meta:
+        verbose_name = 'اسم جهة'
+        verbose_name_plural = 'أسماء الجهات المطبّعة'
+        indexes = [
+            models.Index(fields=['name', 'governorate'], name='entity_alias_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class EntityTrigram(models.Model):
+    """مقاطع ثلاثية من الأسماء المطبّعة للمطابقة التقريبية عند فشل المطابقة التامة"""
+    entity = models.ForeignKey(GovernmentEntity, on_delete=models.CASCADE, related_name='trigrams',
+                               verbose_name='الجهة')
+    trigram = models.CharField(max_length=3, verbose_name='المقطع')
+
+    class Meta:
+        verbose_name = 'مقطع ثلاثي'
+        verbose_name_plural = 'فهرس المقاطع الثلاثية للجهات'
+        indexes = [
+            models.Index(fields=['trigram', 'entity'], name='entity_trigram_idx'),
+        ]
+
+    def __str__(self):
+        return self.trigram
+
+
+class FeedbackSignature(models.Model):
+    """توقيع MinHash لنص الملاحظة، يُستخدم لتقدير التشابه مع المرشحين"""
+    feedback = models.OneToOneField(CitizenFeedback, on_delete=models.CASCADE, primary_key=True,
+                                    related_name='signature', verbose_name='الملاحظة')
+    signature = models.BinaryField(verbose_name='التوقيع')
+
+    class Meta:
+        verbose_name = 'توقيع ملاحظة'
+        verbose_name_plural = 'تواقيع الملاحظات'
+
+    def __str__(self):
+        return f"{self.feedback_id}"
+
+
+class FeedbackLSHBand(models.Model):
+    """فهرس LSH: قيمة مجزأة لكل حزمة من التوقيع، الملاحظات المتشابهة تشترك في حزمة واحدة على الأقل"""
+    feedback = models.ForeignKey(CitizenFeedback, on_delete=models.CASCADE, related_name='lsh_bands',
+                                 verbose_name='الملاحظة')
+    band = models.PositiveSmallIntegerField(verbose_name='رقم الحزمة')
+    bucket = models.BigIntegerField(verbose_name='القيمة المجزأة')
+
+    class Meta:
+        verbose_name = 'حزمة LSH'
+        verbose_name_plural = 'فهرس LSH للملاحظات'
+        indexes = [
+            models.Index(fields=['band', 'bucket'], name='feedback_lsh_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.feedback_id}: {self.band}/{self.bucket}"
+
+
+class SearchTerm(models.Model):
+    """فهرس البحث المقلوب: مصطلح مطبّع لكل مستند مع وزنه"""
+    KINDS = [
+        ('entity', 'جهة حكومية'),
+        ('feedback', 'ملاحظة مواطن'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS, verbose_name='نوع المستند')
+    object_id = models.BigIntegerField(verbose_name='معرف المستند')
+    term = models.CharField(max_length=64, verbose_name='المصطلح')
+    weight = models.PositiveIntegerField(default=1, verbose_name='الوزن')
+
+    class Meta:
+        verbose_name = 'مصطلح بحث'
+        verbose_name_plural = 'فهرس البحث'
+        indexes = [
+            # opclasses تسمح لـ PostgreSQL باستخدام الفهرس مع LIKE 'term%' وتُتجاهل في غيرها
+            models.Index(fields=['kind', 'term', 'object_id'], name='search_term_idx',
+                         opclasses=['varchar_pattern_ops', 'varchar_pattern_ops', 'int8_ops']),
+            models.Index(fields=['kind', 'object_id'], name='search_document_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} - {self.term}"
@@ -0,0 +1,61 @@
+# forms/queue.py
+# طابور معالجة الملاحظات: حجز أول N ملاحظة لكل موظف دون تعارض بين الموظفين
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import CitizenFeedback
+
+# مدة الحجز قبل عودة الملاحظة غير المعالجة إلى الطابور
+CLAIM_TTL = timedelta(minutes=getattr(settings, 'FORMS_CLAIM_TTL_MINUTES', 30))
+MAX_CLAIM_SIZE = 100
+
+# ترتيب الأولويات في الطابور، يُقرأ كل مستوى بفهرس feedback_queue_idx
+PRIORITY_ORDER = ('urgent', 'high', 'medium', 'low')
+
+
+def claimable(now):
+    """ملاحظات قيد المراجعة غير مسندة، أو محجوزة وانتهت مدة حجزها"""
+    expired = now - CLAIM_TTL
+    return CitizenFeedback.objects.filter(status='pending').filter(
+        Q(assigned_to__isnull=True) | Q(claimed_at__lt=expired)
+    )
+
+
+def claim_next(user, count):
+    """حجز حتى count ملاحظة للموظف: الأعلى أولوية ثم الأقدم
+
+    على PostgreSQL وSQL Server تُقرأ المرشحات بـ FOR UPDATE SKIP LOCKED (READPAST)
+    فيتخطى كل موظف الصفوف التي يحجزها غيره بدل انتظارها. على SQLite لا يوجد قفل صفوف،
+    لكن الكتابة متسلسلة وشرط UPDATE يعيد التحقق فلا تُحجز الملاحظة مرتين، وإذا سبقه
+    موظف آخر إلى بعض المرشحين يعيد القراءة حتى يحجز count أو لا يبقى مرشحون.
+
+    على SQLite لا يُضمن الترتيب بين الموظفين المتزامنين: قد يحصل أحدهم على ملاحظات
+    أقل أولوية من ملاحظات حجزها غيره ثم تركها أو انتهى حجزها أثناء حجزه.
+    """
+    now = timezone.now()
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    claimed = 0
+    with transaction.atomic():
+        for priority in PRIORITY_ORDER:
+            while claimed < count:
+                remaining = count - claimed
+                candidates = claimable(now).filter(priority=priority).order_by('created_at', 'id')
+                if skip_locked:
+                    candidates = candidates.select_for_update(skip_locked=True)
+                ids = list(candidates.values_list('id', flat=True)[:remaining])
+                if ids:
+                    claimed += claimable(now).filter(id__in=ids).update(
+                        assigned_to=user, claimed_at=now, updated_at=now
+                    )
+                # أقل من المطلوب يعني أن المستوى نفد، وإلا فقد سبقه غيره إلى بعضها فيُعاد القراءة
+                if len(ids) < remaining:
+                    break
+
+    rank = {priority: index for index, priority in enumerate(PRIORITY_ORDER)}
+    items = CitizenFeedback.objects.select_related('assigned_to').filter(assigned_to=user, claimed_at=now)
+    return sorted(items, key=lambda item: (rank.get(item.priority, len(rank)), item.created_at, item.id)), now + CLAIM_TTL
@@ -0,0 +1,117 @@
+# forms/references.py
+# أرقام مرجعية مرتبة زمنياً وفريدة بين العمال على طريقة Snowflake
+
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# 41 بت للوقت بالمللي ثانية منذ EPOCH_MS (حوالي 69 سنة)، 10 بت للعامل، 12 بت للتسلسل
+EPOCH_MS = 1704067200000  # 2024-01-01 UTC
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Crockford base32: بدون I و L و O و U لتجنب الالتباس عند قراءة الرقم هاتفياً
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+# 64 بت = 13 محرفاً، بطول ثابت حتى يطابق الترتيب النصي الترتيب الزمني
+ENCODED_LENGTH = 13
+
+# بادئة لكل نوع تقديم
+PREFIXES = {
+    'citizen_feedback': 'CF',
+    'government_entity': 'GE',
+}
+
+
+def default_worker_id():
+    """معرف العامل من الإعدادات، وإلا يُحجز معرف جديد من قاعدة البيانات (ReferenceWorker)"""
+    configured = getattr(settings, 'FORMS_REFERENCE_WORKER_ID', None)
+    if configured is not None:
+        try:
+            worker_id = int(configured)
+        except (TypeError, ValueError):
+            worker_id = -1
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ImproperlyConfigured(f'FORMS_REFERENCE_WORKER_ID يجب أن يكون بين 0 و{MAX_WORKER_ID}')
+        return worker_id
+    return allocate_worker_id()
+
+
+def allocate_worker_id():
+    """حجز معرف عامل متسلسل: عمليتان لا تتشاركان المعرف إلا إذا بدأت بينهما 1024 عملية أخرى"""
+    from .models import ReferenceWorker
+
+    worker = ReferenceWorker.objects.create(host=socket.gethostname()[:255], pid=os.getpid())
+    # الصفوف الأقدم من دورة كاملة لم تعد تحجز معرفاً
+    ReferenceWorker.objects.filter(id__lte=worker.id - (MAX_WORKER_ID + 1)).delete()
+    return worker.id & MAX_WORKER_ID
+
+
+def encode(number):
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        number, remainder = divmod(number, 32)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+def decode(text):
+    number = 0
+    for char in text.upper():
+        number = number * 32 + ALPHABET.index(char)
+    return number
+
+
+class SnowflakeGenerator:
+    """مولد معرفات متزايدة داخل العملية: الوقت ثم معرف العامل ثم تسلسل داخل المللي ثانية"""
+
+    def __init__(self, worker_id=None):
+        self.worker_id = default_worker_id() if worker_id is None else worker_id & MAX_WORKER_ID
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def next_id(self):
+        with self._lock:
+            now = int(time.time() * 1000) - EPOCH_MS
+            # إذا رجعت الساعة للخلف نستمر من آخر وقت حتى لا يتكرر معرف
+            if now <= self._last_ms:
+                now = self._last_ms
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # انتهى تسلسل هذه المللي ثانية، ننتقل للتالية
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+
+_generator = None
+_generator_pid = None
+
+
+def get_generator():
+    # العمليات المتفرعة (fork) تحصل على مولد جديد بمعرف عامل محجوز لها
+    global _generator, _generator_pid
+    if _generator is None or _generator_pid != os.getpid():
+        _generator = SnowflakeGenerator()
+        _generator_pid = os.getpid()
+    return _generator
+
+
+def new_reference(submission_type):
+    """رقم مرجعي مثل CF-0C5X8R3T0M01A: البادئة ثم معرف Snowflake بترميز base32"""
+    prefix = PREFIXES.get(submission_type, 'FS')
+    return f'{prefix}-{encode(get_generator().next_id())}'
+
+
+def reference_timestamp(reference):
+    """وقت إنشاء الرقم المرجعي (ثوانٍ منذ 1970) - مفيد للتحقق والتشخيص"""
+    number = decode(reference.rsplit('-', 1)[-1])
+    return ((number >> (WORKER_BITS + SEQUENCE_BITS)) + EPOCH_MS) / 1000
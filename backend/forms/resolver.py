@@ -0,0 +1,150 @@
+# forms/resolver.py
+# ربط اسم الجهة المكتوب نصاً حراً في ملاحظات المواطنين بسجل GovernmentEntity
+
+import re
+
+from django.db import transaction
+from django.db.models import Count
+
+from .bulk import insert_rows
+from .models import CitizenFeedback, EntityAlias, EntityTrigram
+from .search import STOP_WORDS, normalize_arabic, stem
+
+# أدنى تشابه (معامل Dice على المقاطع الثلاثية) لقبول المطابقة التقريبية
+FUZZY_THRESHOLD = 0.6
+# عدد الجهات الأكثر اشتراكاً في المقاطع التي يُحسب تشابهها
+MAX_FUZZY_CANDIDATES = 20
+MAX_NAME_LENGTH = 200
+# حد المعاملات في عبارة واحدة (SQL Server يقبل 2100 معامل على الأكثر)
+IDS_CHUNK_SIZE = 1000
+
+_WORD = re.compile(r'\w+')
+
+
+def entity_key(text):
+    """الاسم المطبّع: الكلمات بدون تشكيل ولا أداة تعريف ولا كلمات شائعة
+
+    الكلمات القصيرة والأرقام تبقى لأنها تميّز بين جهات مثل "مدرسة 5" و"مدرسة 6".
+    """
+    words = (token.replace('_', '') for token in _WORD.findall(normalize_arabic(text)))
+    return ' '.join(stem(word) for word in words if word and word not in STOP_WORDS)[:MAX_NAME_LENGTH]
+
+
+def trigrams(key):
+    padded = f' {key} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def index_entities(entities):
+    """إعادة بناء الاسم المطبّع ومقاطعه الثلاثية لمجموعة جهات بشكل قابل للتكرار"""
+    aliases = []
+    grams = []
+    for entity in entities:
+        key = entity_key(entity.entity_name)
+        if key:
+            aliases.append((key, entity.pk, entity.governorate))
+            grams.extend((entity.pk, gram) for gram in trigrams(key))
+    ids = [entity.pk for entity in entities]
+    with transaction.atomic():
+        EntityAlias.objects.filter(entity_id__in=ids).delete()
+        EntityTrigram.objects.filter(entity_id__in=ids).delete()
+        insert_rows(EntityAlias, ('name', 'entity', 'governorate'), aliases)
+        insert_rows(EntityTrigram, ('entity', 'trigram'), grams)
+    return len(aliases)
+
+
+def fuzzy_matches(key):
+    """الجهات الأعلى تشابهاً مع الاسم إذا تجاوزت FUZZY_THRESHOLD: [(معرف الجهة, المحافظة)]
+
+    الجهات المرشحة تُجمع من فهرس المقاطع (trigram, entity)، ويُحسب Dice لأعلاها فقط.
+    """
+    grams = trigrams(key)
+    shared = dict(
+        EntityTrigram.objects.filter(trigram__in=grams).order_by().values('entity')
+        .annotate(shared=Count('id')).order_by('-shared', 'entity')
+        .values_list('entity', 'shared')[:MAX_FUZZY_CANDIDATES]
+    )
+    scored = []
+    aliases = EntityAlias.objects.filter(entity_id__in=list(shared)).values_list('name', 'entity_id', 'governorate')
+    for name, entity_id, governorate in aliases:
+        score = 2 * shared[entity_id] / (len(grams) + len(trigrams(name)))
+        if score >= FUZZY_THRESHOLD:
+            scored.append((score, entity_id, governorate))
+    if not scored:
+        return []
+    best = max(score for score, _, _ in scored)
+    return sorted((entity_id, governorate) for score, entity_id, governorate in scored if score == best)
+
+
+def _pick(matches, governorate):
+    # عند تعدد الجهات المطابقة تُفضَّل جهة محافظة الملاحظة ثم الأقدم
+    for entity_id, entity_governorate in matches:
+        if entity_governorate == governorate:
+            return entity_id
+    return matches[0][0] if matches else None
+
+
+def resolve_names(names, cache=None):
+    """{(النص, المحافظة): معرف الجهة أو None} لمجموعة أسماء
+
+    المطابقة التامة على الاسم المطبّع باستعلام واحد لكل دفعة من الأسماء، ثم المطابقة
+    التقريبية بالمقاطع الثلاثية لما تبقى. cache يحفظ النتائج بين الدفعات.
+    """
+    cache = {} if cache is None else cache
+    keys = {pair: entity_key(pair[0]) for pair in names if pair not in cache}
+    exact = {}
+    for chunk in _chunks(set(keys.values()) - {''}, IDS_CHUNK_SIZE):
+        aliases = EntityAlias.objects.filter(name__in=chunk).order_by('entity_id')
+        for name, entity_id, governorate in aliases.values_list('name', 'entity_id', 'governorate'):
+            exact.setdefault(name, []).append((entity_id, governorate))
+
+    fuzzy = {}
+    for pair, key in keys.items():
+        if not key:
+            cache[pair] = None
+            continue
+        matches = exact.get(key)
+        if matches is None:
+            if key not in fuzzy:
+                fuzzy[key] = fuzzy_matches(key)
+            matches = fuzzy[key]
+        cache[pair] = _pick(matches, pair[1])
+    return {pair: cache[pair] for pair in names}
+
+
+def remember_text(instance):
+    """حفظ نص الجهة كما قُرئ لمعرفة تغيّره عند الحفظ"""
+    if instance.get_deferred_fields().intersection(('related_entity', 'governorate')):
+        instance._resolved_text = None
+    else:
+        instance._resolved_text = (instance.related_entity, instance.governorate)
+
+
+def resolve_on_save(instance):
+    """تعيين resolved_entity قبل الحفظ إذا كانت الملاحظة جديدة أو تغيّر نص الجهة"""
+    pair = (instance.related_entity, instance.governorate)
+    if instance._state.adding or getattr(instance, '_resolved_text', None) != pair:
+        instance.resolved_entity_id = resolve_names({pair})[pair]
+        instance._resolved_text = pair
+
+
+def resolve_feedback(feedback, cache=None):
+    """تعيين resolved_entity لمجموعة ملاحظات بعبارة UPDATE لكل جهة - يعيد عدد الملاحظات المتغيرة"""
+    resolved = resolve_names({(item.related_entity, item.governorate) for item in feedback}, cache)
+    by_entity = {}
+    for item in feedback:
+        entity_id = resolved[(item.related_entity, item.governorate)]
+        if entity_id != item.resolved_entity_id:
+            by_entity.setdefault(entity_id, []).append(item.pk)
+            item.resolved_entity_id = entity_id
+    with transaction.atomic():
+        for entity_id, ids in by_entity.items():
+            for chunk in _chunks(ids, IDS_CHUNK_SIZE):
+                CitizenFeedback.objects.filter(id__in=chunk).update(resolved_entity_id=entity_id)
+    return sum(len(ids) for ids in by_entity.values())
@@ -0,0 +1,87 @@
+# forms/rollups.py
+# جداول إحصائيات يومية تُحدَّث تزايدياً بدل مسح الجداول الأصلية في كل تحديث للوحة
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CitizenFeedback, EntityDailyStat, FeedbackDailyStat, GovernmentEntity
+
+# النموذج -> (جدول الإحصائيات, الأبعاد بعد اليوم)
+ROLLUPS = {
+    GovernmentEntity: (EntityDailyStat, ('governorate', 'entity_type', 'is_approved')),
+    CitizenFeedback: (FeedbackDailyStat, ('feedback_type', 'priority', 'status', 'governorate')),
+}
+
+
+def rollup_key(instance):
+    _, dimensions = ROLLUPS[type(instance)]
+    return (timezone.localdate(instance.created_at),) + tuple(getattr(instance, name) for name in dimensions)
+
+
+def remember_key(instance):
+    """حفظ مفتاح الصف كما قُرئ من قاعدة البيانات لمعرفة ما تغير عند الحفظ"""
+    _, dimensions = ROLLUPS[type(instance)]
+    deferred = instance.get_deferred_fields()
+    if instance.pk is None or deferred.intersection(('created_at',) + dimensions):
+        instance._rollup_key = None
+    else:
+        instance._rollup_key = rollup_key(instance)
+
+
+def load_key(instance):
+    """مفتاح الصف المحفوظ حالياً - يُقرأ من قاعدة البيانات إذا لم يُحفظ عند التحميل"""
+    if getattr(instance, '_rollup_key', None) is None:
+        stored = type(instance).objects.filter(pk=instance.pk).first()
+        instance._rollup_key = rollup_key(stored) if stored is not None else None
+    return instance._rollup_key
+
+
+def adjust(model, key, delta):
+    """إضافة delta إلى صف الإحصائية ذرياً بـ F()، مع إنشائه عند الحاجة"""
+    stat_model, dimensions = ROLLUPS[model]
+    lookup = dict(zip(('day',) + dimensions, key))
+    rows = stat_model.objects.filter(**lookup)
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            stat_model.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # أنشأه طلب آخر في نفس اللحظة
+        rows.update(count=F('count') + delta)
+
+
+def record_saved(instance, created):
+    """نقل العد من المفتاح القديم إلى الجديد بعد الحفظ"""
+    model = type(instance)
+    new_key = rollup_key(instance)
+    old_key = None if created else instance._rollup_key
+    if old_key != new_key:
+        if old_key is not None:
+            adjust(model, old_key, -1)
+        adjust(model, new_key, 1)
+    instance._rollup_key = new_key
+
+
+def record_deleted(instance):
+    key = getattr(instance, '_rollup_key', None) or rollup_key(instance)
+    adjust(type(instance), key, -1)
+
+
+def rebuild_rollups(model):
+    """إعادة بناء جدول إحصائيات نموذج من الجدول الأصلي باستعلام تجميع واحد"""
+    stat_model, dimensions = ROLLUPS[model]
+    counts = (
+        model.objects.order_by().annotate(day=TruncDate('created_at'))
+        .values_list('day', *dimensions).annotate(total=Count('id'))
+    )
+    fields = ('day',) + dimensions
+    with transaction.atomic():
+        stat_model.objects.all().delete()
+        stat_model.objects.bulk_create([
+            stat_model(count=row[-1], **dict(zip(fields, row[:-1])))
+            for row in counts
+        ], batch_size=1000)
+    return stat_model.objects.count()
@@ -0,0 +1,165 @@
+# forms/search.py
+# بحث نصي يراعي العربية عبر فهرس مقلوب محفوظ في جدول SearchTerm
+
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, IntegerField, Max, OuterRef, Q, Subquery, Sum, When
+
+from .bulk import insert_rows
+from .models import CitizenFeedback, GovernmentEntity, SearchTerm
+
+# الحقول المفهرسة لكل نوع مستند ووزن كل حقل في الترتيب
+SEARCH_INDEXES = {
+    'entity': (GovernmentEntity, {
+        'entity_name': 8,
+        'manager_name': 4,
+        'services_provided': 2,
+    }),
+    'feedback': (CitizenFeedback, {
+        'title': 8,
+        'related_entity': 4,
+        'citizen_name': 4,
+        'description': 2,
+    }),
+}
+
+MAX_TERM_LENGTH = 64
+MIN_TERM_LENGTH = 2
+# تكرار المصطلح في نفس الحقل يرفع الوزن حتى هذا الحد فقط
+MAX_TERM_REPEATS = 5
+MAX_QUERY_TOKENS = 8
+
+_TASHKEEL = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_TOKEN = re.compile(r'\w+')
+_CHAR_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ة': 'ه',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+
+# بادئات التعريف المضافة كصيغة ثانية للمصطلح ليطابق "وزاره" كلمة "الوزاره"
+_ARTICLE_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'ال', 'لل')
+
+STOP_WORDS = frozenset(
+    'في من الي علي عن مع هذا هذه ذلك التي الذي او ثم قد لا ما و'.split()
+)
+
+
+def normalize_arabic(text):
+    """توحيد أشكال الألف والياء والتاء المربوطة وحذف التشكيل والتطويل"""
+    if not text:
+        return ''
+    return _TASHKEEL.sub('', str(text)).translate(_CHAR_MAP).lower()
+
+
+def tokenize(text):
+    """كلمات النص بعد التطبيع مع حذف الكلمات الشائعة والقصيرة"""
+    for token in _TOKEN.findall(normalize_arabic(text)):
+        token = token.replace('_', '')
+        if len(token) >= MIN_TERM_LENGTH and token not in STOP_WORDS:
+            yield token[:MAX_TERM_LENGTH]
+
+
+def _term_variants(token):
+    yield token
+    for prefix in _ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= MIN_TERM_LENGTH + 1:
+            yield token[len(prefix):]
+            return
+
+
+def stem(token):
+    """المصطلح بدون أداة التعريف إن وُجدت"""
+    return list(_term_variants(token))[-1]
+
+
+def document_terms(instance, fields):
+    """أوزان المصطلحات لمستند واحد: {المصطلح: الوزن}"""
+    weights = Counter()
+    for field_name, field_weight in fields.items():
+        repeats = Counter()
+        for token in tokenize(getattr(instance, field_name, '')):
+            for term in _term_variants(token):
+                repeats[term] += 1
+        for term, count in repeats.items():
+            weights[term] += field_weight * min(count, MAX_TERM_REPEATS)
+    return weights
+
+
+def index_kind(model):
+    for kind, (indexed_model, _) in SEARCH_INDEXES.items():
+        if indexed_model is model:
+            return kind
+    return None
+
+
+def index_documents(kind, instances):
+    """إعادة بناء صفوف الفهرس لمجموعة مستندات بشكل قابل للتكرار"""
+    _, fields = SEARCH_INDEXES[kind]
+    rows = []
+    for instance in instances:
+        rows.extend(
+            (kind, instance.pk, term, weight)
+            for term, weight in document_terms(instance, fields).items()
+        )
+    with transaction.atomic():
+        SearchTerm.objects.filter(kind=kind, object_id__in=[instance.pk for instance in instances]).delete()
+        insert_rows(SearchTerm, ('kind', 'object_id', 'term', 'weight'), rows)
+    return len(rows)
+
+
+def remove_documents(kind, object_ids):
+    SearchTerm.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+
+def query_tokens(query):
+    """مصطلحات الاستعلام الفريدة بترتيب ورودها - بدون أداة التعريف لتطابق الصيغتين"""
+    stems = (stem(token) for token in tokenize(query))
+    return list(dict.fromkeys(stems))[:MAX_QUERY_TOKENS]
+
+
+def ranked_matches(kind, tokens):
+    """المستندات التي تطابق كل مصطلحات الاستعلام (كبادئة) مع مجموع الأوزان كدرجة"""
+    any_token = Q()
+    matched = 0
+    for token in tokens:
+        condition = Q(term__startswith=token)
+        any_token |= condition
+        matched += Max(Case(When(condition, then=1), default=0, output_field=IntegerField()))
+    return (
+        SearchTerm.objects.filter(kind=kind).filter(any_token)
+        .order_by().values('object_id')
+        .annotate(matched=matched, rank=Sum('weight'))
+        .filter(matched=len(tokens))
+    )
+
+
+def search(queryset, query):
+    """تصفية queryset بنص البحث وإضافة search_rank للترتيب حسب الصلة
+
+    يعيد queryset كما هو إذا لم يبقَ من النص مصطلح قابل للبحث.
+    """
+    kind = index_kind(queryset.model)
+    tokens = query_tokens(query)
+    if kind is None or not tokens:
+        return queryset
+    matches = ranked_matches(kind, tokens)
+    rank = Subquery(matches.filter(object_id=OuterRef('pk')).values('rank')[:1], output_field=IntegerField())
+    return queryset.filter(pk__in=matches.values('object_id')).annotate(search_rank=rank)
+
+
+def iter_chunks(queryset, chunk_size):
+    """تقسيم المستندات إلى دفعات بالمفتاح (id) بدل OFFSET"""
+    last_id = 0
+    queryset = queryset.order_by('id')
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].pk
@@ -1,8 +1,41 @@
 # forms/serializers.py
 from rest_framework import serializers
+from accounts.models import User
 from .models import GovernmentEntity, CitizenFeedback, FormSubmission
 
-class GovernmentEntitySerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """إرجاع الحقول المطلوبة فقط عبر context['fields'] (معامل ?fields=a,b)"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
+
+def sparse_queryset(queryset, serializer, always=('id',)):
+    """قراءة أعمدة النموذج التي يعرضها المسلسل فقط (.only) مع جلب العلاقات المعروضة (select_related)"""
+    model = serializer.Meta.model
+    names = {field.name for field in model._meta.concrete_fields}
+    columns = set(always)
+    related = set()
+    for field in serializer.fields.values():
+        source, _, attribute = field.source.partition('.')
+        if source.startswith('get_') and source.endswith('_display'):
+            source = source[len('get_'):-len('_display')]
+        if source not in names:
+            continue
+        columns.add(source)
+        if attribute and model._meta.get_field(source).is_relation:
+            related.add(source)
+            columns.add(f'{source}__{attribute.replace(".", "__")}')
+    # العلاقات غير المعروضة لا تُجلب، وإلا تعارضت مع الأعمدة المؤجلة
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns)
+
+class GovernmentEntitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """مسلسل الجهة الحكومية"""
     entity_type_display = serializers.CharField(source='get_entity_type_display', read_only=True)
     governorate_display = serializers.CharField(source='get_governorate_display', read_only=True)
@@ -14,6 +47,19 @@ class GovernmentEntitySerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('submitted_by', 'created_at', 'updated_at', 'approved_by', 'approval_date')
 
+class GovernmentEntityListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """مسلسل قائمة الجهات الحكومية - أعمدة الجدول فقط بدون الحقول النصية الطويلة"""
+    entity_type_display = serializers.CharField(source='get_entity_type_display', read_only=True)
+    governorate_display = serializers.CharField(source='get_governorate_display', read_only=True)
+    
+    class Meta:
+        model = GovernmentEntity
+        fields = (
+            'id', 'entity_name', 'entity_type', 'entity_type_display', 'governorate',
+            'governorate_display', 'manager_name', 'email', 'phone_number',
+            'is_approved', 'created_at',
+        )
+
 class GovernmentEntityCreateSerializer(serializers.ModelSerializer):
     """مسلسل إنشاء الجهة الحكومية"""
     class Meta:
@@ -30,7 +76,11 @@ class CitizenFeedbackSerializer(serializers.ModelSerializer):
     class Meta:
         model = CitizenFeedback
         fields = '__all__'
-        read_only_fields = ('created_at', 'updated_at', 'resolved_at')
+        read_only_fields = ('created_at', 'updated_at', 'resolved_at', 'claimed_at', 'cluster_root', 'resolved_entity')
+
+def is_anonymous_submission(data):
+    """هل طلب المواطن الإرسال المجهول (JSON أو form-data)"""
+    return data.get('is_anonymous', False) in serializers.BooleanField.TRUE_VALUES
 
 class CitizenFeedbackCreateSerializer(serializers.ModelSerializer):
     """مسلسل إنشاء ملاحظة المواطن"""
@@ -38,9 +88,8 @@ class CitizenFeedbackCreateSerializer(serializers.ModelSerializer):
     def validate(self, data):
         """التحقق من صحة البيانات"""
         # إذا لم يكن الإرسال مجهولاً، تحقق من الحقول المطلوبة
-        is_anonymous = data.get('is_anonymous', False)
-        
-        if not is_anonymous:
+        # is_anonymous ليس حقلاً في النموذج فيُقرأ من الطلب نفسه
+        if not is_anonymous_submission(self.initial_data):
             required_fields = ['citizen_name', 'citizen_phone', 'citizen_email', 'citizen_address']
             for field in required_fields:
                 if not data.get(field):
@@ -50,7 +99,29 @@ class CitizenFeedbackCreateSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = CitizenFeedback
-        exclude = ('assigned_to', 'admin_notes', 'resolution', 'resolved_at', 'status')
+        exclude = ('assigned_to', 'admin_notes', 'resolution', 'resolved_at', 'status', 'claimed_at', 'cluster_root',
+                   'resolved_entity')
+
+class CitizenFeedbackBulkUpdateSerializer(serializers.Serializer):
+    """طلب تعديل جماعي: ids أو filter لتحديد الملاحظات، وحقل تغيير واحد على الأقل"""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    filter = serializers.DictField(child=serializers.CharField(), required=False, allow_empty=False)
+    status = serializers.ChoiceField(choices=CitizenFeedback.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=CitizenFeedback.PRIORITY_LEVELS, required=False)
+    assigned_to = serializers.PrimaryKeyRelatedField(queryset=User.objects.all(), allow_null=True, required=False)
+    admin_notes = serializers.CharField(required=False, allow_blank=True)
+    dry_run = serializers.BooleanField(required=False, default=False)
+    
+    def validate(self, data):
+        if ('ids' in data) == ('filter' in data):
+            raise serializers.ValidationError('يجب تحديد ids أو filter (واحد فقط)')
+        if not any(name in data for name in ('status', 'priority', 'assigned_to', 'admin_notes')):
+            raise serializers.ValidationError('لا توجد تغييرات للتطبيق')
+        return data
+
+class CitizenFeedbackResolveClusterSerializer(serializers.Serializer):
+    """طلب حل مجموعة تكرار: ملاحظات إدارية اختيارية تُكتب على كل الملاحظات"""
+    admin_notes = serializers.CharField(required=False, allow_blank=True)
 
 class FormSubmissionSerializer(serializers.ModelSerializer):
     """مسلسل تقديم الاستمارة"""
@@ -0,0 +1,72 @@
+# forms/signals.py
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .duplicates import link_duplicates
+from .models import CitizenFeedback, GovernmentEntity
+from .resolver import index_entities, remember_text, resolve_on_save
+from .rollups import load_key, record_deleted, record_saved, remember_key
+from .search import SEARCH_INDEXES, index_documents, index_kind, remove_documents
+
+
+@receiver(post_save, sender=GovernmentEntity)
+@receiver(post_save, sender=CitizenFeedback)
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    kind = index_kind(sender)
+    # save(update_fields=...) لا يمس الحقول المفهرسة (مثل تغيير الحالة) فلا حاجة لإعادة الفهرسة
+    if update_fields is not None and update_fields.isdisjoint(SEARCH_INDEXES[kind][1]):
+        return
+    index_documents(kind, [instance])
+
+
+@receiver(post_delete, sender=GovernmentEntity)
+@receiver(post_delete, sender=CitizenFeedback)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_documents(index_kind(sender), [instance.pk])
+
+
+@receiver(post_init, sender=GovernmentEntity)
+@receiver(post_init, sender=CitizenFeedback)
+def remember_rollup_key(sender, instance, **kwargs):
+    remember_key(instance)
+
+
+@receiver(pre_save, sender=GovernmentEntity)
+@receiver(pre_save, sender=CitizenFeedback)
+def load_rollup_key(sender, instance, **kwargs):
+    if not instance._state.adding:
+        load_key(instance)
+
+
+@receiver(post_save, sender=GovernmentEntity)
+@receiver(post_save, sender=CitizenFeedback)
+def update_daily_stats(sender, instance, created, **kwargs):
+    record_saved(instance, created)
+
+
+@receiver(post_delete, sender=GovernmentEntity)
+@receiver(post_delete, sender=CitizenFeedback)
+def remove_from_daily_stats(sender, instance, **kwargs):
+    record_deleted(instance)
+
+
+@receiver(post_save, sender=CitizenFeedback)
+def link_duplicate_feedback(sender, instance, created, **kwargs):
+    # التوقيع يُحسب عند الإنشاء فقط، وأمر cluster_feedback يعيد حسابه بعد تعديل النصوص
+    if created:
+        link_duplicates([instance])
+
+
+@receiver(post_save, sender=GovernmentEntity)
+def update_entity_names(sender, instance, **kwargs):
+    index_entities([instance])
+
+
+@receiver(post_init, sender=CitizenFeedback)
+def remember_related_entity(sender, instance, **kwargs):
+    remember_text(instance)
+
+
+@receiver(pre_save, sender=CitizenFeedback)
+def resolve_related_entity(sender, instance, **kwargs):
+    resolve_on_save(instance)
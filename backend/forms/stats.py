@@ -0,0 +1,112 @@
+# forms/stats.py
+# إحصائيات لوحة التحكم: استعلام تجميع واحد لكل جدول إحصائيات يومية بدل استعلام لكل رقم
+
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User
+from .models import CitizenFeedback, EntityDailyStat, FeedbackDailyStat, FormSubmission
+
+RECENT_DAYS = 30
+
+
+def _recent_since():
+    # آخر 30 يوماً بما فيها اليوم الحالي
+    return timezone.localdate() - timedelta(days=RECENT_DAYS - 1)
+
+
+def grouped_counts(stat_model, dimensions, since):
+    """صف لكل تركيبة من الأبعاد مع العدد الكلي والعدد الحديث من جدول الإحصائيات اليومية
+
+    عدد التركيبات صغير (بضع مئات على الأكثر) فتُجمع التفاصيل المطلوبة منها في بايثون.
+    """
+    return stat_model.objects.order_by().values_list(*dimensions).annotate(
+        total=Coalesce(Sum('count'), 0),
+        recent=Coalesce(Sum('count', filter=Q(day__gte=since)), 0),
+    ).filter(total__gt=0)
+
+
+def entity_stats():
+    by_type = Counter()
+    by_governorate = Counter()
+    total = approved = recent = 0
+    rows = grouped_counts(
+        EntityDailyStat, ('entity_type', 'governorate', 'is_approved'), _recent_since()
+    )
+    for entity_type, governorate, is_approved, count, recent_count in rows:
+        total += count
+        recent += recent_count
+        if is_approved:
+            approved += count
+        if entity_type is not None:
+            by_type[entity_type] += count
+        if governorate is not None:
+            by_governorate[governorate] += count
+    return {
+        'total_entities': total,
+        'approved_entities': approved,
+        'pending_entities': total - approved,
+        'entities_by_type': dict(by_type),
+        'entities_by_governorate': dict(by_governorate),
+        'recent_submissions': recent,
+    }
+
+
+def feedback_stats():
+    by_type = Counter()
+    by_priority = Counter()
+    by_status = Counter()
+    total = recent = 0
+    rows = grouped_counts(
+        FeedbackDailyStat, ('feedback_type', 'priority', 'status'), _recent_since()
+    )
+    for feedback_type, priority, status, count, recent_count in rows:
+        total += count
+        recent += recent_count
+        by_status[status] += count
+        if feedback_type is not None:
+            by_type[feedback_type] += count
+        if priority is not None:
+            by_priority[priority] += count
+    return {
+        'total_feedback': total,
+        'pending_feedback': by_status['pending'],
+        'resolved_feedback': by_status['resolved'],
+        'feedback_by_type': dict(by_type),
+        'feedback_by_priority': dict(by_priority),
+        'recent_feedback': recent,
+    }
+
+
+def dashboard_stats():
+    return {
+        'government_entities': entity_stats(),
+        'citizen_feedback': feedback_stats(),
+        'total_submissions': FormSubmission.objects.count(),
+        'active_users': User.objects.filter(is_active=True).count(),
+    }
+
+
+def feedback_by_entity(limit=50):
+    """عدد الملاحظات لكل جهة حكومية مطابقة - تجميع على فهرس feedback_entity_idx"""
+    rows = (
+        CitizenFeedback.objects.filter(resolved_entity__isnull=False).order_by()
+        .values_list('resolved_entity', 'resolved_entity__entity_name')
+        .annotate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status='pending')),
+            resolved=Count('id', filter=Q(status='resolved')),
+        )
+        .order_by('-total', 'resolved_entity')[:limit]
+    )
+    return {
+        'entities': [
+            {'entity': entity, 'entity_name': name, 'total': total, 'pending': pending, 'resolved': resolved}
+            for entity, name, total, pending, resolved in rows
+        ],
+        'unresolved': CitizenFeedback.objects.filter(resolved_entity__isnull=True).count(),
+    }
@@ -0,0 +1,91 @@
+# forms/stats_cache.py
+# تخزين مؤقت لإحصائيات لوحة التحكم مع حماية من التدافع عند انتهاء الصلاحية
+
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+STATS_CACHE_KEY = 'forms:stats:{name}'
+STATS_LOCK_KEY = 'forms:stats:{name}:lock'
+
+# بعد هذه المدة تعتبر القيمة قديمة ويعاد حسابها، لكنها تبقى تُقدَّم حتى انتهاء STALE
+STATS_CACHE_TTL = getattr(settings, 'FORMS_STATS_CACHE_TTL', 30)
+STATS_CACHE_STALE = getattr(settings, 'FORMS_STATS_CACHE_STALE', 600)
+# إعادة الحساب في خيط منفصل حتى لا ينتظر الطلب الذي حصل على القفل
+STATS_CACHE_BACKGROUND = getattr(settings, 'FORMS_STATS_CACHE_BACKGROUND', True)
+
+# مدة القفل القصوى إذا توقف العامل قبل تحريره
+LOCK_TIMEOUT = 30
+# انتظار العمال الآخرين عند عدم وجود أي قيمة مخزنة
+COLD_WAIT = 2.0
+COLD_POLL = 0.05
+# معامل التحديث المبكر الاحتمالي: كلما زاد بدأ التحديث أبكر
+EARLY_REFRESH_BETA = 1.0
+
+
+def _should_refresh_early(entry, now):
+    """التحديث المبكر الاحتمالي (XFetch): احتمال يزداد كلما اقتربت نهاية الصلاحية"""
+    return now - entry['delta'] * EARLY_REFRESH_BETA * math.log(1.0 - random.random()) >= entry['expires']
+
+
+def _compute(name, compute):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    entry = {'value': value, 'delta': delta, 'expires': time.time() + STATS_CACHE_TTL}
+    cache.set(STATS_CACHE_KEY.format(name=name), entry, STATS_CACHE_TTL + STATS_CACHE_STALE)
+    return entry
+
+
+def _refresh(name, compute, lock_key):
+    try:
+        return _compute(name, compute)
+    finally:
+        cache.delete(lock_key)
+
+
+def _refresh_in_background(name, compute, lock_key):
+    def run():
+        try:
+            _refresh(name, compute, lock_key)
+        finally:
+            # اتصالات قاعدة البيانات خاصة بكل خيط
+            connections.close_all()
+    threading.Thread(target=run, name=f'stats-refresh-{name}', daemon=True).start()
+
+
+def cached_stats(name, compute):
+    """قيمة compute() المخزنة، يعيد حسابها عامل واحد فقط بينما يقدّم الآخرون القيمة السابقة
+
+    يعمل مع ذاكرة كل عملية (LocMem) ومع Redis المشترك لأن القفل مبني على cache.add.
+    """
+    key = STATS_CACHE_KEY.format(name=name)
+    lock_key = STATS_LOCK_KEY.format(name=name)
+    entry = cache.get(key)
+    now = time.time()
+
+    if entry is not None:
+        if now < entry['expires'] and not _should_refresh_early(entry, now):
+            return entry['value']
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            if STATS_CACHE_BACKGROUND:
+                _refresh_in_background(name, compute, lock_key)
+            else:
+                entry = _refresh(name, compute, lock_key)
+        return entry['value']
+
+    # لا توجد قيمة: عامل واحد يحسب والباقون ينتظرون قليلاً ثم يحسبون بأنفسهم
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        return _refresh(name, compute, lock_key)['value']
+    deadline = time.monotonic() + COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(COLD_POLL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry['value']
+    return compute()
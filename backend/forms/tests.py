@@ -0,0 +1,876 @@
+# forms/tests.py
+import threading
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from . import stats_cache
+from .models import CitizenFeedback, FormSubmission, GovernmentEntity
+
+
+def make_user(username='admin', **extra):
+    return User.objects.create_user(
+        email=f'{username}@example.com', username=username, password='password', **extra
+    )
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def make_entity(index, user):
+    return GovernmentEntity(
+        entity_name=f'جهة {index}', entity_type='ministry', governorate='baghdad', address='بغداد',
+        phone_number='+9647700000000', email=f'entity{index}@example.com',
+        manager_name='مدير', manager_position='مدير عام', manager_phone='+9647700000000',
+        manager_email=f'manager{index}@example.com', establishment_date=date(2000, 1, 1),
+        employee_count=10, annual_budget=1000, services_provided='خدمات', target_audience='المواطنون',
+        current_projects='مشاريع', future_plans='خطط', performance_indicators='مؤشرات',
+        challenges='تحديات', needs='احتياجات', submitted_by=user, approved_by=user,
+    )
+
+
+def make_feedback(index, user):
+    return CitizenFeedback(
+        citizen_name=f'مواطن {index}', feedback_type='complaint', title='شكوى', description='وصف',
+        related_entity='وزارة', governorate='baghdad', assigned_to=user,
+    )
+
+
+class SearchTests(TestCase):
+    """البحث في الفهرس المقلوب: تطبيع العربية، مطابقة البادئة، والترتيب حسب الصلة"""
+
+    def setUp(self):
+        self.user = make_user(is_staff=True)
+        self.client = api_client(self.user)
+
+    def create(self, title, description='وصف', related_entity='جهة'):
+        feedback = make_feedback(0, self.user)
+        feedback.title = title
+        feedback.description = description
+        feedback.related_entity = related_entity
+        feedback.save()
+        return feedback
+
+    def search(self, query):
+        response = self.client.get('/api/forms/citizen-feedback/', {'search': query})
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return [row['id'] for row in response.data['results']]
+
+    def test_normalization_and_prefix(self):
+        feedback = self.create('انقطاع الكهرباء في المدرسة')
+        other = self.create('تأخر معاملة التقاعد')
+        for query in ('الكهرباء', 'كهرباء', 'الكَهْرَبَاء', 'كهرب', 'انقطاع المدرسه', 'مدرس'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [feedback.pk])
+        self.assertEqual(self.search('التقاعد'), [other.pk])
+        # كل مصطلحات الاستعلام مطلوبة
+        self.assertEqual(self.search('الكهرباء التقاعد'), [])
+
+    def test_rank_by_field_weight(self):
+        in_description = self.create('شكوى', description='انقطاع الماء في الحي')
+        in_entity = self.create('شكوى', related_entity='دائرة الماء')
+        in_title = self.create('انقطاع الماء')
+        self.assertEqual(self.search('الماء'), [in_title.pk, in_entity.pk, in_description.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        feedback = self.create('حفرة في الشارع')
+        feedback.title = 'إنارة الشارع'
+        feedback.save()
+        self.assertEqual(self.search('حفرة'), [])
+        self.assertEqual(self.search('انارة'), [feedback.pk])
+        feedback.delete()
+        self.assertEqual(self.search('الشارع'), [])
+
+    def test_update_fields_without_indexed_fields_skips_reindex(self):
+        from .models import SearchTerm
+
+        feedback = self.create('حفرة في الشارع')
+        feedback.status = 'in_progress'
+        with CaptureQueriesContext(connection) as queries:
+            feedback.save(update_fields=['status'])
+        table = SearchTerm._meta.db_table
+        self.assertFalse([query['sql'] for query in queries.captured_queries if table in query['sql']])
+        feedback.title = 'إنارة الشارع'
+        feedback.save(update_fields=['title'])
+        self.assertEqual(self.search('انارة'), [feedback.pk])
+
+    def test_migration_backfills_index(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        from .models import SearchTerm
+
+        feedback = self.create('انقطاع الكهرباء')
+        entity = make_entity(0, self.user)
+        entity.save()
+        SearchTerm.objects.all().delete()
+        import_module('forms.migrations.0015_backfill_search_terms').backfill_search_terms(apps, None)
+        self.assertEqual(self.search('الكهرباء'), [feedback.pk])
+        self.assertTrue(SearchTerm.objects.filter(kind='entity', object_id=entity.pk).exists())
+
+
+class FeedbackFilterTests(TestCase):
+    """مرشحات الملاحظات: رفض القيم غير الصحيحة، قوائم IN، وحدود التاريخ الشاملة لليوم"""
+
+    def setUp(self):
+        self.client = api_client(make_user(is_staff=True))
+        self.feedback = []
+        for index, (status, priority) in enumerate([
+            ('pending', 'low'), ('in_progress', 'high'), ('resolved', 'high'), ('pending', 'urgent'),
+        ]):
+            item = make_feedback(index, None)
+            item.status = status
+            item.priority = priority
+            item.save()
+            self.feedback.append(item)
+
+    def ids(self, query):
+        response = self.client.get(f'/api/forms/citizen-feedback/?{query}')
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return sorted(row['id'] for row in response.data['results'])
+
+    def pks(self, *indexes):
+        return sorted(self.feedback[index].pk for index in indexes)
+
+    def test_invalid_values(self):
+        for query in ('status=archived', 'priority=high,bogus', 'feedback_type=other',
+                      'created_after=2024-13-01', 'created_before=yesterday'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/forms/citizen-feedback/?{query}')
+                self.assertEqual(response.status_code, 400, response.content[:500])
+
+    def test_in_lists(self):
+        self.assertEqual(self.ids('status=pending,resolved'), self.pks(0, 2, 3))
+        self.assertEqual(self.ids('status=pending&priority=urgent,low'), self.pks(0, 3))
+        self.assertEqual(self.ids('priority=high,'), self.pks(1, 2))
+
+    def test_inclusive_date_bounds(self):
+        moments = [
+            datetime(2024, 2, 29, 23, 59, 59), datetime(2024, 3, 1), datetime(2024, 3, 1, 23, 59, 59),
+            datetime(2024, 3, 2),
+        ]
+        for item, moment in zip(self.feedback, moments):
+            CitizenFeedback.objects.filter(pk=item.pk).update(created_at=timezone.make_aware(moment))
+        self.assertEqual(self.ids('created_after=2024-03-01&created_before=2024-03-01'), self.pks(1, 2))
+        self.assertEqual(self.ids('created_before=2024-02-29'), self.pks(0))
+        self.assertEqual(self.ids('created_after=2024-03-02'), self.pks(3))
+        self.assertEqual(self.ids('created_after=2024-03-01T12:00:00'), self.pks(2, 3))
+
+    def test_benchmark_plan_check(self):
+        from .management.commands.benchmark_feedback_filters import plan_uses_index
+
+        self.assertTrue(plan_uses_index('5 0 0 SEARCH forms_citizenfeedback USING INDEX feedback_status_idx (status=?)'))
+        self.assertTrue(plan_uses_index(
+            'Limit\n  ->  Index Scan using feedback_status_idx on forms_citizenfeedback\n'
+            "        Index Cond: ((status)::text = 'pending'::text)"
+        ))
+        # المسح المرتب للفهرس كله يقرأ الجدول ثم يصفي، فلا يُعد استخداماً للفهرس
+        self.assertFalse(plan_uses_index('5 0 0 SCAN forms_citizenfeedback USING INDEX feedback_created_idx'))
+        self.assertFalse(plan_uses_index(
+            'Limit\n  ->  Index Scan Backward using feedback_created_idx on forms_citizenfeedback\n'
+            "        Filter: ((status)::text = 'pending'::text)"
+        ))
+        self.assertFalse(plan_uses_index('Seq Scan on forms_citizenfeedback'))
+
+
+class DashboardStatsTests(TestCase):
+    """الإحصائيات المجمعة تطابق العد المنفصل لكل مرشح، بعدد استعلامات ثابت"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(is_staff=True)
+        self.client = api_client(self.user)
+        for index, (entity_type, governorate, approved) in enumerate([
+            ('ministry', 'baghdad', True), ('ministry', 'basra', False), ('directorate', 'baghdad', False),
+            ('directorate', 'nineveh', True), ('authority', 'baghdad', True),
+        ]):
+            entity = make_entity(index, self.user)
+            entity.entity_type = entity_type
+            entity.governorate = governorate
+            entity.is_approved = approved
+            entity.save()
+        for index, (feedback_type, priority, status) in enumerate([
+            ('complaint', 'high', 'pending'), ('complaint', 'low', 'resolved'), ('suggestion', 'medium', 'pending'),
+            ('inquiry', 'high', 'in_progress'), ('complaint', 'urgent', 'resolved'), ('suggestion', 'high', 'resolved'),
+        ]):
+            feedback = make_feedback(index, self.user)
+            feedback.feedback_type = feedback_type
+            feedback.priority = priority
+            feedback.status = status
+            feedback.save()
+        FormSubmission.objects.create(
+            submission_type='citizen_feedback', reference_number='REF0000001',
+            submitter_name='مواطن', submitter_email='citizen@example.com',
+        )
+
+    def get(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(len(queries), budget, '\n'.join(query['sql'] for query in queries.captured_queries))
+        return response.json()
+
+    def counts(self, queryset, field, choices):
+        return {
+            value: count
+            for value, count in ((value, queryset.filter(**{field: value}).count()) for value, _ in choices)
+            if count
+        }
+
+    def expected_entities(self):
+        entities = GovernmentEntity.objects.all()
+        recent = timezone.now() - timedelta(days=30)
+        return {
+            'total_entities': entities.count(),
+            'approved_entities': entities.filter(is_approved=True).count(),
+            'pending_entities': entities.filter(is_approved=False).count(),
+            'entities_by_type': self.counts(entities, 'entity_type', GovernmentEntity.ENTITY_TYPES),
+            'entities_by_governorate': self.counts(entities, 'governorate', GovernmentEntity.GOVERNORATES),
+            'recent_submissions': entities.filter(created_at__gte=recent).count(),
+        }
+
+    def expected_feedback(self):
+        feedback = CitizenFeedback.objects.all()
+        recent = timezone.now() - timedelta(days=30)
+        return {
+            'total_feedback': feedback.count(),
+            'pending_feedback': feedback.filter(status='pending').count(),
+            'resolved_feedback': feedback.filter(status='resolved').count(),
+            'feedback_by_type': self.counts(feedback, 'feedback_type', CitizenFeedback.FEEDBACK_TYPES),
+            'feedback_by_priority': self.counts(feedback, 'priority', CitizenFeedback.PRIORITY_LEVELS),
+            'recent_feedback': feedback.filter(created_at__gte=recent).count(),
+        }
+
+    def test_matches_per_filter_counts(self):
+        self.assertEqual(self.get('/api/forms/government-entities/stats/', 1), self.expected_entities())
+        self.assertEqual(self.get('/api/forms/citizen-feedback/stats/', 1), self.expected_feedback())
+
+        data = self.get('/api/forms/dashboard/stats/', 4)
+        self.assertEqual(data['total_submissions'], FormSubmission.objects.count())
+        self.assertEqual(data['active_users'], User.objects.filter(is_active=True).count())
+        self.assertEqual(data['government_entities']['total_entities'], 5)
+        self.assertEqual(data['citizen_feedback']['resolved_feedback'], 3)
+
+
+class RollupTests(TestCase):
+    """جداول الإحصائيات اليومية تبقى مطابقة لإعادة البناء من الجداول الأصلية"""
+
+    def setUp(self):
+        self.user = make_user(is_staff=True)
+
+    def snapshot(self):
+        from .models import FeedbackDailyStat, EntityDailyStat
+
+        return {
+            model.__name__: sorted(
+                row for row in model.objects.exclude(count=0).values_list(
+                    *[field.attname for field in model._meta.concrete_fields if field.name != 'id']
+                )
+            )
+            for model in (FeedbackDailyStat, EntityDailyStat)
+        }
+
+    def assert_matches_rebuild(self):
+        from .rollups import rebuild_rollups
+
+        incremental = self.snapshot()
+        rebuild_rollups(CitizenFeedback)
+        rebuild_rollups(GovernmentEntity)
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_incremental_updates(self):
+        from .triage import bulk_triage
+
+        feedback = [make_feedback(index, self.user) for index in range(4)]
+        for item in feedback:
+            item.save()
+        entity = make_entity(1, self.user)
+        entity.save()
+        self.assert_matches_rebuild()
+
+        feedback[0].status = 'resolved'
+        feedback[0].save()
+        # نسخة محملة جزئياً تقرأ مفتاحها من قاعدة البيانات عند الحفظ
+        partial = CitizenFeedback.objects.only('id', 'priority').get(pk=feedback[1].pk)
+        partial.priority = 'urgent'
+        partial.save()
+        feedback[2].delete()
+        entity.is_approved = True
+        entity.save()
+        bulk_triage(ids=[feedback[3].pk, feedback[1].pk], changes={'status': 'in_progress'})
+        self.assert_matches_rebuild()
+
+        cache.clear()
+        data = api_client(self.user).get('/api/forms/citizen-feedback/stats/').json()
+        self.assertEqual(data['total_feedback'], 3)
+        self.assertEqual(data['resolved_feedback'], 1)
+
+
+class StatsCacheTests(TestCase):
+    """الإحصائيات المخزنة: تُقدَّم القيمة القديمة أثناء التحديث، ويحسبها عامل واحد فقط"""
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def expire(self, name):
+        key = stats_cache.STATS_CACHE_KEY.format(name=name)
+        entry = cache.get(key)
+        entry['expires'] = 0
+        cache.set(key, entry)
+
+    def test_refresh_after_expiry(self):
+        with mock.patch.object(stats_cache, 'STATS_CACHE_BACKGROUND', False):
+            self.assertEqual(stats_cache.cached_stats('test', self.compute), 1)
+            self.assertEqual(stats_cache.cached_stats('test', self.compute), 1)
+            self.expire('test')
+            self.assertEqual(stats_cache.cached_stats('test', self.compute), 2)
+            self.assertEqual(stats_cache.cached_stats('test', self.compute), 2)
+
+    def test_stale_value_while_another_worker_refreshes(self):
+        with mock.patch.object(stats_cache, 'STATS_CACHE_BACKGROUND', False):
+            stats_cache.cached_stats('test', self.compute)
+            self.expire('test')
+            cache.add(stats_cache.STATS_LOCK_KEY.format(name='test'), 1)
+            self.assertEqual(stats_cache.cached_stats('test', self.compute), 1)
+            self.assertEqual(self.calls, 1)
+
+    def test_cold_cache_single_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return self.compute()
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(stats_cache.cached_stats('test', slow)))
+        worker.start()
+        started.wait(5)
+        waiter = threading.Thread(target=lambda: results.append(stats_cache.cached_stats('test', self.compute)))
+        with mock.patch.object(stats_cache, 'COLD_WAIT', 5):
+            waiter.start()
+            release.set()
+            worker.join(5)
+            waiter.join(5)
+        self.assertEqual(results, [1, 1])
+        self.assertEqual(self.calls, 1)
+
+
+class EntityFieldsTests(TestCase):
+    """قائمة الجهات بالمسلسل المختصر، و?fields= يحدد مفاتيح JSON والأعمدة المقروءة معاً"""
+
+    URL = '/api/forms/government-entities/'
+
+    def setUp(self):
+        self.user = make_user(is_staff=True)
+        self.client = api_client(self.user)
+        self.entity = make_entity(1, self.user)
+        self.entity.save()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        sql = '\n'.join(
+            query['sql'] for query in queries.captured_queries if 'FROM "forms_governmententity"' in query['sql']
+        )
+        return response, sql
+
+    def test_list_uses_lean_serializer(self):
+        from .serializers import GovernmentEntityListSerializer
+
+        response, sql = self.get(self.URL)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(set(response.data['results'][0]), set(GovernmentEntityListSerializer.Meta.fields))
+        self.assertIn('"manager_name"', sql)
+        self.assertNotIn('"services_provided"', sql)
+
+    def test_fields_limit_keys_and_columns(self):
+        for url in (f'{self.URL}?fields=id,entity_name,challenges', f'{self.URL}{self.entity.pk}/?fields=id,entity_name,challenges'):
+            with self.subTest(url=url):
+                response, sql = self.get(url)
+                self.assertEqual(response.status_code, 200, response.content[:500])
+                row = response.data['results'][0] if 'results' in response.data else response.data
+                self.assertEqual(set(row), {'id', 'entity_name', 'challenges'})
+                self.assertIn('"challenges"', sql)
+                self.assertNotIn('"manager_name"', sql)
+                self.assertNotIn('"services_provided"', sql)
+
+    def test_unknown_field_rejected(self):
+        for url in (f'{self.URL}?fields=id,secret', f'{self.URL}{self.entity.pk}/?fields=secret'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('secret', response.json()['fields'])
+
+
+class QueryBudgetTests(TestCase):
+    """عدد الاستعلامات لكل endpoint يبقى ثابتاً مهما زاد عدد الصفوف"""
+
+    SIZES = (1, 100, 1000)
+
+    # endpoint -> الحد الأقصى لعدد الاستعلامات
+    BUDGETS = {
+        '/api/forms/government-entities/?page_size=200': 1,
+        '/api/forms/government-entities/?page_size=200&fields=id,submitted_by_name,approved_by_name': 1,
+        '/api/forms/government-entities/?page_size=200&search=جهة': 1,
+        '/api/forms/citizen-feedback/?page_size=200': 1,
+        '/api/forms/citizen-feedback/?page_size=200&status=pending&priority=medium': 1,
+        '/api/forms/form-submissions/?page_size=200': 1,
+        '/api/forms/government-entities/stats/': 1,
+        '/api/forms/citizen-feedback/stats/': 1,
+        '/api/forms/dashboard/stats/': 4,
+        '/api/forms/dashboard/timeseries/?group_by=governorate': 1,
+    }
+
+    def setUp(self):
+        self.user = make_user(is_staff=True, first_name='مدير', last_name='النظام')
+        self.client = api_client(self.user)
+        self.rows = 0
+
+    def grow_to(self, size):
+        """إضافة صفوف حتى يصل كل جدول إلى size - bulk_create لا يحدّث الفهارس المساعدة"""
+        new = range(self.rows, size)
+        GovernmentEntity.objects.bulk_create([make_entity(index, self.user) for index in new])
+        feedback = CitizenFeedback.objects.bulk_create([make_feedback(index, self.user) for index in new])
+        FormSubmission.objects.bulk_create([
+            FormSubmission(
+                submission_type='citizen_feedback', reference_number=f'REF{index:07d}',
+                submitter_name='مواطن', submitter_email='citizen@example.com', processed_by=self.user,
+            )
+            for index in new
+        ])
+        self.rows = size
+        return feedback
+
+    def assert_budget(self, url, budget, size):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url} بـ {size} صف نفذ {len(queries)} استعلام:\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+
+    def test_query_budgets(self):
+        for size in self.SIZES:
+            self.grow_to(size)
+            for url, budget in self.BUDGETS.items():
+                cache.clear()
+                with self.subTest(url=url, rows=size):
+                    self.assert_budget(url, budget, size)
+
+    def test_detail_query_budget(self):
+        self.grow_to(1)
+        entity = GovernmentEntity.objects.get()
+        feedback = CitizenFeedback.objects.get()
+        self.assert_budget(f'/api/forms/government-entities/{entity.pk}/', 1, 1)
+        self.assert_budget(f'/api/forms/citizen-feedback/{feedback.pk}/', 1, 1)
+
+
+class WorkQueueTests(TestCase):
+    """حجز الملاحظات: الأعلى أولوية أولاً، بلا حجز مزدوج، وعودة الحجز المنتهي للطابور"""
+
+    def setUp(self):
+        self.first = make_user('first', is_staff=True)
+        self.second = make_user('second', is_staff=True)
+        feedback = []
+        for index, priority in enumerate(['low', 'urgent', 'medium', 'urgent', 'high', 'medium']):
+            item = make_feedback(index, None)
+            item.priority = priority
+            feedback.append(item)
+        self.feedback = CitizenFeedback.objects.bulk_create(feedback)
+
+    def test_priority_order_and_api(self):
+        client = api_client(self.first)
+        response = client.post('/api/forms/citizen-feedback/claim/', {'count': 4}, format='json')
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(
+            [row['priority'] for row in response.data['results']], ['urgent', 'urgent', 'high', 'medium']
+        )
+        self.assertEqual(response.data['results'][0]['id'], self.feedback[1].pk)
+        response = client.post('/api/forms/citizen-feedback/claim/', {'count': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_claim_does_not_double_assign(self):
+        from . import queue
+
+        real_claimable = queue.claimable
+        calls = []
+
+        def claimable(now):
+            calls.append(now)
+            # الموظف الثاني يحجز بعد أن قرأ الأول مرشحيه وقبل أن يحدّثها
+            if len(calls) == 2:
+                with mock.patch.object(queue, 'claimable', real_claimable):
+                    queue.claim_next(self.second, 2)
+            return real_claimable(now)
+
+        with mock.patch.object(queue, 'claimable', claimable):
+            first_items, _ = queue.claim_next(self.first, 2)
+        second_items = list(CitizenFeedback.objects.filter(assigned_to=self.second))
+        self.assertEqual([item.priority for item in second_items], ['urgent', 'urgent'])
+        # الأول ينتقل إلى المستوى التالي بدل الصفوف التي سبقه إليها الثاني
+        self.assertEqual([item.priority for item in first_items], ['high', 'medium'])
+        self.assertFalse({item.pk for item in first_items} & {item.pk for item in second_items})
+        self.assertEqual(CitizenFeedback.objects.filter(assigned_to__isnull=False).count(),
+                         len(first_items) + len(second_items))
+
+    def test_lost_race_rereads_same_priority(self):
+        from . import queue
+
+        extra = make_feedback(6, None)
+        extra.priority = 'urgent'
+        extra.save()
+        real_claimable = queue.claimable
+        calls = []
+
+        def claimable(now):
+            calls.append(now)
+            # الموظف الثاني يسبق الأول إلى أول ملاحظة عاجلة من مرشحيه
+            if len(calls) == 2:
+                with mock.patch.object(queue, 'claimable', real_claimable):
+                    queue.claim_next(self.second, 1)
+            return real_claimable(now)
+
+        with mock.patch.object(queue, 'claimable', claimable):
+            first_items, _ = queue.claim_next(self.first, 2)
+        second_items = list(CitizenFeedback.objects.filter(assigned_to=self.second))
+        self.assertEqual([item.pk for item in second_items], [self.feedback[1].pk])
+        # يكمل الأول العدد من الملاحظات العاجلة المتبقية قبل الانتقال إلى المستوى التالي
+        self.assertEqual([item.pk for item in first_items], [self.feedback[3].pk, extra.pk])
+
+    def test_expired_claims_return_to_queue(self):
+        from .queue import CLAIM_TTL, claim_next
+
+        claimed, _ = claim_next(self.first, 6)
+        self.assertEqual(len(claimed), 6)
+        self.assertEqual(claim_next(self.second, 6)[0], [])
+
+        CitizenFeedback.objects.filter(pk=claimed[0].pk).update(claimed_at=claimed[0].claimed_at - CLAIM_TTL)
+        CitizenFeedback.objects.filter(pk=claimed[1].pk).update(
+            claimed_at=claimed[1].claimed_at - CLAIM_TTL, status='resolved'
+        )
+        reclaimed, _ = claim_next(self.second, 6)
+        self.assertEqual([item.pk for item in reclaimed], [claimed[0].pk])
+
+
+class DuplicateClusterTests(TestCase):
+    """ربط الملاحظات شبه المتطابقة عند الإنشاء وحل المجموعة كاملة"""
+
+    TEXT = 'انقطاع الكهرباء في حي الجامعة منذ ثلاثة أيام دون أي استجابة من دائرة الكهرباء رغم الاتصال المتكرر'
+
+    def create(self, title, description, related_entity='وزارة الكهرباء'):
+        return CitizenFeedback.objects.create(
+            citizen_name='مواطن', feedback_type='complaint', title=title, description=description,
+            related_entity=related_entity, governorate='baghdad',
+        )
+
+    def test_near_duplicates_share_cluster(self):
+        first = self.create('انقطاع الكهرباء', self.TEXT)
+        second = self.create('انقطاع الكهرباء', self.TEXT.replace('ثلاثة', 'ثلاثه') + ' أبداً')
+        other = self.create('تأخر معاملة التقاعد', 'لم تنجز معاملة التقاعد منذ ستة أشهر', 'هيئة التقاعد')
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(first.cluster_root_id, first.pk)
+        self.assertEqual(second.cluster_root_id, first.pk)
+        self.assertIsNone(other.cluster_root_id)
+
+    def test_resolve_cluster(self):
+        first = self.create('انقطاع الكهرباء', self.TEXT)
+        self.create('انقطاع الكهرباء', self.TEXT)
+        self.create('انقطاع الكهرباء', self.TEXT + ' نرجو الحل')
+        client = api_client(make_user(is_staff=True))
+
+        response = client.get('/api/forms/citizen-feedback/clusters/')
+        self.assertEqual(response.json()['results'][0]['size'], 3)
+
+        response = client.post(
+            f'/api/forms/citizen-feedback/{first.pk}/resolve_cluster/', {'admin_notes': ['قائمة']}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        response = client.post(
+            f'/api/forms/citizen-feedback/{first.pk}/resolve_cluster/', {'admin_notes': 'تم الحل'}, format='json'
+        )
+        self.assertEqual(response.json()['updated'], 3)
+        self.assertFalse(CitizenFeedback.objects.exclude(status='resolved').exists())
+        self.assertFalse(CitizenFeedback.objects.exclude(admin_notes='تم الحل').exists())
+
+
+class EntityResolutionTests(TestCase):
+    """ربط نص الجهة في الملاحظة بالجهة الحكومية مطابقةً تامة أو تقريبية"""
+
+    def setUp(self):
+        self.user = make_user(is_staff=True)
+        self.ministry = make_entity(1, self.user)
+        self.ministry.entity_name = 'وزارة الكهرباء'
+        self.ministry.save()
+        self.directorate = make_entity(2, self.user)
+        self.directorate.entity_name = 'مديرية تربية البصرة'
+        self.directorate.governorate = 'basra'
+        self.directorate.save()
+
+    def create(self, related_entity, governorate='baghdad'):
+        feedback = make_feedback(0, None)
+        feedback.related_entity = related_entity
+        feedback.governorate = governorate
+        feedback.save()
+        return feedback
+
+    def test_resolve_on_create(self):
+        self.assertEqual(self.create('وزاره الكهرباء').resolved_entity_id, self.ministry.pk)
+        self.assertEqual(self.create('وزارة الكهربا').resolved_entity_id, self.ministry.pk)
+        self.assertEqual(self.create('الكهرباء').resolved_entity_id, self.ministry.pk)
+        self.assertEqual(self.create('مديرية التربية في البصرة', 'basra').resolved_entity_id, self.directorate.pk)
+        self.assertIsNone(self.create('هيئة النزاهة').resolved_entity_id)
+
+    def test_backfill_and_grouped_counts(self):
+        feedback = CitizenFeedback.objects.bulk_create([make_feedback(index, None) for index in range(5)])
+        CitizenFeedback.objects.filter(id__in=[item.pk for item in feedback[:3]]).update(
+            related_entity='وزارة الكهرباء'
+        )
+        call_command('resolve_feedback_entities', batch_size=2, stdout=StringIO())
+
+        data = api_client(self.user).get('/api/forms/dashboard/feedback_by_entity/').json()
+        self.assertEqual(data['entities'][0]['entity'], self.ministry.pk)
+        self.assertEqual(data['entities'][0]['total'], 3)
+        self.assertEqual(data['unresolved'], 2)
+
+    def test_key_keeps_numbers_and_short_words(self):
+        from .resolver import entity_key
+
+        self.assertNotEqual(entity_key('مدرسة 5'), entity_key('مدرسة 6'))
+        self.assertEqual(entity_key('المدرسة  5'), entity_key('مدرسه 5'))
+
+    def test_reindex_replaces_rows_per_entity(self):
+        from .models import EntityAlias, EntityTrigram
+        from .resolver import entity_key, trigrams
+
+        # تعديل بدون إشارات يترك الفهرس قديماً حتى إعادة البناء
+        GovernmentEntity.objects.filter(pk=self.ministry.pk).update(entity_name='وزارة النفط')
+        call_command('resolve_feedback_entities', batch_size=1, stdout=StringIO())
+        self.assertEqual(EntityAlias.objects.count(), 2)
+        self.assertEqual(EntityAlias.objects.get(entity=self.ministry).name, entity_key('وزارة النفط'))
+        self.assertEqual(
+            set(EntityTrigram.objects.filter(entity=self.ministry).values_list('trigram', flat=True)),
+            set(trigrams(entity_key('وزارة النفط'))),
+        )
+        self.assertEqual(self.create('وزارة النفط').resolved_entity_id, self.ministry.pk)
+
+
+class EntityImportTests(TestCase):
+    """استيراد الجهات من CSV مع تقرير الصفوف غير الصالحة والمكررة"""
+
+    HEADER = [
+        'اسم الجهة', 'نوع الجهة', 'المحافظة', 'address', 'phone_number', 'email', 'manager_name',
+        'manager_position', 'manager_phone', 'manager_email', 'establishment_date', 'employee_count',
+        'annual_budget', 'services_provided', 'target_audience', 'current_projects', 'future_plans',
+        'performance_indicators', 'challenges', 'needs', 'has_electronic_system',
+    ]
+
+    def row(self, name, **changes):
+        values = dict(zip(self.HEADER, [
+            name, 'مديرية', 'بغداد', 'بغداد', '07701234567', 'entity@example.com', 'مدير', 'مدير عام',
+            '07701234567', 'manager@example.com', '2000-01-01', '120', '1,000,000', 'خدمات', 'المواطنون',
+            'مشاريع', 'خطط', 'مؤشرات', 'تحديات', 'احتياجات', 'نعم',
+        ]))
+        values.update(changes)
+        return ','.join(values[column] if ',' not in values[column] else f'"{values[column]}"' for column in self.HEADER)
+
+    def setUp(self):
+        self.client = api_client(make_user(is_staff=True))
+
+    def upload(self, *lines):
+        data = BytesIO('\n'.join(lines).encode('utf-8-sig'))
+        data.name = 'entities.csv'
+        return self.client.post('/api/forms/government-entities/import/', {'file': data}, format='multipart')
+
+    def test_import_report(self):
+        existing = make_entity(1, None)
+        existing.entity_name = 'مديرية تربية الرصافة'
+        existing.save()
+
+        response = self.upload(
+            ','.join(self.HEADER),
+            self.row('مديرية تربية الكرخ 1'),
+            self.row('مديرية تربية الكرخ 2'),
+            self.row('مديرية التربية - الكرخ 1'),
+            self.row('مديرية تربية الرصافه'),
+            self.row('مديرية صحة بغداد', phone_number='abc', establishment_date=''),
+        )
+        report = response.json()
+        self.assertEqual(response.status_code, 200, report)
+        self.assertEqual((report['created'], report['duplicates'], report['failed']), (2, 2, 1))
+        self.assertEqual([entry['row'] for entry in report['errors']], [4, 5, 6])
+        self.assertEqual(report['errors'][1]['entity'], existing.pk)
+        self.assertEqual(set(report['errors'][2]['errors']), {'phone_number', 'establishment_date'})
+
+        imported = GovernmentEntity.objects.get(entity_name='مديرية تربية الكرخ 2')
+        self.assertEqual((imported.entity_type, imported.governorate), ('directorate', 'baghdad'))
+        self.assertTrue(imported.has_electronic_system)
+
+    def test_existing_entities_without_aliases(self):
+        from importlib import import_module
+
+        from django.apps import apps
+
+        from .models import EntityAlias
+
+        existing = make_entity(1, None)
+        existing.entity_name = 'مديرية تربية الرصافة'
+        existing.save()
+        # جهات أُنشئت قبل جدول الأسماء المطبّعة
+        EntityAlias.objects.all().delete()
+        import_module('forms.migrations.0016_backfill_entity_aliases').backfill_entity_aliases(apps, None)
+
+        report = self.upload(','.join(self.HEADER), self.row('مديرية تربية الرصافه')).json()
+        self.assertEqual((report['created'], report['duplicates']), (0, 1))
+        self.assertEqual(report['errors'][0]['entity'], existing.pk)
+
+    def test_missing_columns(self):
+        response = self.upload('اسم الجهة', 'جهة')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('entity_type', response.json()['error']['file'][0])
+
+
+class KeysetPaginationTests(TestCase):
+    """ثبات المؤشر مع القيم المتساوية في created_at، والترتيب المشتق للنماذج بلا created_at"""
+
+    def setUp(self):
+        self.user = make_user(is_staff=True)
+        self.client = api_client(self.user)
+
+    def collect(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+
+    def test_ties_and_concurrent_inserts(self):
+        feedback = CitizenFeedback.objects.bulk_create([make_feedback(index, self.user) for index in range(25)])
+        # نصف الصفوف بنفس created_at حتى يفصل id بينها
+        same = feedback[0].created_at
+        CitizenFeedback.objects.filter(id__in=[row.id for row in feedback[:13]]).update(created_at=same)
+
+        first = self.client.get('/api/forms/citizen-feedback/?page_size=10')
+        seen = [row['id'] for row in first.data['results']]
+        # صف جديد بعد قراءة الصفحة الأولى لا يكرر ولا يزيح ما بعدها
+        make_feedback(25, None).save()
+        rest, _ = self.collect(first.data['next'])
+        self.assertEqual(sorted(seen + rest), sorted(row.id for row in feedback))
+
+        previous = self.client.get(self.client.get(first.data['next']).data['previous'])
+        self.assertEqual([row['id'] for row in previous.data['results']], seen)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/forms/citizen-feedback/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_model_without_created_at(self):
+        User.objects.bulk_create([
+            User(email=f'user{index}@example.com', username=f'user{index}') for index in range(5)
+        ])
+        ids, pages = self.collect('/api/auth/users/?page_size=2')
+        self.assertEqual(pages, 3)
+        self.assertEqual(ids, sorted(User.objects.values_list('id', flat=True)))
+
+
+class SubmissionReferenceTests(TestCase):
+    """تسجيل التقديم مع الملاحظة: الإرسال المجهول بلا بريد، ومعرف عامل محجوز لكل عملية"""
+
+    def test_anonymous_submission_has_no_email(self):
+        client = api_client(make_user('citizen'))
+        data = {
+            'is_anonymous': True, 'citizen_name': 'مجهول', 'feedback_type': 'complaint', 'title': 'شكوى',
+            'description': 'وصف', 'related_entity': 'وزارة', 'governorate': 'baghdad',
+        }
+        for url in ('/api/forms/citizen-feedback/', '/api/forms/citizen-feedback/create/'):
+            with self.subTest(url=url):
+                response = client.post(url, data, format='json')
+                self.assertEqual(response.status_code, 201, response.content[:500])
+                submission = FormSubmission.objects.get(reference_number=response.data['reference_number'])
+                self.assertEqual(submission.submitter_email, '')
+
+    def test_allocated_worker_ids_are_distinct(self):
+        from .references import allocate_worker_id
+
+        self.assertEqual(len({allocate_worker_id() for _ in range(50)}), 50)
+
+
+class BulkTriageTests(TestCase):
+    """التعديل الجماعي بمرشح يرفض المرشحات غير المعروفة أو التي تطابق الجدول كله"""
+
+    def setUp(self):
+        self.user = make_user(is_staff=True)
+        self.client = api_client(self.user)
+        CitizenFeedback.objects.bulk_create([make_feedback(index, self.user) for index in range(5)])
+        CitizenFeedback.objects.filter(id__in=CitizenFeedback.objects.values('id')[:2]).update(priority='high')
+
+    def bulk_update(self, payload):
+        return self.client.post('/api/forms/citizen-feedback/bulk_update/', payload, format='json')
+
+    def test_rejects_filters_without_conditions(self):
+        for condition in ({'search': 'و'}, {'cluster': ','}, {'status': ' '}, {'priorty': 'high'},
+                          {'priority': 'high', 'unknown': 'x'}):
+            with self.subTest(filter=condition):
+                response = self.bulk_update({'filter': condition, 'status': 'resolved'})
+                self.assertEqual(response.status_code, 400, response.content[:500])
+        self.assertFalse(CitizenFeedback.objects.filter(status='resolved').exists())
+
+    def test_filter_update(self):
+        response = self.bulk_update({'filter': {'priority': 'high'}, 'status': 'resolved'})
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(CitizenFeedback.objects.filter(status='resolved').count(), 2)
+
+
+class TimeseriesTests(TestCase):
+    """حدود الفترة: عدد الفترات محدود ولا تجاوز لـ date.max"""
+
+    def setUp(self):
+        self.client = api_client(make_user(is_staff=True))
+
+    def get(self, query):
+        return self.client.get(f'/api/forms/dashboard/timeseries/?{query}')
+
+    def test_range_limits(self):
+        for query in ('start=0001-01-01', 'start=2020-01-01&end=2024-12-31', 'start=2024-13-01', 'end=bad'):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(query).status_code, 400)
+
+    def test_last_buckets_before_date_max(self):
+        for interval in ('day', 'week', 'month'):
+            with self.subTest(interval=interval):
+                response = self.get(f'end=9999-12-31&interval={interval}')
+                self.assertEqual(response.status_code, 200, response.content[:500])
+                self.assertEqual(response.data['buckets'][-1].year, 9999)
+        response = self.get('end=0001-01-10')
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertEqual(response.data['start'], date.min)
@@ -0,0 +1,159 @@
+# forms/timeseries.py
+# سلاسل زمنية من جداول الإحصائيات اليومية بدل تجميع السجلات الأصلية
+
+import math
+from datetime import date, timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from .models import CitizenFeedback, EntityDailyStat, FeedbackDailyStat, GovernmentEntity
+
+# المصدر -> (جدول الإحصائيات, الأبعاد المسموح التجميع عليها مع تسمياتها)
+SOURCES = {
+    'feedback': (FeedbackDailyStat, {
+        'feedback_type': dict(CitizenFeedback.FEEDBACK_TYPES),
+        'priority': dict(CitizenFeedback.PRIORITY_LEVELS),
+        'status': dict(CitizenFeedback.STATUS_CHOICES),
+        'governorate': dict(GovernmentEntity.GOVERNORATES),
+    }),
+    'entities': (EntityDailyStat, {
+        'entity_type': dict(GovernmentEntity.ENTITY_TYPES),
+        'governorate': dict(GovernmentEntity.GOVERNORATES),
+        'is_approved': {True: 'تمت الموافقة', False: 'قيد المراجعة'},
+    }),
+}
+
+INTERVALS = ('day', 'week', 'month')
+TRUNCATE = {'week': TruncWeek, 'month': TruncMonth}
+DEFAULT_RANGE_DAYS = 90
+DEFAULT_MAX_POINTS = 200
+MAX_POINTS_LIMIT = 1000
+# أقصى عدد فترات في الطلب الواحد قبل الدمج (حوالي ثلاث سنوات يومية)
+MAX_BUCKETS = 1000
+
+
+def bucket_start(day, interval):
+    """بداية الفترة التي يقع فيها اليوم (الأسبوع يبدأ الاثنين كما في TruncWeek)"""
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start, interval):
+    if interval == 'week':
+        return start + timedelta(days=7)
+    if interval == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def bucket_count(start, end, interval):
+    """عدد الفترات بين التاريخين دون توليدها"""
+    if interval == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    days = (end - bucket_start(start, interval)).days
+    return days // 7 + 1 if interval == 'week' else days + 1
+
+
+def bucket_range(start, end, interval):
+    current = bucket_start(start, interval)
+    while current <= end:
+        yield current
+        try:
+            current = next_bucket(current, interval)
+        except OverflowError:
+            # الفترة الأخيرة قبل date.max
+            return
+
+
+def bucketed_counts(stat_model, start, end, interval, dimension=None):
+    """مجموع العدد لكل (فترة, قيمة البعد) محسوباً في قاعدة البيانات"""
+    rows = stat_model.objects.filter(day__gte=start, day__lte=end).order_by()
+    bucket = 'day'
+    if interval in TRUNCATE:
+        rows = rows.annotate(bucket=TRUNCATE[interval]('day'))
+        bucket = 'bucket'
+    columns = (bucket, dimension) if dimension else (bucket,)
+    return rows.values_list(*columns).annotate(total=Sum('count'))
+
+
+def downsample(points, size):
+    """دمج كل size نقطة متتالية بجمعها - الأعداد قابلة للجمع فلا تضيع القيم"""
+    return [sum(points[index:index + size]) for index in range(0, len(points), size)]
+
+
+def _parse_day(raw, name):
+    try:
+        value = parse_date(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError({name: 'يجب أن يكون التاريخ بصيغة YYYY-MM-DD'})
+    return value
+
+
+def build_timeseries(params):
+    source = params.get('source', 'feedback')
+    if source not in SOURCES:
+        raise ValidationError({'source': f'القيم المسموحة: {", ".join(SOURCES)}'})
+    stat_model, dimensions = SOURCES[source]
+
+    interval = params.get('interval', 'day')
+    if interval not in INTERVALS:
+        raise ValidationError({'interval': f'القيم المسموحة: {", ".join(INTERVALS)}'})
+
+    group_by = params.get('group_by') or None
+    if group_by is not None and group_by not in dimensions:
+        raise ValidationError({'group_by': f'القيم المسموحة: {", ".join(dimensions)}'})
+
+    end = _parse_day(params['end'], 'end') if params.get('end') else timezone.localdate()
+    if params.get('start'):
+        start = _parse_day(params['start'], 'start')
+    else:
+        start = max(end, date.min + timedelta(days=DEFAULT_RANGE_DAYS - 1)) - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start > end:
+        raise ValidationError({'start': 'يجب أن يسبق تاريخ البداية تاريخ النهاية'})
+    if bucket_count(start, end, interval) > MAX_BUCKETS:
+        raise ValidationError({'start': f'الفترة تتجاوز {MAX_BUCKETS} نقطة، اختر فترة أقصر أو interval أطول'})
+
+    try:
+        max_points = min(max(int(params.get('max_points', DEFAULT_MAX_POINTS)), 1), MAX_POINTS_LIMIT)
+    except ValueError:
+        raise ValidationError({'max_points': 'يجب أن يكون رقماً'})
+
+    buckets = list(bucket_range(start, end, interval))
+    positions = {bucket: index for index, bucket in enumerate(buckets)}
+
+    series = {}
+    for row in bucketed_counts(stat_model, start, end, interval, group_by):
+        bucket = row[0].date() if hasattr(row[0], 'date') else row[0]
+        key = row[1] if group_by else None
+        points = series.setdefault(key, [0] * len(buckets))
+        points[positions[bucket_start(bucket, interval)]] += row[-1]
+
+    # الفترات الطويلة تُدمج على الخادم حتى لا يتجاوز عدد النقاط max_points
+    size = max(1, math.ceil(len(buckets) / max_points))
+    labels = dimensions.get(group_by, {})
+    return {
+        'source': source,
+        'interval': interval,
+        'group_by': group_by,
+        'start': start,
+        'end': end,
+        'bucket_size': size,
+        'buckets': buckets[::size],
+        'series': [
+            {
+                'key': key,
+                'label': labels.get(key, key) if group_by else None,
+                'points': downsample(points, size),
+            }
+            for key, points in sorted(series.items(), key=lambda item: -sum(item[1]))
+        ],
+    }
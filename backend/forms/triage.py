@@ -0,0 +1,79 @@
+# forms/triage.py
+# تعديل حالة وأولوية وإسناد مجموعة ملاحظات بعبارة UPDATE واحدة
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.db.models.functions import Coalesce, Now, TruncDate
+
+from .models import CitizenFeedback
+from .rollups import ROLLUPS, adjust
+
+# حد المعرفات في عبارة واحدة (SQL Server يقبل 2100 معامل على الأكثر)
+IDS_CHUNK_SIZE = 1000
+
+# الحقول التي يمكن تغييرها جماعياً
+TRIAGE_FIELDS = ('status', 'priority', 'assigned_to', 'admin_notes')
+
+
+def _rollup_groups(queryset):
+    """عدد الصفوف لكل مفتاح إحصائية يومية قبل التعديل - استعلام تجميع واحد"""
+    _, dimensions = ROLLUPS[CitizenFeedback]
+    return (
+        queryset.order_by().annotate(day=TruncDate('created_at'))
+        .values_list('day', *dimensions).annotate(total=Count('id'))
+    )
+
+
+def _apply(queryset, changes, dry_run):
+    _, dimensions = ROLLUPS[CitizenFeedback]
+    groups = list(_rollup_groups(queryset))
+    by_status = Counter()
+    for row in groups:
+        by_status[row[1 + dimensions.index('status')]] += row[-1]
+    if dry_run or not groups:
+        return sum(row[-1] for row in groups), by_status
+
+    values = dict(changes, updated_at=Now())
+    if changes.get('status') == 'resolved':
+        # وقت الحل يُحدد في قاعدة البيانات ولا يُستبدل للملاحظات المحلولة سابقاً
+        values['resolved_at'] = Coalesce(F('resolved_at'), Now())
+    updated = queryset.update(**values)
+
+    # نقل الأعداد في الإحصائيات اليومية من المفاتيح القديمة إلى الجديدة
+    for row in groups:
+        old_key, count = tuple(row[:-1]), row[-1]
+        new_key = (old_key[0],) + tuple(
+            changes.get(name, old_key[1 + index]) for index, name in enumerate(dimensions)
+        )
+        if new_key != old_key:
+            adjust(CitizenFeedback, old_key, -count)
+            adjust(CitizenFeedback, new_key, count)
+    return updated, by_status
+
+
+def bulk_triage(queryset=None, ids=None, changes=None, dry_run=False):
+    """تطبيق changes على الملاحظات المطابقة لـ queryset أو لقائمة ids
+
+    يعيد (عدد الصفوف المعدلة, العدد حسب الحالة السابقة).
+    """
+    changes = {name: value for name, value in (changes or {}).items() if name in TRIAGE_FIELDS}
+    total = 0
+    by_status = Counter()
+    with transaction.atomic():
+        if ids is not None:
+            ids = sorted(set(ids))
+            batches = (
+                CitizenFeedback.objects.filter(id__in=ids[start:start + IDS_CHUNK_SIZE])
+                for start in range(0, len(ids), IDS_CHUNK_SIZE)
+            )
+        else:
+            # الصفوف المضافة أثناء التنفيذ لا تدخل في التعديل ولا في العد
+            ceiling = queryset.aggregate(ceiling=Max('id'))['ceiling']
+            batches = [queryset.filter(id__lte=ceiling)] if ceiling is not None else []
+        for batch in batches:
+            updated, statuses = _apply(batch, changes, dry_run)
+            total += updated
+            by_status.update(statuses)
+    return total, dict(by_status)
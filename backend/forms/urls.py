@@ -16,6 +16,7 @@ router.register(r'form-submissions', FormSubmissionViewSet)
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
 
 urlpatterns = [
-    path('api/forms/', include(router.urls)),
+    # قبل مسارات الـ router حتى لا يُفسَّر create كمعرف ملاحظة
     path('api/forms/citizen-feedback/create/', create_citizen_feedback, name='create_citizen_feedback'),
+    path('api/forms/', include(router.urls)),
 ]
@@ -1,19 +1,44 @@
 # forms/views.py
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.db.models import Count, Q
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
 from .models import GovernmentEntity, CitizenFeedback, FormSubmission
+from .filters import CitizenFeedbackFilterSet
+from .search import search as search_index
+from .stats import dashboard_stats, entity_stats, feedback_by_entity, feedback_stats
+from .stats_cache import cached_stats
+from .timeseries import build_timeseries
+from .triage import bulk_triage
+from .queue import MAX_CLAIM_SIZE, claim_next
+from .duplicates import cluster_members, cluster_summaries
+from .importer import detect_format, import_file
 from .serializers import (
-    GovernmentEntitySerializer, GovernmentEntityCreateSerializer,
-    CitizenFeedbackSerializer, CitizenFeedbackCreateSerializer,
-    FormSubmissionSerializer, DashboardStatsSerializer
+    GovernmentEntitySerializer, GovernmentEntityListSerializer, GovernmentEntityCreateSerializer,
+    CitizenFeedbackSerializer, CitizenFeedbackCreateSerializer, CitizenFeedbackBulkUpdateSerializer,
+    CitizenFeedbackResolveClusterSerializer,
+    FormSubmissionSerializer, DashboardStatsSerializer, is_anonymous_submission, sparse_queryset
 )
-from accounts.models import User
 
-class GovernmentEntityViewSet(viewsets.ModelViewSet):
+class SubmissionReferenceMixin:
+    """إرجاع الرقم المرجعي للتقديم المسجل في perform_create ضمن استجابة الإنشاء"""
+    
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.data['reference_number'] = self.submission.reference_number
+        return response
+
+class SearchRankOrderingMixin:
+    """ترتيب نتائج البحث حسب الصلة ثم الأحدث عند الترقيم بالمؤشر"""
+    
+    def get_cursor_ordering(self, queryset):
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-created_at', 'id')
+        return ('-created_at', 'id')
+
+class GovernmentEntityViewSet(SubmissionReferenceMixin, SearchRankOrderingMixin, viewsets.ModelViewSet):
     """ViewSet للجهات الحكومية"""
     queryset = GovernmentEntity.objects.all()
     serializer_class = GovernmentEntitySerializer
@@ -22,13 +47,44 @@ class GovernmentEntityViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return GovernmentEntityCreateSerializer
+        # ?fields= يختار من كل حقول الجهة، وبدونه تعرض القائمة أعمدة الجدول فقط
+        if self.action == 'list' and not self.get_requested_fields():
+            return GovernmentEntityListSerializer
         return GovernmentEntitySerializer
     
+    def get_requested_fields(self):
+        """الحقول المطلوبة عبر ?fields=a,b في القراءة فقط"""
+        if self.action not in ('list', 'retrieve'):
+            return None
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        requested = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = set(requested) - set(GovernmentEntitySerializer().fields)
+        if unknown:
+            raise ValidationError({'fields': f'حقول غير معروفة: {", ".join(sorted(unknown))}'})
+        return requested
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
+    
     def perform_create(self, serializer):
-        serializer.save(submitted_by=self.request.user)
+        user = self.request.user
+        with transaction.atomic():
+            entity = serializer.save(submitted_by=user)
+            self.submission = FormSubmission.record(entity, user.get_full_name() or user.username, user.email)
     
     def get_queryset(self):
-        queryset = GovernmentEntity.objects.all()
+        queryset = GovernmentEntity.objects.select_related('submitted_by', 'approved_by')
+        
+        # قراءة أعمدة الحقول المعروضة فقط
+        if self.action in ('list', 'retrieve'):
+            fields = self.get_requested_fields()
+            if fields or self.action == 'list':
+                serializer = self.get_serializer_class()(context={'fields': fields})
+                queryset = sparse_queryset(queryset, serializer, always=('id', 'created_at'))
         
         # تصفية حسب الموافقة
         is_approved = self.request.query_params.get('is_approved', None)
@@ -45,14 +101,10 @@ class GovernmentEntityViewSet(viewsets.ModelViewSet):
         if governorate is not None:
             queryset = queryset.filter(governorate=governorate)
         
-        # البحث
+        # البحث عبر الفهرس النصي مرتباً حسب الصلة
         search = self.request.query_params.get('search', None)
-        if search is not None:
-            queryset = queryset.filter(
-                Q(entity_name__icontains=search) |
-                Q(services_provided__icontains=search) |
-                Q(manager_name__icontains=search)
-            )
+        if search:
+            queryset = search_index(queryset, search)
         
         return queryset
     
@@ -78,48 +130,27 @@ class GovernmentEntityViewSet(viewsets.ModelViewSet):
         
         return Response({'status': 'rejected'}, status=status.HTTP_200_OK)
     
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])
+    def import_entities(self, request):
+        """استيراد جهات حكومية من ملف CSV أو XLSX مع تقرير بأخطاء كل صف"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'يجب إرفاق ملف CSV أو XLSX'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = detect_format(upload.name, request.data.get('format'))
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+        report = import_file(upload.file, file_format, user=request.user, dry_run=dry_run)
+        return Response(
+            report,
+            status=status.HTTP_400_BAD_REQUEST if 'error' in report else status.HTTP_200_OK
+        )
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """إحصائيات الجهات الحكومية"""
-        try:
-            from django.db import connection
-            
-            with connection.cursor() as cursor:
-                # إحصائيات حسب النوع
-                cursor.execute("""
-                    SELECT entity_type, COUNT(*) as count 
-                    FROM forms_governmententity 
-                    WHERE entity_type IS NOT NULL 
-                    GROUP BY entity_type
-                """)
-                entities_by_type = dict(cursor.fetchall())
-                
-                # إحصائيات حسب المحافظة
-                cursor.execute("""
-                    SELECT governorate, COUNT(*) as count 
-                    FROM forms_governmententity 
-                    WHERE governorate IS NOT NULL 
-                    GROUP BY governorate
-                """)
-                entities_by_governorate = dict(cursor.fetchall())
-        except Exception:
-            entities_by_type = {}
-            entities_by_governorate = {}
-        
-        stats = {
-            'total_entities': GovernmentEntity.objects.count(),
-            'approved_entities': GovernmentEntity.objects.filter(is_approved=True).count(),
-            'pending_entities': GovernmentEntity.objects.filter(is_approved=False).count(),
-            'entities_by_type': entities_by_type,
-            'entities_by_governorate': entities_by_governorate,
-            'recent_submissions': GovernmentEntity.objects.filter(
-                created_at__gte=timezone.now() - timedelta(days=30)
-            ).count(),
-        }
-        
-        return Response(stats)
+        return Response(cached_stats('entities', entity_stats))
 
-class CitizenFeedbackViewSet(viewsets.ModelViewSet):
+class CitizenFeedbackViewSet(SubmissionReferenceMixin, SearchRankOrderingMixin, viewsets.ModelViewSet):
     """ViewSet لملاحظات المواطنين"""
     queryset = CitizenFeedback.objects.all()
     serializer_class = CitizenFeedbackSerializer
@@ -131,41 +162,83 @@ class CitizenFeedbackViewSet(viewsets.ModelViewSet):
         return CitizenFeedbackSerializer
     
     def perform_create(self, serializer):
-        serializer.save(submitted_by=self.request.user)
+        with transaction.atomic():
+            feedback = serializer.save()
+            self.submission = FormSubmission.record_feedback(
+                feedback, self.request.user, is_anonymous_submission(self.request.data)
+            )
     
     def get_queryset(self):
-        queryset = CitizenFeedback.objects.all()
-        
-        # تصفية حسب الحالة
-        status_filter = self.request.query_params.get('status', None)
-        if status_filter is not None:
-            queryset = queryset.filter(status=status_filter)
+        return CitizenFeedbackFilterSet.filter_queryset(
+            CitizenFeedback.objects.select_related('assigned_to'), self.request.query_params
+        )
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def bulk_update(self, request):
+        """تعديل الحالة أو الأولوية أو الإسناد أو الملاحظات لمجموعة ملاحظات بعبارة UPDATE واحدة"""
+        serializer = CitizenFeedbackBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
         
-        # تصفية حسب نوع الملاحظة
-        feedback_type = self.request.query_params.get('feedback_type', None)
-        if feedback_type is not None:
-            queryset = queryset.filter(feedback_type=feedback_type)
+        queryset = None
+        if 'filter' in data:
+            CitizenFeedbackFilterSet.validate_conditions(data['filter'])
+            queryset = CitizenFeedbackFilterSet.filter_queryset(CitizenFeedback.objects.all(), data['filter'])
         
-        # تصفية حسب الأولوية
-        priority = self.request.query_params.get('priority', None)
-        if priority is not None:
-            queryset = queryset.filter(priority=priority)
+        updated, by_status = bulk_triage(
+            queryset=queryset, ids=data.get('ids'), changes=data, dry_run=data['dry_run']
+        )
+        return Response({
+            'updated': updated,
+            'by_previous_status': by_status,
+            'dry_run': data['dry_run'],
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def claim(self, request):
+        """حجز الملاحظات التالية في طابور المعالجة للموظف الحالي"""
+        try:
+            count = min(max(int(request.data.get('count', 10)), 1), MAX_CLAIM_SIZE)
+        except (TypeError, ValueError):
+            raise ValidationError({'count': 'يجب أن يكون رقماً'})
         
-        # تصفية حسب التقييم
-        rating = self.request.query_params.get('rating', None)
-        if rating is not None:
-            queryset = queryset.filter(rating=rating)
+        items, expires_at = claim_next(request.user, count)
+        return Response({
+            'claimed': len(items),
+            'claim_expires_at': expires_at,
+            'results': CitizenFeedbackSerializer(items, many=True).data,
+        }, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def clusters(self, request):
+        """أكبر مجموعات الملاحظات شبه المتطابقة، مع دعم نفس مرشحات القائمة
+
+        أعضاء المجموعة تُعرض بـ ?cluster=<المعرف> وتُحل معاً بـ resolve_cluster.
+        """
+        bounds = {}
+        for name, default, lowest, highest in (('min_size', 2, 2, None), ('limit', 50, 1, 200)):
+            try:
+                value = max(int(request.query_params.get(name, default)), lowest)
+            except ValueError:
+                raise ValidationError({name: 'يجب أن يكون رقماً'})
+            bounds[name] = min(value, highest) if highest else value
         
-        # البحث
-        search = self.request.query_params.get('search', None)
-        if search is not None:
-            queryset = queryset.filter(
-                Q(citizen_name__icontains=search) |
-                Q(feedback_text__icontains=search) |
-                Q(related_entity__entity_name__icontains=search)
-            )
+        return Response({'results': cluster_summaries(self.get_queryset(), **bounds)})
+    
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def resolve_cluster(self, request, pk=None):
+        """حل الملاحظة وكل الملاحظات المكررة لها في مجموعتها بعبارة UPDATE واحدة"""
+        feedback = self.get_object()
+        serializer = CitizenFeedbackResolveClusterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        changes = dict(serializer.validated_data, status='resolved')
         
-        return queryset
+        updated, by_status = bulk_triage(queryset=cluster_members(feedback), changes=changes)
+        return Response({
+            'cluster': feedback.cluster_root_id,
+            'updated': updated,
+            'by_previous_status': by_status,
+        }, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
     def resolve(self, request, pk=None):
@@ -200,43 +273,7 @@ class CitizenFeedbackViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """إحصائيات ملاحظات المواطنين"""
-        try:
-            from django.db import connection
-            
-            with connection.cursor() as cursor:
-                # إحصائيات حسب النوع
-                cursor.execute("""
-                    SELECT feedback_type, COUNT(*) as count 
-                    FROM forms_citizenfeedback 
-                    WHERE feedback_type IS NOT NULL 
-                    GROUP BY feedback_type
-                """)
-                feedback_by_type = dict(cursor.fetchall())
-                
-                # إحصائيات حسب الأولوية
-                cursor.execute("""
-                    SELECT priority, COUNT(*) as count 
-                    FROM forms_citizenfeedback 
-                    WHERE priority IS NOT NULL 
-                    GROUP BY priority
-                """)
-                feedback_by_priority = dict(cursor.fetchall())
-        except Exception:
-            feedback_by_type = {}
-            feedback_by_priority = {}
-        
-        stats = {
-            'total_feedback': CitizenFeedback.objects.count(),
-            'pending_feedback': CitizenFeedback.objects.filter(status='pending').count(),
-            'resolved_feedback': CitizenFeedback.objects.filter(status='resolved').count(),
-            'feedback_by_type': feedback_by_type,
-            'feedback_by_priority': feedback_by_priority,
-            'recent_feedback': CitizenFeedback.objects.filter(
-                created_at__gte=timezone.now() - timedelta(days=30)
-            ).count(),
-        }
-        
-        return Response(stats)
+        return Response(cached_stats('feedback', feedback_stats))
 
 class FormSubmissionViewSet(viewsets.ModelViewSet):
     """ViewSet لمراجعة الاستمارات المقدمة"""
@@ -245,7 +282,7 @@ class FormSubmissionViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        queryset = FormSubmission.objects.all()
+        queryset = FormSubmission.objects.select_related('processed_by')
         
         # تصفية حسب نوع الاستمارة
         submission_type = self.request.query_params.get('submission_type', None)
@@ -258,6 +295,39 @@ class FormSubmissionViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(status=status_filter)
         
         return queryset
+    
+    @action(detail=False, methods=['get'], url_path=r'track/(?P<reference>[A-Za-z0-9-]+)')
+    def track(self, request, reference=None):
+        """متابعة حالة التقديم بالرقم المرجعي - بحث واحد في فهرس reference_number"""
+        submission = (
+            FormSubmission.objects
+            .select_related('citizen_feedback', 'government_entity')
+            .only(
+                'reference_number', 'submission_type', 'created_at', 'processed_at',
+                'citizen_feedback__status', 'citizen_feedback__resolved_at',
+                'government_entity__is_approved', 'government_entity__approval_date',
+            )
+            .filter(reference_number=reference.upper())
+            .first()
+        )
+        if submission is None:
+            return Response({'error': 'الرقم المرجعي غير موجود'}, status=status.HTTP_404_NOT_FOUND)
+        
+        data = {
+            'reference_number': submission.reference_number,
+            'submission_type': submission.submission_type,
+            'submission_type_display': submission.get_submission_type_display(),
+            'created_at': submission.created_at,
+            'processed_at': submission.processed_at,
+        }
+        if submission.citizen_feedback is not None:
+            data['status'] = submission.citizen_feedback.status
+            data['status_display'] = submission.citizen_feedback.get_status_display()
+            data['resolved_at'] = submission.citizen_feedback.resolved_at
+        elif submission.government_entity is not None:
+            data['is_approved'] = submission.government_entity.is_approved
+            data['approval_date'] = submission.government_entity.approval_date
+        return Response(data)
 
 class DashboardViewSet(viewsets.ViewSet):
     """ViewSet لإحصائيات لوحة الإدارة"""
@@ -266,106 +336,19 @@ class DashboardViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """إحصائيات شاملة للوحة الإدارة"""
-        
-        # إحصائيات الكيانات الحكومية
-        try:
-            from django.db import connection
-            
-            with connection.cursor() as cursor:
-                # إحصائيات حسب النوع
-                cursor.execute("""
-                    SELECT entity_type, COUNT(*) as count 
-                    FROM forms_governmententity 
-                    WHERE entity_type IS NOT NULL 
-                    GROUP BY entity_type
-                """)
-                entities_by_type = dict(cursor.fetchall())
-                
-                # إحصائيات حسب المحافظة
-                cursor.execute("""
-                    SELECT governorate, COUNT(*) as count 
-                    FROM forms_governmententity 
-                    WHERE governorate IS NOT NULL 
-                    GROUP BY governorate
-                """)
-                entities_by_governorate = dict(cursor.fetchall())
-            
-            gov_entities_stats = {
-                'total_entities': GovernmentEntity.objects.count(),
-                'approved_entities': GovernmentEntity.objects.filter(is_approved=True).count(),
-                'pending_entities': GovernmentEntity.objects.filter(is_approved=False).count(),
-                'entities_by_type': entities_by_type,
-                'entities_by_governorate': entities_by_governorate,
-                'recent_submissions': GovernmentEntity.objects.filter(
-                    created_at__gte=timezone.now() - timedelta(days=30)
-                ).count(),
-            }
-        except Exception:
-            # في حالة فشل الاستعلام، استخدم قيم افتراضية
-            gov_entities_stats = {
-                'total_entities': GovernmentEntity.objects.count(),
-                'approved_entities': GovernmentEntity.objects.filter(is_approved=True).count(),
-                'pending_entities': GovernmentEntity.objects.filter(is_approved=False).count(),
-                'entities_by_type': {},
-                'entities_by_governorate': {},
-                'recent_submissions': 0,
-            }
-        
-        # إحصائيات ملاحظات المواطنين
-        try:
-            # استخدام raw SQL لتجنب مشاكل GROUP BY في SQL Server
-            from django.db import connection
-            
-            with connection.cursor() as cursor:
-                # إحصائيات حسب النوع
-                cursor.execute("""
-                    SELECT feedback_type, COUNT(*) as count 
-                    FROM forms_citizenfeedback 
-                    WHERE feedback_type IS NOT NULL 
-                    GROUP BY feedback_type
-                """)
-                feedback_by_type = dict(cursor.fetchall())
-                
-                # إحصائيات حسب الأولوية
-                cursor.execute("""
-                    SELECT priority, COUNT(*) as count 
-                    FROM forms_citizenfeedback 
-                    WHERE priority IS NOT NULL 
-                    GROUP BY priority
-                """)
-                feedback_by_priority = dict(cursor.fetchall())
-            
-            citizen_feedback_stats = {
-                'total_feedback': CitizenFeedback.objects.count(),
-                'pending_feedback': CitizenFeedback.objects.filter(status='pending').count(),
-                'resolved_feedback': CitizenFeedback.objects.filter(status='resolved').count(),
-                'feedback_by_type': feedback_by_type,
-                'feedback_by_priority': feedback_by_priority,
-                'recent_feedback': CitizenFeedback.objects.filter(
-                    created_at__gte=timezone.now() - timedelta(days=30)
-                ).count(),
-            }
-        except Exception:
-            # في حالة فشل الاستعلام، استخدم قيم افتراضية
-            citizen_feedback_stats = {
-                'total_feedback': CitizenFeedback.objects.count(),
-                'pending_feedback': CitizenFeedback.objects.filter(status='pending').count(),
-                'resolved_feedback': CitizenFeedback.objects.filter(status='resolved').count(),
-                'feedback_by_type': {},
-                'feedback_by_priority': {},
-                'recent_feedback': 0,
-            }
-        
-        # إحصائيات عامة
-        total_submissions = FormSubmission.objects.count()
-        active_users = User.objects.filter(is_active=True).count()
-        
-        stats = {
-            'government_entities': gov_entities_stats,
-            'citizen_feedback': citizen_feedback_stats,
-            'total_submissions': total_submissions,
-            'active_users': active_users,
-        }
-        
-        serializer = DashboardStatsSerializer(stats)
+        serializer = DashboardStatsSerializer(cached_stats('dashboard', dashboard_stats))
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """سلاسل زمنية يومية أو أسبوعية أو شهرية للملاحظات والجهات"""
+        return Response(build_timeseries(request.query_params))
+    
+    @action(detail=False, methods=['get'])
+    def feedback_by_entity(self, request):
+        """عدد الملاحظات لكل جهة حكومية حسب الجهة المطابقة لنص الملاحظة"""
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+        except ValueError:
+            raise ValidationError({'limit': 'يجب أن يكون رقماً'})
+        return Response(cached_stats(f'feedback_by_entity:{limit}', lambda: feedback_by_entity(limit)))
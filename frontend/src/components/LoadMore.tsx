@@ -0,0 +1,43 @@
+import React, { useEffect, useRef } from 'react';
+
+interface LoadMoreProps {
+  hasMore: boolean;
+  loading: boolean;
+  onLoadMore: () => void;
+}
+
+// زر تحميل الصفحة التالية، ويُضغط تلقائياً عند ظهوره في الشاشة (تمرير لا نهائي)
+const LoadMore: React.FC<LoadMoreProps> = ({ hasMore, loading, onLoadMore }) => {
+  const sentinel = useRef<HTMLDivElement>(null);
+
+  useEffect(() => {
+    if (!hasMore || loading || !sentinel.current || typeof IntersectionObserver === 'undefined') {
+      return;
+    }
+    const observer = new IntersectionObserver(entries => {
+      if (entries.some(entry => entry.isIntersecting)) {
+        onLoadMore();
+      }
+    }, { rootMargin: '200px' });
+    observer.observe(sentinel.current);
+    return () => observer.disconnect();
+  }, [hasMore, loading, onLoadMore]);
+
+  if (!hasMore) {
+    return null;
+  }
+
+  return (
+    <div ref={sentinel} className="flex justify-center py-6">
+      <button
+        onClick={onLoadMore}
+        disabled={loading}
+        className="px-6 py-2 rounded-lg font-medium bg-gray-100 dark:bg-gray-700 text-gray-700 dark:text-gray-300 hover:bg-gray-200 dark:hover:bg-gray-600 disabled:opacity-50 transition-all duration-200"
+      >
+        {loading ? 'جاري التحميل...' : 'تحميل المزيد'}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMore;
@@ -4,6 +4,8 @@ import { useAuth } from '@/contexts/AuthContext';
 import ThemeToggle from '@/components/ThemeToggle';
 import toast from 'react-hot-toast';
 import apiClient from '@/lib/apiClient';
+import { useCursorList } from '@/utils/pagination';
+import LoadMore from '@/components/LoadMore';
 
 interface CustomForm {
   id: number;
@@ -34,10 +36,13 @@ interface FormResponse {
 const FormsManagementPage: React.FC = () => {
   const { user } = useAuth();
   const router = useRouter();
-  const [forms, setForms] = useState<CustomForm[]>([]);
+  // القوائم مرقمة بالمؤشر: تُعرض الصفحة الأولى وتُلحق التالية عند التمرير
+  const formList = useCursorList<CustomForm>(apiClient);
+  const { items: forms, setItems: setForms } = formList;
   const [loading, setLoading] = useState(true);
   const [selectedForm, setSelectedForm] = useState<CustomForm | null>(null);
-  const [formResponses, setFormResponses] = useState<FormResponse[]>([]);
+  const responseList = useCursorList<FormResponse>(apiClient);
+  const formResponses = responseList.items;
   const [showResponsesModal, setShowResponsesModal] = useState(false);
   const [loadingResponses, setLoadingResponses] = useState(false);
 
@@ -61,8 +66,7 @@ const FormsManagementPage: React.FC = () => {
   const fetchForms = async () => {
     try {
       setLoading(true);
-      const response = await apiClient.get('/api/custom-forms/manage/');
-      setForms(response.data);
+      await formList.reload('/api/custom-forms/manage/');
     } catch (error) {
       console.error('Error fetching forms:', error);
       toast.error('حدث خطأ في جلب الاستمارات');
@@ -109,8 +113,8 @@ const FormsManagementPage: React.FC = () => {
       setSelectedForm(form);
       setShowResponsesModal(true);
       
-      const response = await apiClient.get(`/api/custom-forms/responses/${form.id}/`);
-      setFormResponses(response.data);
+      responseList.setItems([]);
+      await responseList.reload(`/api/custom-forms/responses/${form.id}/`);
     } catch (error) {
       console.error('Error fetching form responses:', error);
       toast.error('حدث خطأ في جلب الردود');
@@ -120,6 +124,13 @@ const FormsManagementPage: React.FC = () => {
     }
   };
 
+  const loadMore = (list: { loadMore: () => Promise<void> }, message: string) => () => {
+    list.loadMore().catch(error => {
+      console.error(message, error);
+      toast.error('حدث خطأ في جلب البيانات');
+    });
+  };
+
   const duplicateForm = async (form: CustomForm) => {
     try {
       const response = await apiClient.post(`/api/custom-forms/duplicate/${form.id}/`);
@@ -387,6 +398,11 @@ const FormsManagementPage: React.FC = () => {
                   ))}
                 </div>
               )}
+              <LoadMore
+                hasMore={formList.hasMore}
+                loading={formList.loadingMore}
+                onLoadMore={loadMore(formList, 'Error fetching forms:')}
+              />
             </div>
           </>
         )}
@@ -452,6 +468,11 @@ const FormsManagementPage: React.FC = () => {
                       </div>
                     </div>
                   ))}
+                  <LoadMore
+                    hasMore={responseList.hasMore}
+                    loading={responseList.loadingMore}
+                    onLoadMore={loadMore(responseList, 'Error fetching form responses:')}
+                  />
                 </div>
               )}
             </div>
@@ -4,6 +4,8 @@ import { useAuth } from '@/contexts/AuthContext';
 import ThemeToggle from '@/components/ThemeToggle';
 import toast from 'react-hot-toast';
 import apiClient from '@/lib/apiClient';
+import { fetchAllPages, useCursorList } from '@/utils/pagination';
+import LoadMore from '@/components/LoadMore';
 import * as XLSX from 'xlsx';
 import jsPDF from 'jspdf';
 import autoTable from 'jspdf-autotable';
@@ -46,8 +48,11 @@ const FormsAdminPage: React.FC = () => {
   const { user } = useAuth();
   const router = useRouter();
   const [activeTab, setActiveTab] = useState<'government' | 'citizen'>('government');
-  const [governmentEntities, setGovernmentEntities] = useState<GovernmentEntity[]>([]);
-  const [citizenFeedback, setCitizenFeedback] = useState<CitizenFeedback[]>([]);
+  // القوائم مرقمة بالمؤشر: تُعرض الصفحة الأولى وتُلحق التالية عند التمرير
+  const entityList = useCursorList<GovernmentEntity>(apiClient);
+  const feedbackList = useCursorList<CitizenFeedback>(apiClient);
+  const governmentEntities = entityList.items;
+  const citizenFeedback = feedbackList.items;
   const [loading, setLoading] = useState(true);
   const [stats, setStats] = useState({
     totalGovernmentEntities: 0,
@@ -70,24 +75,11 @@ const FormsAdminPage: React.FC = () => {
     try {
       setLoading(true);
       
-      const [entitiesResponse, feedbackResponse, dashboardResponse] = await Promise.all([
-        apiClient.get('/api/forms/government-entities/'),
-        apiClient.get('/api/forms/citizen-feedback/'),
-        apiClient.get('/api/forms/dashboard/stats/')
+      await Promise.all([
+        entityList.reload('/api/forms/government-entities/'),
+        feedbackList.reload('/api/forms/citizen-feedback/'),
+        fetchStats()
       ]);
-
-      setGovernmentEntities(entitiesResponse.data);
-      setCitizenFeedback(feedbackResponse.data);
-      
-      // تحويل البيانات من API إلى الشكل المتوقع
-      const statsData = dashboardResponse.data;
-      setStats({
-        totalGovernmentEntities: statsData.government_entities.total_entities,
-        totalCitizenFeedback: statsData.citizen_feedback.total_feedback,
-        pendingApproval: statsData.government_entities.pending_entities,
-        approved: statsData.government_entities.approved_entities,
-        rejected: 0 // لا يوجد حالة مرفوضة في API
-      });
     } catch (error) {
       console.error('Error fetching data:', error);
       toast.error('حدث خطأ في جلب البيانات');
@@ -96,6 +88,27 @@ const FormsAdminPage: React.FC = () => {
     }
   };
 
+  const fetchStats = async () => {
+    const dashboardResponse = await apiClient.get('/api/forms/dashboard/stats/');
+
+    // تحويل البيانات من API إلى الشكل المتوقع
+    const statsData = dashboardResponse.data;
+    setStats({
+      totalGovernmentEntities: statsData.government_entities.total_entities,
+      totalCitizenFeedback: statsData.citizen_feedback.total_feedback,
+      pendingApproval: statsData.government_entities.pending_entities,
+      approved: statsData.government_entities.approved_entities,
+      rejected: 0 // لا يوجد حالة مرفوضة في API
+    });
+  };
+
+  const loadMore = (list: { loadMore: () => Promise<void> }) => () => {
+    list.loadMore().catch(error => {
+      console.error('Error fetching data:', error);
+      toast.error('حدث خطأ في جلب البيانات');
+    });
+  };
+
   const handleStatusChange = async (type: 'government' | 'citizen', id: number, status: string) => {
     try {
       const endpoint = type === 'government' 
@@ -105,7 +118,13 @@ const FormsAdminPage: React.FC = () => {
       await apiClient.patch(endpoint, { status });
 
       toast.success('تم تحديث الحالة بنجاح');
-      fetchData();
+      // تحديث الصف في مكانه بدل إعادة الجلب حتى لا تضيع الصفحات المحملة
+      if (type === 'government') {
+        entityList.setItems(prev => prev.map(entity => entity.id === id ? { ...entity, status } : entity));
+      } else {
+        feedbackList.setItems(prev => prev.map(feedback => feedback.id === id ? { ...feedback, status } : feedback));
+      }
+      fetchStats().catch(error => console.error('Error fetching stats:', error));
     } catch (error) {
       console.error('Error updating status:', error);
       toast.error('حدث خطأ في تحديث الحالة');
@@ -579,7 +598,22 @@ const FormsAdminPage: React.FC = () => {
     }
   };
 
-  const handleExportGovernmentEntities = (format: 'excel' | 'pdf') => {
+  // التصدير يشمل كل الصفوف وليس الصفحات المحملة فقط، فتُجلب كلها عند الطلب
+  const fetchForExport = async <T,>(url: string): Promise<T[] | null> => {
+    try {
+      return await fetchAllPages<T>(apiClient, url);
+    } catch (error) {
+      console.error('Error fetching data:', error);
+      toast.error('حدث خطأ في جلب البيانات');
+      return null;
+    }
+  };
+
+  const handleExportGovernmentEntities = async (format: 'excel' | 'pdf') => {
+    const governmentEntities = await fetchForExport<GovernmentEntity>('/api/forms/government-entities/');
+    if (!governmentEntities) {
+      return;
+    }
     const headers = [
       'اسم الجهة',
       'نوع الجهة', 
@@ -609,7 +643,11 @@ const FormsAdminPage: React.FC = () => {
     }
   };
 
-  const handleExportCitizenFeedback = (format: 'excel' | 'pdf') => {
+  const handleExportCitizenFeedback = async (format: 'excel' | 'pdf') => {
+    const citizenFeedback = await fetchForExport<CitizenFeedback>('/api/forms/citizen-feedback/');
+    if (!citizenFeedback) {
+      return;
+    }
     const headers = [
       'الموضوع',
       'نوع الطلب',
@@ -775,7 +813,7 @@ const FormsAdminPage: React.FC = () => {
                     : 'text-gray-500 dark:text-gray-400 hover:text-gray-700 dark:hover:text-gray-300'
                 }`}
               >
-                الجهات الحكومية ({governmentEntities.length})
+                الجهات الحكومية ({stats.totalGovernmentEntities})
               </button>
               <button
                 onClick={() => setActiveTab('citizen')}
@@ -785,7 +823,7 @@ const FormsAdminPage: React.FC = () => {
                     : 'text-gray-500 dark:text-gray-400 hover:text-gray-700 dark:hover:text-gray-300'
                 }`}
               >
-                اقتراحات المواطنين ({citizenFeedback.length})
+                اقتراحات المواطنين ({stats.totalCitizenFeedback})
               </button>
             </div>
             
@@ -902,6 +940,7 @@ const FormsAdminPage: React.FC = () => {
                       </tbody>
                     </table>
                   </div>
+                  <LoadMore hasMore={entityList.hasMore} loading={entityList.loadingMore} onLoadMore={loadMore(entityList)} />
                 </div>
               ) : (
                 <div>
@@ -989,6 +1028,7 @@ const FormsAdminPage: React.FC = () => {
                       </tbody>
                     </table>
                   </div>
+                  <LoadMore hasMore={feedbackList.hasMore} loading={feedbackList.loadingMore} onLoadMore={loadMore(feedbackList)} />
                 </div>
               )}
             </div>
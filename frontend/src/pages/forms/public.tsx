@@ -4,6 +4,8 @@ import { useAuth } from '@/contexts/AuthContext';
 import ThemeToggle from '@/components/ThemeToggle';
 import toast from 'react-hot-toast';
 import apiClient from '@/lib/apiClient';
+import { useCursorList } from '@/utils/pagination';
+import LoadMore from '@/components/LoadMore';
 
 interface CustomForm {
   id: number;
@@ -30,7 +32,9 @@ interface FormField {
 const PublicFormsPage: React.FC = () => {
   const { user } = useAuth();
   const router = useRouter();
-  const [forms, setForms] = useState<CustomForm[]>([]);
+  // الكتالوج مرقم بالمؤشر: تُعرض الصفحة الأولى وتُلحق التالية عند التمرير
+  const formList = useCursorList<CustomForm>(apiClient);
+  const forms = formList.items;
   const [loading, setLoading] = useState(true);
   const [selectedForm, setSelectedForm] = useState<CustomForm | null>(null);
   const [formData, setFormData] = useState<{ [key: string]: any }>({});
@@ -54,8 +58,7 @@ const PublicFormsPage: React.FC = () => {
   const fetchPublicForms = async () => {
     try {
       setLoading(true);
-      const response = await apiClient.get('/api/custom-forms/public/');
-      setForms(response.data);
+      await formList.reload('/api/custom-forms/public/');
     } catch (error) {
       console.error('Error fetching public forms:', error);
       toast.error('حدث خطأ في جلب الاستمارات');
@@ -64,6 +67,13 @@ const PublicFormsPage: React.FC = () => {
     }
   };
 
+  const loadMoreForms = () => {
+    formList.loadMore().catch(error => {
+      console.error('Error fetching public forms:', error);
+      toast.error('حدث خطأ في جلب الاستمارات');
+    });
+  };
+
   const openForm = (form: CustomForm) => {
     setSelectedForm(form);
     const initialData: { [key: string]: any } = {};
@@ -367,6 +377,8 @@ const PublicFormsPage: React.FC = () => {
                 ))}
               </div>
             )}
+            {/* التصفية حسب الفئة تتم على الصفحات المحملة، فيبقى التحميل متاحاً حتى لو لم تظهر نتيجة */}
+            <LoadMore hasMore={formList.hasMore} loading={formList.loadingMore} onLoadMore={loadMoreForms} />
           </div>
         )}
       </main>
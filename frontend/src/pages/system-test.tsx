@@ -47,7 +47,7 @@ const SystemTestPage: React.FC = () => {
         const response = await apiClient.get('/api/custom-forms/public/');
         setTests(prev => ({
           ...prev,
-          database: { status: 'success', message: `Database accessible, found ${response.data.length} public forms` }
+          database: { status: 'success', message: `Database accessible, found ${response.data.results.length} public forms` }
         }));
       } catch (error) {
         setTests(prev => ({
@@ -61,7 +61,7 @@ const SystemTestPage: React.FC = () => {
         const response = await apiClient.get('/api/custom-forms/manage/');
         setTests(prev => ({
           ...prev,
-          forms: { status: 'success', message: `Forms API working, found ${response.data.length} user forms` }
+          forms: { status: 'success', message: `Forms API working, found ${response.data.results.length} user forms` }
         }));
       } catch (error) {
         setTests(prev => ({
@@ -107,7 +107,7 @@ const SystemTestPage: React.FC = () => {
       const response = await apiClient.get('/api/custom-forms/public/');
       setTests(prev => ({
         ...prev,
-        database: { status: 'success', message: `Database accessible, found ${response.data.length} public forms` }
+        database: { status: 'success', message: `Database accessible, found ${response.data.results.length} public forms` }
       }));
     } catch (error) {
       setTests(prev => ({
@@ -121,7 +121,7 @@ const SystemTestPage: React.FC = () => {
       const response = await apiClient.get('/api/custom-forms/manage/');
       setTests(prev => ({
         ...prev,
-        forms: { status: 'success', message: `Forms API working, found ${response.data.length} user forms` }
+        forms: { status: 'success', message: `Forms API working, found ${response.data.results.length} user forms` }
       }));
     } catch (error) {
       setTests(prev => ({
@@ -0,0 +1,94 @@
+// utils/pagination.ts
+// قوائم الـ API مقسمة بمؤشر (cursor): كل صفحة تحوي results ورابط next للصفحة التالية
+
+import { useCallback, useRef, useState } from 'react';
+
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+interface PageClient {
+  get: (url: string, config?: { params?: Record<string, string> }) => Promise<{ data: CursorPage<any> }>;
+}
+
+// استخراج قيمة cursor من رابط next المطلق أو النسبي
+export const nextCursor = (next: string | null): string | null => {
+  if (!next) {
+    return null;
+  }
+  return new URL(next, 'http://localhost').searchParams.get('cursor');
+};
+
+// جلب صفحة واحدة مع cursor الصفحة التالية (null عند النهاية)
+export const fetchPage = async <T>(
+  client: PageClient,
+  url: string,
+  params: Record<string, string> = {},
+  cursor: string | null = null
+): Promise<{ items: T[]; cursor: string | null }> => {
+  const response = await client.get(url, {
+    params: cursor ? { ...params, cursor } : params,
+  });
+  return { items: response.data.results as T[], cursor: nextCursor(response.data.next) };
+};
+
+// جلب كل صفحات القائمة باتباع next حتى نهايتها - للتصدير فقط، العرض يستخدم useCursorList
+export const fetchAllPages = async <T>(
+  client: PageClient,
+  url: string,
+  params: Record<string, string> = {}
+): Promise<T[]> => {
+  const items: T[] = [];
+  let cursor: string | null = null;
+  do {
+    const page: { items: T[]; cursor: string | null } = await fetchPage<T>(client, url, params, cursor);
+    items.push(...page.items);
+    cursor = page.cursor;
+  } while (cursor);
+  return items;
+};
+
+// قائمة تُعرض صفحتها الأولى ثم تُلحق الصفحات التالية عند الطلب باتباع next
+// reload و loadMore يرميان الخطأ ليعرضه المستدعي
+export const useCursorList = <T>(client: PageClient) => {
+  const [items, setItems] = useState<T[]>([]);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // رقم آخر تحميل من البداية حتى تُهمل صفحات طلب سابق وصلت بعده
+  const generation = useRef(0);
+  const loadingMoreRef = useRef(false);
+  const source = useRef<string | null>(null);
+
+  const reload = useCallback(async (url: string) => {
+    const current = ++generation.current;
+    source.current = url;
+    const page = await fetchPage<T>(client, url);
+    if (current === generation.current) {
+      setItems(page.items);
+      setCursor(page.cursor);
+    }
+  }, [client]);
+
+  const loadMore = useCallback(async () => {
+    if (!cursor || !source.current || loadingMoreRef.current) {
+      return;
+    }
+    const current = generation.current;
+    loadingMoreRef.current = true;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage<T>(client, source.current, {}, cursor);
+      if (current === generation.current) {
+        setItems(previous => [...previous, ...page.items]);
+        setCursor(page.cursor);
+      }
+    } finally {
+      loadingMoreRef.current = false;
+      setLoadingMore(false);
+    }
+  }, [client, cursor]);
+
+  return { items, setItems, hasMore: cursor !== null, loadingMore, reload, loadMore };
+};
@@ -59,7 +59,7 @@ export async function testFormsEndpoint(): Promise<void> {
       }
     });
     
-    console.log('✅ endpoint الاستمارة يعمل، عدد الجهات:', response.data.length);
+    console.log('✅ endpoint الاستمارة يعمل، عدد الجهات:', response.data.results.length);
   } catch (error: any) {
     console.error('❌ مشكلة في endpoint الاستمارة:', getAxiosErrorDetails(error));
   }